@@ -0,0 +1,50 @@
+"""
+Authentication backend that keeps recently seen users in process memory.
+
+Every authenticated request otherwise loads the user row, and permission
+checks such as ``view_all_courses`` load the permission tables on top. Users
+are kept for ``AUTH_USER_CACHE_TTL`` seconds with their permissions already
+resolved; saving or deleting a user, or changing its groups or permissions,
+drops the entry in this process. Other processes catch up within the TTL.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+
+MAX_CACHED_USERS = 10000
+
+_users = {}
+_lock = threading.Lock()
+
+
+def forget_user(user_id=None):
+    """Drop one cached user, or all of them when ``user_id`` is None."""
+    with _lock:
+        if user_id is None:
+            _users.clear()
+        else:
+            _users.pop(user_id, None)
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        now = time.monotonic()
+        entry = _users.get(user_id)
+        if entry is not None and entry[0] > now:
+            # Each request gets its own copy, so views can't leak changes into the cache
+            return copy.copy(entry[1])
+
+        user = super().get_user(user_id)
+        if user is None:
+            return None
+        # Resolve permissions now so has_perm() on the cached copies is free
+        self.get_all_permissions(user)
+        with _lock:
+            if len(_users) >= MAX_CACHED_USERS:
+                _users.clear()
+            _users[user_id] = (now + settings.AUTH_USER_CACHE_TTL, user)
+        return copy.copy(user)
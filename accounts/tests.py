@@ -1,3 +1,34 @@
+from django.contrib.auth.models import Permission
 from django.test import TestCase
 
-# Create your tests here.
+from .backends import CachedModelBackend, forget_user
+from .models import CustomUser
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        forget_user()
+        self.addCleanup(forget_user)
+        self.backend = CachedModelBackend()
+        self.user = CustomUser.objects.create_user('admin1', password='x', role='admin')
+        self.permission = Permission.objects.get(codename='view_customuser')
+
+    def test_seen_user_and_permissions_cost_no_queries(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertFalse(user.has_perm('accounts.view_customuser'))
+
+    def test_requests_get_their_own_copy(self):
+        self.backend.get_user(self.user.pk).first_name = 'Changed'
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, '')
+
+    def test_saving_the_user_or_its_permissions_drops_the_entry(self):
+        self.backend.get_user(self.user.pk)
+        CustomUser.objects.filter(pk=self.user.pk).update(first_name='Ada')
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, '')
+        CustomUser.objects.get(pk=self.user.pk).save()
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, 'Ada')
+
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(self.backend.get_user(self.user.pk).has_perm('accounts.view_customuser'))
@@ -1,10 +1,49 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django import forms
-from .models import Teacher, Student, Course, Assignment, Submission
+from django.db.models import Count, Q
+from django.utils.html import format_html
+from elearning_portal.cache import get_or_set_versioned
+from elearning_portal.paginator import EstimatedCountPaginator
+from . import search
+from .models import Teacher, Student, Course, Assignment, Submission, SlowQuery
 
 User = get_user_model()
 
+# Full-text search for changelists
+class FullTextSearchMixin:
+    """
+    Answer the changelist search box from the FTS5 index instead of
+    ``icontains`` scans. ``fulltext_lookups`` maps a search kind to the field
+    on this model that holds the matching object's id. Only the best
+    ``search.MAX_HITS`` matches of each kind are used; the changelist says so
+    when a search hit that cap.
+    """
+    fulltext_lookups = {}
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not self.fulltext_lookups or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+        condition = Q(pk__in=[])
+        truncated = False
+        for kind, lookup in self.fulltext_lookups.items():
+            pks = search.search_ids(search_term, kind, limit=search.MAX_HITS + 1)
+            truncated |= len(pks) > search.MAX_HITS
+            condition |= Q(**{f'{lookup}__in': pks[:search.MAX_HITS]})
+        if truncated and self.is_changelist(request):
+            self.message_user(request, (
+                f'Only the best {search.MAX_HITS} matches for "{search_term}" are listed; '
+                'refine the search to see the rest.'
+            ), messages.WARNING)
+        return queryset.filter(condition), False
+
+    def is_changelist(self, request):
+        # Admin autocomplete searches through here too, but shows no messages
+        match = getattr(request, 'resolver_match', None)
+        opts = self.model._meta
+        return bool(match) and match.url_name == f'{opts.app_label}_{opts.model_name}_changelist'
+
+
 # Custom Form for Assignment with Teacher Validation
 class AssignmentAdminForm(forms.ModelForm):
     class Meta:
@@ -17,24 +56,47 @@ class AssignmentAdminForm(forms.ModelForm):
             raise forms.ValidationError("The selected user must be a registered teacher")
         return teacher
 
+# Teacher choices for list filters, built in one query and cached until a
+# teacher or user changes
+def teacher_choices(key_field):
+    def build():
+        rows = Teacher.objects.values_list(key_field, 'user__first_name', 'user__last_name', 'specialty')
+        return [(pk, f"{first} {last}".strip() + f" ({specialty})") for pk, first, last, specialty in rows]
+    return get_or_set_versioned(
+        f'admin:teacher_choices:{key_field}', ['dashboard.Teacher', 'accounts.CustomUser'], build
+    )
+
 # Custom Filter for Teachers in Assignment Admin
 class TeacherFilter(admin.SimpleListFilter):
     title = 'teacher'
     parameter_name = 'teacher'
 
     def lookups(self, request, model_admin):
-        return [(t.user.id, f"{t.user.get_full_name()} ({t.specialty})") 
-               for t in Teacher.objects.all()]
+        return teacher_choices('user_id')
 
     def queryset(self, request, queryset):
         if self.value():
             return queryset.filter(teacher__id=self.value())
         return queryset
 
+# Custom Filter for Teachers in Course Admin
+class CourseTeacherFilter(admin.SimpleListFilter):
+    title = 'teachers'
+    parameter_name = 'teachers'
+
+    def lookups(self, request, model_admin):
+        return teacher_choices('id')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(teachers__id=self.value())
+        return queryset
+
 # Teacher Admin
 @admin.register(Teacher)
 class TeacherAdmin(admin.ModelAdmin):
     list_display = ['user', 'specialty', 'phone', 'user_email']
+    ordering = ['id']
     search_fields = ['user__first_name', 'user__last_name', 'specialty', 'phone']
     list_filter = ['specialty']
     raw_id_fields = ['user']
@@ -47,6 +109,10 @@ class TeacherAdmin(admin.ModelAdmin):
         }),
     )
 
+    # select_related here rather than list_select_related so autocomplete gets it too
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
     def user_email(self, obj):
         return obj.user.email
     user_email.short_description = 'Email'
@@ -54,10 +120,12 @@ class TeacherAdmin(admin.ModelAdmin):
 
 # Student Admin
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['user', 'enrollment_id', 'course', 'semester', 'user_email']
+    ordering = ['id']
     list_filter = ['course', 'semester']
     search_fields = ['user__first_name', 'user__last_name', 'enrollment_id']
+    fulltext_lookups = {'student': 'pk'}
     raw_id_fields = ['user']
     fieldsets = (
         (None, {
@@ -68,6 +136,10 @@ class StudentAdmin(admin.ModelAdmin):
         }),
     )
 
+    # select_related here rather than list_select_related so autocomplete gets it too
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
     def user_email(self, obj):
         return obj.user.email
     user_email.short_description = 'Email'
@@ -75,11 +147,12 @@ class StudentAdmin(admin.ModelAdmin):
 
 # Course Admin
 @admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
+class CourseAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['code', 'name', 'teacher_count', 'description_short']
-    list_filter = ['teachers']
+    list_filter = [CourseTeacherFilter]
     search_fields = ['code', 'name', 'description']
-    filter_horizontal = ['teachers']
+    fulltext_lookups = {'course': 'pk'}
+    autocomplete_fields = ['teachers']
     fieldsets = (
         (None, {
             'fields': ('code', 'name', 'description')
@@ -89,9 +162,13 @@ class CourseAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_teacher_count=Count('teachers'))
+
     def teacher_count(self, obj):
-        return obj.teachers.count()
+        return obj._teacher_count
     teacher_count.short_description = 'Teachers'
+    teacher_count.admin_order_field = '_teacher_count'
 
     def description_short(self, obj):
         return obj.description[:50] + '...' if len(obj.description) > 50 else obj.description
@@ -99,13 +176,17 @@ class CourseAdmin(admin.ModelAdmin):
 
 # Assignment Admin
 @admin.register(Assignment)
-class AssignmentAdmin(admin.ModelAdmin):
+class AssignmentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     form = AssignmentAdminForm
     list_display = ('title', 'course', 'teacher_name', 'due_date', 'status_badge', 'max_points')
+    list_select_related = ('course', 'teacher')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('status', 'course', TeacherFilter)
     search_fields = ('title', 'course__name', 'teacher__username')
+    fulltext_lookups = {'assignment': 'pk', 'course': 'course'}
     date_hierarchy = 'due_date'
-    filter_horizontal = ['students']
+    autocomplete_fields = ['course', 'teacher', 'students']
     ordering = ('-due_date',)
     list_per_page = 20
     fieldsets = (
@@ -146,10 +227,14 @@ class AssignmentAdmin(admin.ModelAdmin):
 
 # Submission Admin
 @admin.register(Submission)
-class SubmissionAdmin(admin.ModelAdmin):
+class SubmissionAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('assignment', 'student_name', 'submitted_at', 'grade_display', 'is_late_badge')
+    list_select_related = ('assignment__course', 'student__user')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('is_late', 'assignment__course')
     search_fields = ('assignment__title', 'student__user__username')
+    fulltext_lookups = {'assignment': 'assignment', 'student': 'student'}
     readonly_fields = ('submitted_at',)
     raw_id_fields = ('assignment', 'student')
     list_per_page = 20
@@ -182,4 +267,35 @@ class SubmissionAdmin(admin.ModelAdmin):
             'danger' if obj.is_late else 'success',
             'Late' if obj.is_late else 'On Time'
         )
-    is_late_badge.short_description = 'Status'
\ No newline at end of file
+    is_late_badge.short_description = 'Status'
+
+# Slow Query Log (written by elearning_portal.slowqueries)
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ('recorded_at', 'duration_ms', 'source', 'frame', 'sql_short', 'full_scan')
+    list_filter = ('full_scan', 'source')
+    search_fields = ('sql', 'frame', '=fingerprint')
+    ordering = ('-duration',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    fields = ('recorded_at', 'duration_ms', 'source', 'frame', 'fingerprint', 'params_fingerprint', 'sql', 'plan_display')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def duration_ms(self, obj):
+        return f"{obj.duration:.1f} ms"
+    duration_ms.short_description = 'Duration'
+    duration_ms.admin_order_field = 'duration'
+
+    def sql_short(self, obj):
+        return obj.sql[:120] + '...' if len(obj.sql) > 120 else obj.sql
+    sql_short.short_description = 'SQL'
+
+    def plan_display(self, obj):
+        return format_html('<pre>{}</pre>', obj.plan)
+    plan_display.short_description = 'Plan'
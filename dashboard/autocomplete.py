@@ -0,0 +1,50 @@
+"""
+Paginated JSON autocomplete for large relational form fields.
+
+Responses use the select2 format ``{"results": [{"id", "text"}], "pagination":
+{"more": bool}}``. Typed terms are answered from the full-text index
+(``dashboard.search``), so a lookup costs the same at any table size.
+"""
+from django.http import JsonResponse
+
+from . import search
+
+PAGE_SIZE = 20
+
+
+def page_number(request):
+    try:
+        return max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        return 1
+
+
+def autocomplete_response(request, queryset, kind, label, value='pk'):
+    """
+    Answer an autocomplete request over ``queryset``.
+
+    ``kind`` is the search index kind that documents the queryset's model,
+    ``label`` turns a row of ``queryset`` into the option text and ``value``
+    names the field sent back as the option id.
+    """
+    term = request.GET.get('term', '').strip()
+    page = page_number(request)
+    offset = (page - 1) * PAGE_SIZE
+
+    if term:
+        # Pages are cut from the ranked hit list, so a page can come back
+        # short when ``queryset`` filters some hits out; paging stays stable.
+        pks = search.search_ids(term, kind, limit=PAGE_SIZE + 1, offset=offset)
+        more = len(pks) > PAGE_SIZE
+        pks = pks[:PAGE_SIZE]
+        rank = {pk: position for position, pk in enumerate(pks)}
+        rows = sorted(queryset.filter(pk__in=pks), key=lambda obj: rank[obj.pk])
+    else:
+        rows = list(queryset.order_by('pk')[offset:offset + PAGE_SIZE + 1])
+        more = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+
+    return JsonResponse({
+        'results': [{'id': getattr(obj, value), 'text': label(obj)} for obj in rows],
+        'pagination': {'more': more},
+    })
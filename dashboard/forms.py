@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 from .models import Teacher, Student, Course, Assignment
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 User = get_user_model()
 
@@ -156,12 +157,15 @@ class CourseForm(forms.ModelForm):
             'code': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. CS101'}),
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. Intro to CS'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Course description...'}),
-            'teachers': forms.SelectMultiple(attrs={'class': 'form-control select2-multiple', 'data-placeholder': 'Select teachers...'})
+            'teachers': AutocompleteSelectMultiple(
+                'dashboard:autocomplete_teachers',
+                attrs={'class': 'form-control select2-multiple', 'data-placeholder': 'Select teachers...'}
+            )
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['teachers'].queryset = Teacher.objects.filter(user__role='teacher')
+        self.fields['teachers'].queryset = Teacher.objects.filter(user__role='teacher').select_related('user')
 
 # ---------------- Assignment Form ---------------- #
 
@@ -174,10 +178,14 @@ class AssignmentForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Detailed assignment description...'}),
             'due_date': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
             'course': forms.Select(attrs={'class': 'form-control'}),
-            'teacher': forms.Select(attrs={'class': 'form-control'}),
+            'teacher': AutocompleteSelect(
+                'dashboard:autocomplete_teacher_users',
+                attrs={'class': 'form-control', 'data-placeholder': 'Select teacher...', 'data-autocomplete-forward': 'course'}
+            ),
             'max_points': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Maximum score (e.g. 100)', 'min': 1})
         }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['teacher'].queryset = Teacher.objects.filter(user__role='teacher')
+        # Assignment.teacher points at the user account of a registered teacher
+        self.fields['teacher'].queryset = User.objects.filter(role='teacher', teacher__isnull=False)
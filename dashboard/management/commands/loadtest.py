@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elearning_portal import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay weighted term-start traffic (dashboards, uploads, grading, enrolments) against a '
+        'running server and report throughput, latency percentiles, errors and "database is locked" counts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running server.')
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users (threads).')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run after ramp-up.')
+        parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which users are started.')
+        parser.add_argument('--think', type=float, default=0.0, help='Mean pause between scenarios, in seconds.')
+        parser.add_argument('--scenario', action='append', default=[], metavar='NAME=WEIGHT',
+                            help='Override a scenario weight (0 disables it); may be repeated.')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--prefix', default='load', help='Username and course code prefix of the fixtures.')
+        parser.add_argument('--setup', action='store_true', help='Create the synthetic users and data first.')
+        parser.add_argument('--teardown', action='store_true', help='Delete the synthetic users and data and exit.')
+        parser.add_argument('--teachers', type=int, default=5)
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--assignments', type=int, default=4, help='Assignments per course.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['teardown']:
+            deleted = loadtest.delete_fixtures(prefix)
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} objects.'))
+            return
+        if options['setup']:
+            if loadtest.load_fixtures(prefix)['admin']:
+                raise CommandError(f'Fixtures with prefix {prefix!r} exist; run with --teardown first.')
+            loadtest.create_fixtures(prefix, options['teachers'], options['students'], options['assignments'])
+        fixtures = loadtest.load_fixtures(prefix)
+        if not (fixtures['admin'] and fixtures['teachers'] and fixtures['students']):
+            raise CommandError(f'No fixtures with prefix {prefix!r}; run with --setup.')
+
+        scenarios = {scenario.name: scenario for scenario in loadtest.SCENARIOS}
+        for item in options['scenario']:
+            name, _, weight = item.partition('=')
+            if name not in scenarios or not weight.isdigit():
+                raise CommandError(f'--scenario expects NAME=WEIGHT with NAME one of {", ".join(scenarios)}')
+            scenarios[name].weight = int(weight)
+
+        self.stdout.write(
+            f"{options['users']} users against {options['url']} for {options['duration']:.0f}s "
+            f"(+{options['ramp_up']:.0f}s ramp-up)..."
+        )
+        results, skipped = loadtest.run(
+            options['url'], fixtures, options['users'], options['duration'],
+            think=options['think'], ramp_up=options['ramp_up'],
+            scenarios=list(scenarios.values()), seed=options['seed'],
+        )
+        self.report(results, skipped)
+
+    def report(self, results, skipped):
+        header = f"{'scenario':<14} {'runs':>6} {'req':>7} {'runs/s':>7} {'p50 ms':>8} {'p90 ms':>8} " \
+                 f"{'p99 ms':>8} {'max ms':>8} {'errors':>7} {'locked':>6}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        def ms(value):
+            return f'{value:8.0f}' if value is not None else f"{'-':>8}"
+
+        for name, row in results.items():
+            p = row['percentiles']
+            line = (
+                f"{name:<14} {row['runs']:>6} {row['requests']:>7} {row['throughput']:>7.1f} "
+                f"{ms(p[50])} {ms(p[90])} {ms(p[99])} {ms(row['max'])} "
+                f"{row['error_rate']:>7.1%} {row['locked']:>6}"
+            )
+            self.stdout.write(self.style.WARNING(line) if row['error_rate'] or row['locked'] else line)
+        for name, row in results.items():
+            if row['last_error']:
+                self.stdout.write(f"{name}: last error: {row['last_error']}")
+        if skipped:
+            self.stdout.write(f"Skipped (view not routed, no data or weight 0; run migrate and --setup): {', '.join(skipped)}")
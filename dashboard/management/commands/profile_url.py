@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from elearning_portal.profiling import HOTSPOT_LIMIT, format_report, profile_call, save_report
+
+
+def default_host():
+    # The test client has to pass ALLOWED_HOSTS like any other request
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.*') or 'localhost'
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = 'Request a URL through the test client under cProfile and tracemalloc and report hotspots, SQL and allocations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='URL path, e.g. /dashboard/students/')
+        parser.add_argument('--user', help='Username to log in as (default: anonymous).')
+        parser.add_argument('--method', default='GET', choices=['GET', 'POST', 'HEAD'])
+        parser.add_argument('--data', action='append', default=[], metavar='KEY=VALUE',
+                            help='Query/form field; may be repeated.')
+        parser.add_argument('--host', default=None, help='Host header (default: first ALLOWED_HOSTS entry).')
+        parser.add_argument('--sort', default='cumulative', help='pstats sort key (cumulative, tottime, calls...).')
+        parser.add_argument('--limit', type=int, default=HOTSPOT_LIMIT, help='Number of hotspot rows.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Profile the first request instead of warming up with an unprofiled one.')
+        parser.add_argument('--save', action='store_true', help='Also write the report to PROFILE_REPORT_DIR.')
+
+    def handle(self, *args, **options):
+        data = {}
+        for item in options['data']:
+            key, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'--data expects KEY=VALUE, got {item!r}')
+            data.setdefault(key, []).append(value)
+
+        client = Client(HTTP_HOST=options['host'] or default_host())
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}")
+            client.force_login(user)
+
+        request = getattr(client, options['method'].lower())
+        if not options['cold']:
+            # Templates, URL resolvers and connections are warm in a live worker
+            request(options['path'], data)
+        label = f"{options['method']} {options['path']}"
+        response, report = profile_call(request, options['path'], data, label=label)
+
+        text = format_report(report, sort=options['sort'], limit=options['limit'])
+        self.stdout.write(text)
+        style = self.style.SUCCESS if response.status_code < 400 else self.style.WARNING
+        self.stdout.write(style(f'Response: {response.status_code}'))
+        if options['save']:
+            self.stdout.write(f'Saved to {save_report(report, text)}')
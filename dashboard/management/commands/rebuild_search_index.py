@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for courses, assignments and students.'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search needs the SQLite FTS5 extension.')
+        search.create_table()
+        counts = search.rebuild()
+        for kind, count in counts.items():
+            self.stdout.write(f'{kind}: {count} indexed')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import stats
+
+
+class Command(BaseCommand):
+    help = 'Recount the admin dashboard totals and record today\'s trend snapshot. Run daily.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='Queue the run on the background job queue instead of running it here.',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            from jobs.queue import enqueue
+
+            job = enqueue(stats.reconcile)
+            self.stdout.write(f'Queued job {job.pk}.')
+            return
+        before = stats.current()
+        after = stats.reconcile()
+        for field in stats.FIELDS:
+            drift = getattr(after, field) - getattr(before, field)
+            note = f' (corrected by {drift:+d})' if drift else ''
+            self.stdout.write(f'{field}: {getattr(after, field)}{note}')
+        self.stdout.write(self.style.SUCCESS('Institution stats reconciled.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from elearning_portal.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = 'Pre-compile templates and resolve URL patterns.'
+
+    def handle(self, *args, **options):
+        result = warm_up()
+        for name, exc in result['failed_templates']:
+            self.stderr.write(f'{name}: {exc}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Compiled {result['templates']} templates, "
+            f"resolved {result['urls']} URL entries."
+        ))
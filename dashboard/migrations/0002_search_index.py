@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Frozen copy of the index layout in dashboard.search at the time: one FTS5
+# table, rowid = pk * 8 + kind tag (1 course, 2 assignment, 3 student).
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+FILL_TABLE = [
+    "DELETE FROM search_index",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT id * 8 + 1, trim(coalesce(code, '') || ' ' || coalesce(name, '')), coalesce(description, '') "
+    "FROM dashboard_course",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT id * 8 + 2, coalesce(title, ''), coalesce(description, '') "
+    "FROM dashboard_assignment",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT s.id * 8 + 3, trim(coalesce(s.enrollment_id, '') || ' ' || coalesce(u.first_name, '') || ' ' "
+    "|| coalesce(u.last_name, '') || ' ' || coalesce(u.username, '')), '' "
+    "FROM dashboard_student s JOIN accounts_customuser u ON u.id = s.user_id",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in [CREATE_TABLE, *FILL_TABLE]:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
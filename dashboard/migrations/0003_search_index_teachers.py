@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Frozen copy of dashboard.search at the time: teachers join the index with
+# kind tag 4; the other kinds are re-filled unchanged.
+FILL_TABLE = [
+    "DELETE FROM search_index",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT id * 8 + 1, trim(coalesce(code, '') || ' ' || coalesce(name, '')), coalesce(description, '') "
+    "FROM dashboard_course",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT id * 8 + 2, coalesce(title, ''), coalesce(description, '') "
+    "FROM dashboard_assignment",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT s.id * 8 + 3, trim(coalesce(s.enrollment_id, '') || ' ' || coalesce(u.first_name, '') || ' ' "
+    "|| coalesce(u.last_name, '') || ' ' || coalesce(u.username, '')), '' "
+    "FROM dashboard_student s JOIN accounts_customuser u ON u.id = s.user_id",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT t.id * 8 + 4, trim(coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '') || ' ' "
+    "|| coalesce(u.username, '')), coalesce(t.specialty, '') "
+    "FROM dashboard_teacher t JOIN accounts_customuser u ON u.id = t.user_id",
+]
+
+
+def rebuild_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FILL_TABLE:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def recompute_lateness(apps, schema_editor):
+    # is_late was only set on save, so rows can be stale after due-date edits
+    Assignment = apps.get_model('dashboard', 'Assignment')
+    Submission = apps.get_model('dashboard', 'Submission')
+    past_due = Assignment.objects.filter(
+        pk=OuterRef('assignment_id'), due_date__lt=OuterRef('submitted_at'),
+    )
+    Submission.objects.using(schema_editor.connection.alias).update(is_late=Exists(past_due))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_search_index_teachers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assignment',
+            name='teacher',
+            field=models.ForeignKey(limit_choices_to={'role': 'teacher'}, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['is_late', 'assignment'], name='submission_lateness_idx'),
+        ),
+        migrations.RunPython(recompute_lateness, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_stats(apps, schema_editor):
+    db = schema_editor.connection.alias
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    counts = {
+        'teacher_count': apps.get_model('dashboard', 'Teacher').objects.using(db).count(),
+        'student_count': apps.get_model('dashboard', 'Student').objects.using(db).count(),
+        'course_count': apps.get_model('dashboard', 'Course').objects.using(db).count(),
+        'admin_count': User.objects.using(db).filter(role='admin').count(),
+    }
+    apps.get_model('dashboard', 'InstitutionStats').objects.using(db).create(pk=1, **counts)
+    apps.get_model('dashboard', 'StatsSnapshot').objects.using(db).create(
+        date=django.utils.timezone.localdate(), **counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_submission_lateness'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstitutionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('teacher_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('course_count', models.IntegerField(default=0)),
+                ('admin_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Institution stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('teacher_count', models.IntegerField(default=0)),
+                ('student_count', models.IntegerField(default=0)),
+                ('course_count', models.IntegerField(default=0)),
+                ('admin_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_institution_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, help_text='Same for the same statement with any parameters', max_length=16)),
+                ('sql', models.TextField()),
+                ('params_fingerprint', models.CharField(help_text='Hash of the parameters, which are not kept', max_length=16)),
+                ('duration', models.FloatField(help_text='Milliseconds')),
+                ('source', models.CharField(blank=True, help_text='Method and view, or job', max_length=200)),
+                ('frame', models.CharField(blank=True, help_text='Innermost project code on the stack', max_length=255)),
+                ('plan', models.TextField(blank=True)),
+                ('full_scan', models.BooleanField(default=False, help_text='The plan reads a whole table')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Slow queries',
+                'ordering': ['-recorded_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Frozen copy of dashboard.search at the time: an assignment's body now also
+# holds its teacher's username, so the admin can find assignments by teacher.
+FILL_ASSIGNMENTS = [
+    "DELETE FROM search_index WHERE rowid % 8 = 2",
+    "INSERT INTO search_index (rowid, title, body) "
+    "SELECT a.id * 8 + 2, coalesce(a.title, ''), trim(coalesce(a.description, '') || ' ' || coalesce(u.username, '')) "
+    "FROM dashboard_assignment a LEFT JOIN accounts_customuser u ON u.id = a.teacher_id",
+]
+
+
+def rebuild_assignments(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FILL_ASSIGNMENTS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_slow_query_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_assignments, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.conf import settings
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
 
 # -----------------------------
 # Teacher Model
@@ -69,9 +73,49 @@ class Assignment(models.Model):
     def __str__(self):
         return f"{self.title} - {self.course.code}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored due date so save() can tell when it moves
+        instance._loaded_due_date = instance.__dict__.get('due_date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        due_date_changed = (
+            hasattr(self, '_loaded_due_date')
+            and self._loaded_due_date != self.due_date
+            and (update_fields is None or 'due_date' in update_fields)
+        )
+        super().save(*args, **kwargs)
+        self._loaded_due_date = self.due_date
+        if due_date_changed:
+            Submission.objects.filter(assignment=self).recompute_lateness()
+
 # -----------------------------
 # Submission Model
 # -----------------------------
+class SubmissionQuerySet(models.QuerySet):
+    def late(self):
+        return self.filter(is_late=True)
+
+    def on_time(self):
+        return self.filter(is_late=False)
+
+    def recompute_lateness(self):
+        """
+        Re-derive ``is_late`` for these submissions from their assignment's
+        current due date in a single UPDATE; returns the number of rows.
+        """
+        past_due = Assignment.objects.filter(
+            pk=OuterRef('assignment_id'), due_date__lt=OuterRef('submitted_at'),
+        )
+        updated = self.update(is_late=Exists(past_due))
+        # update() sends no signals, so invalidate derived caches by hand
+        bump_version(self.model._meta.label)
+        return updated
+
+
 class Submission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -81,14 +125,74 @@ class Submission(models.Model):
     feedback = models.TextField(blank=True)
     is_late = models.BooleanField(default=False)
 
+    objects = SubmissionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('assignment', 'student')
         ordering = ['-submitted_at']
+        indexes = [
+            # Late/on-time filters, overall and per assignment
+            models.Index(fields=['is_late', 'assignment'], name='submission_lateness_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        if self.assignment.due_date and self.submitted_at:
-            self.is_late = self.submitted_at > self.assignment.due_date
+        # submitted_at is only filled in by auto_now_add during the first save
+        submitted_at = self.submitted_at or timezone.now()
+        self.is_late = submitted_at > self.assignment.due_date
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.student}'s submission for {self.assignment}"
+
+# -----------------------------
+# Institution Stats
+# -----------------------------
+class InstitutionStats(models.Model):
+    """Running totals for the admin dashboard, kept current by dashboard.stats."""
+    teacher_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    course_count = models.IntegerField(default=0)
+    admin_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Institution stats"
+
+    def __str__(self):
+        return f"Institution stats ({self.updated_at:%Y-%m-%d %H:%M})"
+
+class StatsSnapshot(models.Model):
+    """The institution totals as of one day, for dashboard trend lines."""
+    date = models.DateField(unique=True)
+    teacher_count = models.IntegerField(default=0)
+    student_count = models.IntegerField(default=0)
+    course_count = models.IntegerField(default=0)
+    admin_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Stats for {self.date}"
+
+# -----------------------------
+# Slow Query Log
+# -----------------------------
+class SlowQuery(models.Model):
+    """A statement slower than SLOW_QUERY_THRESHOLD_MS, with its plan (see elearning_portal.slowqueries)."""
+    fingerprint = models.CharField(max_length=16, db_index=True, help_text="Same for the same statement with any parameters")
+    sql = models.TextField()
+    params_fingerprint = models.CharField(max_length=16, help_text="Hash of the parameters, which are not kept")
+    duration = models.FloatField(help_text="Milliseconds")
+    source = models.CharField(max_length=200, blank=True, help_text="Method and view, or job")
+    frame = models.CharField(max_length=255, blank=True, help_text="Innermost project code on the stack")
+    plan = models.TextField(blank=True)
+    full_scan = models.BooleanField(default=False, help_text="The plan reads a whole table")
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-recorded_at']
+        verbose_name_plural = "Slow queries"
+
+    def __str__(self):
+        return f"{self.duration:.0f} ms: {self.sql[:60]}"
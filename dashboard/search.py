@@ -0,0 +1,181 @@
+"""
+Full-text search over courses, assignments, students and teachers (SQLite FTS5).
+
+All documents live in one ``search_index`` virtual table with a ``title``
+column (codes, titles, names) and a ``body`` column (descriptions).  The FTS
+rowid encodes both the document kind and the object's primary key, so keeping
+the index in sync on save/delete is a single rowid lookup instead of a scan.
+
+Migrations that build or re-fill the index carry their own SQL copy of this
+layout, so changing ``SOURCES`` needs a migration that re-fills the index.
+"""
+import re
+
+from django.apps import apps as global_apps
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Case, IntegerField, When
+
+TABLE = 'search_index'
+
+# kind -> (rowid tag, model, title fields, body fields)
+SOURCES = {
+    'course': (1, 'dashboard.Course', ('code', 'name'), ('description',)),
+    'assignment': (2, 'dashboard.Assignment', ('title',), ('description', 'teacher__username')),
+    'student': (3, 'dashboard.Student', (
+        'enrollment_id', 'user__first_name', 'user__last_name', 'user__username',
+    ), ()),
+    'teacher': (4, 'dashboard.Teacher', (
+        'user__first_name', 'user__last_name', 'user__username',
+    ), ('specialty',)),
+}
+KIND_SLOTS = 8  # rowid = pk * KIND_SLOTS + tag
+
+# bm25() column weights: a hit in a title/name outranks one in a description
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+REBUILD_BATCH_SIZE = 2000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def create_table(conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+
+
+def _rowid(kind, pk):
+    return pk * KIND_SLOTS + SOURCES[kind][0]
+
+
+def _documents(kind, queryset):
+    _tag, _model, title_fields, body_fields = SOURCES[kind]
+    for row in queryset.values_list('pk', *title_fields, *body_fields).iterator():
+        pk, values = row[0], row[1:]
+        title = ' '.join(str(v) for v in values[:len(title_fields)] if v)
+        body = ' '.join(str(v) for v in values[len(title_fields):] if v)
+        yield _rowid(kind, pk), title, body
+
+
+def _insert(cursor, documents):
+    if documents:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, title, body) VALUES (%s, %s, %s)', documents
+        )
+
+
+def index_objects(kind, pks):
+    """(Re)index the given objects of ``kind``; objects that no longer exist are dropped."""
+    if not is_available() or not pks:
+        return
+    model = global_apps.get_model(SOURCES[kind][1])
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk in pks]
+        )
+        _insert(cursor, list(_documents(kind, model._default_manager.filter(pk__in=pks))))
+
+
+def remove_objects(kind, pks):
+    if not is_available() or not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s', [(_rowid(kind, pk),) for pk in pks]
+        )
+
+
+def rebuild(apps=global_apps, using=DEFAULT_DB_ALIAS):
+    """Empty and re-fill the whole index in batches; returns documents written per kind."""
+    conn = connections[using]
+    counts = {}
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for kind, (_tag, label, _title, _body) in SOURCES.items():
+            model = apps.get_model(label)
+            queryset = model._default_manager.using(conn.alias).order_by('pk')
+            batch, counts[kind] = [], 0
+            for document in _documents(kind, queryset):
+                batch.append(document)
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    _insert(cursor, batch)
+                    counts[kind] += len(batch)
+                    batch = []
+            _insert(cursor, batch)
+            counts[kind] += len(batch)
+    return counts
+
+
+def to_match_query(text):
+    """
+    Turn free user input into a safe FTS5 query: every word must match, as a
+    prefix, so "intro prog" finds "Introduction to Programming".
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join('"%s"*' % token for token in tokens)
+
+
+def search(text, kinds=None, limit=50, offset=0):
+    """
+    Ranked search; returns ``[(kind, pk, score), ...]`` best match first.
+    Lower scores are better (bm25).
+    """
+    match = to_match_query(text)
+    if not match or not is_available():
+        return []
+    tags = {SOURCES[kind][0]: kind for kind in (kinds or SOURCES)}
+    sql = (
+        f'SELECT rowid, bm25({TABLE}, %s, %s) AS score FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s'
+    )
+    params = [TITLE_WEIGHT, BODY_WEIGHT, match]
+    if len(tags) < len(SOURCES):
+        # '%%%%' survives both Python formatting and the DB-API placeholder pass
+        sql += ' AND (rowid %%%% %d) IN (%s)' % (KIND_SLOTS, ', '.join('%s' for _ in tags))
+        params.extend(tags)
+    sql += ' ORDER BY score LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [(tags[rowid % KIND_SLOTS], rowid // KIND_SLOTS, score) for rowid, score in rows]
+
+
+def titles(hits):
+    """Map ``(kind, pk)`` of search hits to their indexed title, one query per kind."""
+    by_kind = {}
+    for kind, pk, _score in hits:
+        by_kind.setdefault(kind, []).append(pk)
+    result = {}
+    for kind, pks in by_kind.items():
+        model = global_apps.get_model(SOURCES[kind][1])
+        for rowid, title, _body in _documents(kind, model._default_manager.filter(pk__in=pks)):
+            result[kind, rowid // KIND_SLOTS] = title
+    return result
+
+
+MAX_HITS = 1000
+
+
+def search_ids(text, kind, limit=MAX_HITS, offset=0):
+    return [pk for _kind, pk, _score in search(text, kinds=[kind], limit=limit, offset=offset)]
+
+
+def ranked_queryset(queryset, text, kind, limit=MAX_HITS):
+    """Filter ``queryset`` to the search hits of ``kind`` and order it by rank."""
+    pks = search_ids(text, kind, limit=limit)
+    if not pks:
+        return queryset.none()
+    ordering = Case(
+        *[When(pk=pk, then=position) for position, pk in enumerate(pks)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(pk__in=pks).order_by(ordering)
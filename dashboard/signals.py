@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from elearning_portal.cache import track_versions
+from . import search, stats
+from .models import Teacher, Student, Course, Assignment, Submission
+
+User = get_user_model()
+
+# Cached fragments and pages key on these stamps (see elearning_portal.cache)
+track_versions(User, Teacher, Student, Course, Assignment, Submission)
+
+# Full-text search index (see dashboard.search)
+SEARCH_KINDS = {Course: 'course', Assignment: 'assignment', Student: 'student', Teacher: 'teacher'}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Assignment)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def update_search_index(sender, instance, **kwargs):
+    search.index_objects(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Assignment)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.remove_objects(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(post_save, sender=User)
+def update_names_in_search_index(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; skip the lookups for those
+    if update_fields and not {'first_name', 'last_name', 'username'} & set(update_fields):
+        return
+    for model in (Student, Teacher):
+        pks = list(model.objects.filter(user=instance).values_list('pk', flat=True))
+        search.index_objects(SEARCH_KINDS[model], pks)
+    # Assignments are indexed with their teacher's username
+    pks = list(Assignment.objects.filter(teacher=instance).values_list('pk', flat=True))
+    search.index_objects('assignment', pks)
+
+
+# Running institution totals (see dashboard.stats)
+STATS_FIELDS = {Teacher: 'teacher_count', Student: 'student_count', Course: 'course_count'}
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        stats.adjust(**{STATS_FIELDS[sender]: 1})
+
+
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def count_deleted(sender, instance, **kwargs):
+    stats.adjust(**{STATS_FIELDS[sender]: -1})
+
+
+@receiver(pre_save, sender=User)
+def remember_role(sender, instance, update_fields=None, **kwargs):
+    # A role change moves a user in or out of the admin count
+    if instance._state.adding or (update_fields is not None and 'role' not in update_fields):
+        return
+    instance._stored_role = (
+        User.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=User)
+def count_admins_saved(sender, instance, created, **kwargs):
+    if created:
+        before = None
+    elif hasattr(instance, '_stored_role'):
+        before = instance.__dict__.pop('_stored_role')
+    else:
+        return
+    stats.adjust(admin_count=(instance.role == 'admin') - (before == 'admin'))
+
+
+@receiver(post_delete, sender=User)
+def count_admins_deleted(sender, instance, **kwargs):
+    if instance.role == 'admin':
+        stats.adjust(admin_count=-1)
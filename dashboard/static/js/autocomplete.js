@@ -0,0 +1,28 @@
+// Turn <select data-autocomplete-url> into select2 boxes that page through the
+// JSON autocomplete endpoints instead of shipping every option in the HTML.
+// data-autocomplete-forward names another form field whose value is sent along.
+(function ($) {
+    $(function () {
+        $('select[data-autocomplete-url]').each(function () {
+            const $select = $(this);
+            const forward = $select.data('autocomplete-forward');
+            $select.select2({
+                placeholder: $select.data('placeholder') || '',
+                allowClear: true,
+                width: '100%',
+                ajax: {
+                    url: $select.data('autocomplete-url'),
+                    dataType: 'json',
+                    delay: 250,
+                    data: function (params) {
+                        const query = {term: params.term || '', page: params.page || 1};
+                        if (forward) {
+                            query[forward] = $select.closest('form').find('[name="' + forward + '"]').val();
+                        }
+                        return query;
+                    }
+                }
+            });
+        });
+    });
+})(jQuery);
@@ -0,0 +1,78 @@
+"""
+Materialised institution totals for the admin dashboard.
+
+Counting every Teacher, Student, Course and admin user on each page load
+is a full table scan per count on SQLite.  Instead a single
+``InstitutionStats`` row holds the totals.  dashboard.signals adjusts it
+with ``F() + delta`` in the same transaction as each insert or delete, so
+the dashboard reads it with one primary-key lookup.  ``reconcile()``
+recounts from scratch to repair drift from bulk operations that send no
+signals (bulk_create, raw SQL), and records a ``StatsSnapshot`` per day for
+trend lines.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
+
+from .models import Course, InstitutionStats, StatsSnapshot, Student, Teacher
+
+STATS_PK = 1
+FIELDS = ('teacher_count', 'student_count', 'course_count', 'admin_count')
+TREND_DAYS = 30
+
+
+def count_all():
+    User = get_user_model()
+    return {
+        'teacher_count': Teacher.objects.count(),
+        'student_count': Student.objects.count(),
+        'course_count': Course.objects.count(),
+        'admin_count': User.objects.filter(role='admin').count(),
+    }
+
+
+def adjust(**deltas):
+    """Add ``deltas`` (e.g. ``teacher_count=1``) to the running totals."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = InstitutionStats.objects.filter(pk=STATS_PK).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()},
+    )
+    if not updated:
+        # First write ever: start from real counts (which include this change)
+        reconcile(snapshot=False)
+    else:
+        bump_version(InstitutionStats._meta.label)
+
+
+def reconcile(snapshot=True):
+    """Recount everything, overwrite the running totals and record today's snapshot."""
+    counts = count_all()
+    with transaction.atomic():
+        stats, _created = InstitutionStats.objects.update_or_create(
+            pk=STATS_PK, defaults={**counts, 'updated_at': timezone.now()},
+        )
+        if snapshot:
+            StatsSnapshot.objects.update_or_create(date=timezone.localdate(), defaults=counts)
+    bump_version(InstitutionStats._meta.label)
+    return stats
+
+
+def current():
+    """The running totals; one primary-key lookup."""
+    return InstitutionStats.objects.filter(pk=STATS_PK).first() or reconcile(snapshot=False)
+
+
+def trend(days=TREND_DAYS):
+    """``{field: [daily values, oldest first]}`` over the last ``days`` snapshots."""
+    since = timezone.localdate() - timedelta(days=days)
+    rows = StatsSnapshot.objects.filter(date__gt=since).order_by('date').values_list(*FIELDS)
+    columns = list(zip(*rows)) or [()] * len(FIELDS)
+    return {field: list(values) for field, values in zip(FIELDS, columns)}
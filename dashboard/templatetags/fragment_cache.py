@@ -0,0 +1,17 @@
+from django import template
+
+from elearning_portal.cache import version_stamp
+
+register = template.Library()
+
+
+@register.simple_tag
+def data_version(*labels):
+    """
+    Combined version stamp of the given models, for use as a ``{% cache %}``
+    vary-on argument::
+
+        {% data_version 'dashboard.Course' as courses_v %}
+        {% cache 600 course_cards request.user.pk courses_v %}...{% endcache %}
+    """
+    return version_stamp(*labels)
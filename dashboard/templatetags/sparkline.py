@@ -0,0 +1,25 @@
+from django import template
+
+register = template.Library()
+
+WIDTH = 100
+HEIGHT = 24
+
+
+@register.filter
+def sparkline(values):
+    """
+    SVG ``points`` for a trend line of ``values`` in a 100x24 viewBox::
+
+        <svg viewBox="0 0 100 24"><polyline points="{{ values|sparkline }}"/></svg>
+    """
+    values = list(values or ())
+    if len(values) < 2:
+        return ''
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    step = WIDTH / (len(values) - 1)
+    return ' '.join(
+        '%.1f,%.1f' % (i * step, HEIGHT - 1 - (value - low) * (HEIGHT - 2) / span)
+        for i, value in enumerate(values)
+    )
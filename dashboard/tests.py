@@ -1,3 +1,344 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from elearning_portal import loadtest, slowqueries
+from elearning_portal.parallel import gather_widgets
+from elearning_portal.warmup import warm_up
+from elearning_portal.cache import get_versions
+
+from . import search, stats
+from .models import (
+    Assignment, Course, InstitutionStats, SlowQuery, StatsSnapshot, Student, Submission, Teacher,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class VersionStampTests(TestCase):
+    def test_stamp_is_bumped_when_the_write_commits(self):
+        before, = get_versions('dashboard.Course')
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(name='Algebra', code='MAT101')
+            # Readers in the meantime still see the old rows, under the old stamp
+            self.assertEqual(get_versions('dashboard.Course'), [before])
+        self.assertEqual(get_versions('dashboard.Course'), [before + 1])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.course = Course.objects.create(name='History', code='HIS101')
+        Assignment.objects.create(
+            title='Essay', description='', course=self.course,
+            teacher=User.objects.create_user('teacher1', password='x', role='teacher'),
+            due_date=timezone.now() + timedelta(days=7),
+        )
+        self.client.force_login(User.objects.create_user('admin1', password='x', role='admin'))
+        self.url = reverse('dashboard:assignment_list')
+
+    def test_unchanged_page_is_not_modified_until_a_write(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.code = 'HIS102'
+            self.course.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertContains(changed, 'HIS102')
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChangelistQueryCountTests(TestCase):
+    """Each changelist costs the same number of queries however many rows it lists."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.client.force_login(User.objects.create_superuser('root', password='x', role='admin'))
+        self.teacher_user = User.objects.create_user('teacher1', password='x', role='teacher')
+        self.teacher = Teacher.objects.create(user=self.teacher_user, specialty='History')
+        self.created = 0
+
+    def add_rows(self, count):
+        User = get_user_model()
+        for _ in range(count):
+            n = self.created = self.created + 1
+            course = Course.objects.create(name=f'Course {n}', code=f'C{n}')
+            course.teachers.add(self.teacher)
+            student = Student.objects.create(
+                user=User.objects.create_user(f'student{n}', password='x', role='student'),
+                enrollment_id=f'E{n}', course='History',
+            )
+            assignment = Assignment.objects.create(
+                title=f'Essay {n}', description='', course=course, teacher=self.teacher_user,
+                due_date=timezone.now() + timedelta(days=7),
+            )
+            assignment.students.add(student)
+            Submission.objects.create(assignment=assignment, student=student, submitted_file='essay.pdf')
+
+    def assertChangelistQueries(self, model_name, num):
+        url = reverse(f'admin:dashboard_{model_name}_changelist')
+        for count in (2, 8):
+            self.add_rows(count)
+            self.client.get(url)  # Fill the cached filter choices
+            with self.assertNumQueries(num):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_course_changelist(self):
+        self.assertChangelistQueries('course', 3)
+
+    def test_assignment_changelist(self):
+        self.assertChangelistQueries('assignment', 6)
+
+    def test_submission_changelist(self):
+        self.assertChangelistQueries('submission', 4)
+
+    def test_student_changelist(self):
+        self.assertChangelistQueries('student', 5)
+
+
+class LatenessTests(TestCase):
+    def test_moving_the_due_date_recomputes_lateness(self):
+        User = get_user_model()
+        assignment = Assignment.objects.create(
+            title='Essay', description='', course=Course.objects.create(name='History', code='HIS101'),
+            teacher=User.objects.create_user('teacher1', password='x', role='teacher'),
+            due_date=timezone.now() + timedelta(days=7),
+        )
+        student = Student.objects.create(
+            user=User.objects.create_user('student1', password='x', role='student'), enrollment_id='E1',
+        )
+        submission = Submission.objects.create(assignment=assignment, student=student, submitted_file='essay.pdf')
+        self.assertFalse(submission.is_late)
+
+        assignment.due_date = timezone.now() - timedelta(days=1)
+        assignment.save()
+        self.assertTrue(Submission.objects.get().is_late)
+        self.assertEqual(Submission.objects.filter(assignment=assignment).recompute_lateness(), 1)
+
+
+class InstitutionStatsTests(TestCase):
+    def totals(self):
+        return {field: getattr(stats.current(), field) for field in stats.FIELDS}
+
+    def test_running_totals_match_a_recount(self):
+        User = get_user_model()
+        admin = User.objects.create_user('admin1', password='x', role='admin')
+        teacher = Teacher.objects.create(user=User.objects.create_user('teacher1', password='x', role='teacher'))
+        for n in range(3):
+            Student.objects.create(
+                user=User.objects.create_user(f'student{n}', password='x', role='student'), enrollment_id=f'E{n}',
+            )
+        Course.objects.create(name='History', code='HIS101')
+        Student.objects.first().delete()
+        teacher.delete()
+        admin.role = 'teacher'
+        admin.save()
+
+        expected = {'teacher_count': 0, 'student_count': 2, 'course_count': 1, 'admin_count': 0}
+        self.assertEqual(self.totals(), expected)
+        self.assertEqual(stats.count_all(), expected)
+
+    def test_reconcile_repairs_drift_from_bulk_writes(self):
+        Course.objects.create(name='History', code='HIS101')
+        Course.objects.bulk_create([Course(name='Maths', code='MAT101'), Course(name='Art', code='ART101')])
+        self.assertEqual(self.totals()['course_count'], 1)
+
+        stats.reconcile()
+        self.assertEqual(self.totals()['course_count'], 3)
+        self.assertEqual(InstitutionStats.objects.count(), 1)
+        self.assertEqual(stats.trend()['course_count'], [3])
+        self.assertEqual(StatsSnapshot.objects.get().date, timezone.localdate())
+
+
+class SlowQueryLogTests(TestCase):
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_select_is_logged_with_its_plan(self):
+        with slowqueries.capture('job test') as recorder:
+            list(Course.objects.filter(name='Algebra'))
+        self.assertTrue(recorder.slow)
+
+        logged = SlowQuery.objects.get(sql__contains='"dashboard_course"."name" =')
+        self.assertEqual(logged.source, 'job test')
+        self.assertEqual(logged.fingerprint, slowqueries.fingerprint(logged.sql))
+        self.assertIn('dashboard/tests.py', logged.frame)
+        self.assertIn('dashboard_course', logged.plan)
+        # name has no index
+        self.assertTrue(logged.full_scan)
+        self.assertNotIn('Algebra', logged.sql + logged.plan)
+
+    def test_in_lists_of_any_length_share_a_fingerprint(self):
+        self.assertEqual(
+            slowqueries.fingerprint('SELECT 1 FROM t WHERE id IN (%s)'),
+            slowqueries.fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'),
+        )
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=5)
+    def test_log_is_trimmed_to_its_size(self):
+        recorder = slowqueries.SlowQueryRecorder(0, 'job test')
+        recorder.slow = [
+            {'connection': None, 'sql': 'INSERT INTO t VALUES (%s)', 'params': [[n]], 'many': True,
+             'duration': 1.0, 'frame': ''}
+            for n in range(slowqueries.TRIM_EVERY + 10)
+        ]
+        slowqueries.save(recorder)
+        self.assertEqual(SlowQuery.objects.count(), 5)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.programming = Course.objects.create(name='Introduction to Programming', code='CS101')
+        self.history = Course.objects.create(
+            name='History', code='HIS101', description='Programming languages through the ages',
+        )
+
+    def test_prefixes_of_every_word_match_and_titles_rank_first(self):
+        self.assertEqual(
+            [(kind, pk) for kind, pk, _score in search.search('intro prog')],
+            [('course', self.programming.pk)],
+        )
+        self.assertEqual(
+            search.search_ids('programming', 'course'), [self.programming.pk, self.history.pk],
+        )
+        self.assertEqual(search.search('programming', kinds=['student']), [])
+
+    def test_operators_in_user_input_are_quoted(self):
+        self.assertEqual(search.to_match_query('prog" OR NOT*'), '"prog"* "OR"* "NOT"*')
+        self.assertEqual(search.search_ids('"prog" NOT (history', 'course'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.programming.name = 'Databases'
+        self.programming.save()
+        self.assertEqual(search.search_ids('databases', 'course'), [self.programming.pk])
+        self.assertEqual(search.search_ids('introduction', 'course'), [])
+
+        self.history.delete()
+        self.assertEqual(search.search_ids('ages', 'course'), [])
+        self.assertEqual(search.rebuild()['course'], 1)
+        self.assertEqual(search.search_ids('databases', 'course'), [self.programming.pk])
+
+
+class GatherWidgetsTests(SimpleTestCase):
+    def test_failed_and_slow_widgets_only_blank_their_own_card(self):
+        def broken():
+            raise ValueError('no data')
+
+        with self.assertLogs('elearning_portal.parallel', 'WARNING'):
+            values, failed = async_to_sync(gather_widgets)(
+                {'ok': lambda: 42, 'broken': broken, 'slow': lambda: time.sleep(1)},
+                timeouts={'slow': 0.05},
+            )
+        self.assertEqual(values, {'ok': 42, 'broken': None, 'slow': None})
+        self.assertEqual(sorted(failed), ['broken', 'slow'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('admin1', password='x', role='admin'))
+
+    def test_page_renders_without_a_failed_widget(self):
+        with mock.patch.object(stats, 'current', side_effect=ValueError), \
+                mock.patch.object(stats, 'trend', return_value={}), \
+                self.assertLogs('elearning_portal.parallel', 'ERROR'):
+            response = self.client.get(reverse('dashboard:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats_ttl'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        reports = tempfile.TemporaryDirectory()
+        self.addCleanup(reports.cleanup)
+        self.reports = reports.name
+        self.enterContext(override_settings(PROFILE_REPORT_DIR=self.reports))
+        self.admin = get_user_model().objects.create_superuser('admin1', password='x', role='admin')
+        self.url = reverse('dashboard:admin_list')
+
+    def test_header_profiles_superuser_requests_only(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(self.url, headers={'X-Profile': '1'})
+
+        report = response.headers['X-Profile']
+        self.assertEqual(sorted(os.listdir(self.reports)), [report[:-len('.txt')] + '.prof', report])
+        with open(os.path.join(self.reports, report)) as report_file:
+            text = report_file.read()
+        self.assertIn(f'GET {self.url}', text)
+        self.assertIn('== SQL (by total time) ==', text)
+
+        self.admin.is_superuser = False
+        self.admin.save()
+        self.client.force_login(self.admin)
+        self.assertNotIn('X-Profile', self.client.get(self.url, headers={'X-Profile': '1'}).headers)
+
+    def test_profile_url_reports_the_queries(self):
+        out = StringIO()
+        call_command('profile_url', self.url, user='admin1', stdout=out)
+        self.assertIn('"accounts_customuser"', out.getvalue())
+        self.assertIn('Response: 200', out.getvalue())
+        self.assertEqual(os.listdir(self.reports), [])
+
+
+class WarmUpTests(SimpleTestCase):
+    def test_every_template_compiles_without_touching_the_database(self):
+        result = warm_up()
+        self.assertEqual(result['failed_templates'], [])
+        self.assertGreater(result['templates'], 0)
+        self.assertGreater(result['urls'], 0)
+
+    def test_command_reports_the_counts(self):
+        out = StringIO()
+        call_command('warmup', stdout=out)
+        self.assertRegex(out.getvalue(), r'Compiled \d+ templates, resolved \d+ URL entries')
+
+
+class LoadTestFixtureTests(TestCase):
+    def test_fixtures_round_trip_and_enable_every_scenario(self):
+        loadtest.create_fixtures('lt', teachers=2, students=4, assignments=3)
+        fixtures = loadtest.load_fixtures('lt')
+
+        self.assertEqual(fixtures['admin'], 'lt_admin')
+        self.assertEqual(fixtures['teachers'], ['lt_teacher0', 'lt_teacher1'])
+        self.assertEqual(len(fixtures['dashboard_assignments']), 6)
+        self.assertNotIn(None, fixtures['tp_courses'])
+        # Half the students start enrolled, with a submission for every assignment
+        self.assertEqual(sorted(map(len, fixtures['tp_submissions'].values())), [2] * 6)
+        self.assertEqual([s.name for s in loadtest.SCENARIOS if not s.is_available(fixtures)], [])
+
+        slots = {fixtures['submission_slots'](None) for _ in range(4 * 6)}
+        self.assertEqual(len(slots), 24)
+        with self.assertRaises(loadtest.ScenarioFailed):
+            fixtures['submission_slots'](None)
+
+        loadtest.delete_fixtures('lt')
+        self.assertFalse(get_user_model().objects.filter(username__startswith='lt_').exists())
+        self.assertFalse(Course.objects.filter(code__startswith='lt-').exists())
+
+    def test_summary_percentiles_and_errors(self):
+        stats = loadtest.Stats()
+        for n in range(1, 101):
+            stats.add(n / 1000, [loadtest.Response(200 if n % 10 else 500, b'', '/')], '')
+        summary = stats.summary(elapsed=10)
+
+        self.assertEqual(summary['percentiles'], {50: 51.0, 90: 91.0, 99: 100.0})
+        self.assertEqual((summary['runs'], summary['throughput'], summary['error_rate']), (100, 10.0, 0.1))
+        self.assertEqual(summary['last_error'], 'HTTP 500 /')
@@ -36,4 +36,11 @@ urlpatterns = [
     path('assignments/add/', views.assignment_create, name='assignment_create'),
     path('assignments/<int:id>/edit/', views.edit_assignment, name='edit_assignment'),
     path('assignments/<int:id>/delete/', views.delete_assignment, name='delete_assignment'),
+
+    # Search
+    path('search/', views.search_view, name='search'),
+
+    # Autocomplete
+    path('autocomplete/teachers/', views.autocomplete_teachers, name='autocomplete_teachers'),
+    path('autocomplete/teacher-users/', views.autocomplete_teacher_users, name='autocomplete_teacher_users'),
 ]
@@ -1,7 +1,14 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth import logout, get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.http import JsonResponse
+from django.views.decorators.http import condition
+from elearning_portal.cache import fragment_is_cached, version_stamp, versioned_etag
+from elearning_portal.parallel import gather_widgets
+from . import search, stats
+from .autocomplete import autocomplete_response
 from .models import Teacher, Student, Assignment, Course
 from .forms import TeacherForm, StudentForm, CourseForm, AssignmentForm, AdminCreationForm, AdminChangeForm
 
@@ -23,15 +30,29 @@ def custom_logout(request):
 # -----------------------------
 # Dashboard View
 # -----------------------------
+STATS_LABELS = ('dashboard.InstitutionStats',)
+STATS_CACHE_TTL = 600
+
+
 @login_required
-def dashboard(request):
-    context = {
-        'teacher_count': Teacher.objects.count(),
-        'student_count': Student.objects.count(),
-        'course_count': Course.objects.count(),
-        'admin_count': User.objects.filter(role='admin').count(),
-    }
-    return render(request, 'dashboard/index.html', context)
+async def dashboard(request):
+    user = await request.auser()
+    stats_v = version_stamp(*STATS_LABELS)
+    context = {'stats_v': stats_v, 'stats_ttl': STATS_CACHE_TTL}
+
+    # The totals come from the materialised stats row (one primary-key
+    # lookup) and the trend lines from the daily snapshots; both only feed
+    # the cached stats cards, and are fetched side by side when stale.
+    if not fragment_is_cached('admin_stats_cards', user.role, stats_v):
+        widgets, failed = await gather_widgets({'totals': stats.current, 'trend': stats.trend})
+        totals = widgets['totals']
+        for field in stats.FIELDS:
+            context[field] = getattr(totals, field) if totals else None
+        context['trend'] = widgets['trend'] or {}
+        if failed:
+            # Don't cache a fragment with missing numbers
+            context['stats_ttl'] = 0
+    return await sync_to_async(render)(request, 'dashboard/index.html', context)
 
 # -----------------------------
 # Admin Views
@@ -135,6 +156,7 @@ def delete_teacher(request, id):
 # Student Views
 # -----------------------------
 @login_required
+@condition(etag_func=versioned_etag('accounts.CustomUser', 'dashboard.Student'))
 def student_list(request):
     students = Student.objects.select_related('user').all()
     return render(request, 'dashboard/student_list.html', {'students': students})
@@ -181,6 +203,7 @@ def delete_student(request, id):
 # Course Views
 # -----------------------------
 @login_required
+@condition(etag_func=versioned_etag('accounts.CustomUser', 'dashboard.Teacher', 'dashboard.Course'))
 def course_list(request):
     courses = Course.objects.prefetch_related('teachers__user').all()
     return render(request, 'dashboard/course_list.html', {'courses': courses})
@@ -216,6 +239,7 @@ def delete_course(request, id):
 # Assignment Views
 # -----------------------------
 @login_required
+@condition(etag_func=versioned_etag('accounts.CustomUser', 'dashboard.Course', 'dashboard.Assignment'))
 def assignment_list(request):
     assignments = Assignment.objects.select_related('course', 'teacher').all()
     return render(request, 'dashboard/assignment_list.html', {'assignments': assignments})
@@ -246,3 +270,40 @@ def delete_assignment(request, id):
     assignment.delete()
     messages.success(request, 'Assignment deleted successfully!')
     return redirect('dashboard:assignment_list')
+
+# -----------------------------
+# Search
+# -----------------------------
+@login_required
+def search_view(request):
+    query = request.GET.get('q', '')
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in search.SOURCES] or None
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 100))
+    except ValueError:
+        limit = 20
+    hits = search.search(query, kinds=kinds, limit=limit)
+    titles = search.titles(hits)
+    return JsonResponse({
+        'query': query,
+        'results': [
+            {'kind': kind, 'id': pk, 'title': titles.get((kind, pk), ''), 'score': score}
+            for kind, pk, score in hits
+        ],
+    })
+
+# -----------------------------
+# Autocomplete
+# -----------------------------
+@login_required
+def autocomplete_teachers(request):
+    teachers = Teacher.objects.filter(user__role='teacher').select_related('user')
+    return autocomplete_response(request, teachers, 'teacher', str)
+
+@login_required
+def autocomplete_teacher_users(request):
+    teachers = Teacher.objects.filter(user__role='teacher').select_related('user')
+    course_id = request.GET.get('course')
+    if course_id and course_id.isdigit():
+        teachers = teachers.filter(course__id=course_id)
+    return autocomplete_response(request, teachers, 'teacher', str, value='user_id')
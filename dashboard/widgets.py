@@ -0,0 +1,41 @@
+from django import forms
+from django.urls import reverse_lazy
+
+
+class AutocompleteMixin:
+    """
+    Select widget that renders only the selected options. The rest are
+    fetched page by page from a JSON autocomplete endpoint as the user types
+    (see static/js/autocomplete.js).
+    """
+
+    def __init__(self, url_name, attrs=None, choices=()):
+        self.url_name = url_name
+        super().__init__(attrs, choices)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse_lazy(self.url_name)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = {str(v) for v in value if v not in (None, '')}
+        if not selected or not hasattr(self.choices, 'queryset'):
+            return []
+        field = self.choices.field
+        to_field_name = getattr(field, 'to_field_name', None) or 'pk'
+        options = []
+        for index, obj in enumerate(self.choices.queryset.filter(**{f'{to_field_name}__in': selected})):
+            option_value = field.prepare_value(obj)
+            options.append(self.create_option(
+                name, option_value, field.label_from_instance(obj), True, index, attrs=attrs,
+            ))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,62 @@
+"""
+Per-row aggregates as correlated subqueries.
+
+``.annotate(Count('a'), Count('b'))`` joins both relations into the outer
+query, so every row is multiplied by ``len(a) * len(b)`` before grouping and
+``distinct=True`` has to de-duplicate that product again.  The expressions
+here compute each aggregate in its own correlated subquery instead::
+
+    submissions = Submission.objects.filter(student=OuterRef('pk'))
+    Student.objects.annotate(
+        submitted=SubqueryCount(submissions),
+        graded=SubqueryCount(submissions.filter(grade__isnull=False)),
+        points=SubquerySum(submissions, 'grade'),
+    )
+
+The outer query keeps one row per object and needs no GROUP BY, and each
+subquery is a single index lookup on the foreign key.
+"""
+from django.db.models import F, FloatField, IntegerField, Subquery
+
+AGGREGATE_ALIAS = '_subquery_value'
+
+
+class SubqueryAggregate(Subquery):
+    """``(SELECT <function>(column) FROM (<queryset>))`` for one outer row."""
+    function = None
+    template = '(SELECT %(function)s(%(column)s) FROM (%(subquery)s) _subquery)'
+
+    def __init__(self, queryset, column, output_field=None, **extra):
+        # Ordering is meaningless inside an aggregate and only costs a sort
+        queryset = queryset.order_by().values(**{AGGREGATE_ALIAS: F(column)})
+        super().__init__(queryset, output_field=output_field, **extra)
+
+    def as_sql(self, compiler, connection, template=None, **extra_context):
+        extra_context.setdefault('function', self.function)
+        extra_context.setdefault('column', connection.ops.quote_name(AGGREGATE_ALIAS))
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+class SubqueryCount(SubqueryAggregate):
+    """Number of rows in ``queryset``; 0 (never NULL) when there are none."""
+    function = 'COUNT'
+
+    def __init__(self, queryset, **extra):
+        super().__init__(queryset, 'pk', output_field=IntegerField(), **extra)
+
+    def as_sql(self, compiler, connection, template=None, **extra_context):
+        extra_context.setdefault('column', '*')
+        return super().as_sql(compiler, connection, template=template, **extra_context)
+
+
+class SubquerySum(SubqueryAggregate):
+    """Sum of ``column`` over ``queryset``; NULL when there are no rows."""
+    function = 'SUM'
+
+
+class SubqueryAvg(SubqueryAggregate):
+    """Average of ``column`` over ``queryset``; NULL when there are no rows."""
+    function = 'AVG'
+
+    def __init__(self, queryset, column, output_field=None, **extra):
+        super().__init__(queryset, column, output_field=output_field or FloatField(), **extra)
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning_portal.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.WARMUP_ON_START:
+    from elearning_portal.warmup import warm_up
+
+    warm_up()
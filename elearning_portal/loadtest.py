@@ -0,0 +1,455 @@
+"""
+Load generator for a running server (manage.py loadtest).
+
+Synthetic users (``<prefix>_admin``, ``<prefix>_teacher<n>`` and
+``<prefix>_student<n>``, all with ``PASSWORD``) and their courses,
+assignments and submissions are written straight to the database by
+``create_fixtures``. A pool of threads then logs in over HTTP, each with
+its own cookie jar, and replays weighted scenarios until the time is up:
+
+* ``dashboard``: the admin dashboard and student list;
+* ``teacher_pages``: a teacher's dashboard and course page;
+* ``student_home``: a student's landing page;
+* ``submit``: a file upload through the admin's Submission form, the only
+  upload path the site serves;
+* ``grade``: a ``grade_assignment`` POST marking a whole assignment;
+* ``enroll``: an ``add_student_to_course`` POST.
+
+URLs are reversed by name from the server's own URLconf. A scenario whose
+views are not routed, or whose data is missing (the teacher_portal scenarios
+need its migrations applied), is reported as skipped. Each scenario run is timed
+end to end. It fails on a connection error, a status of 400 or more, or a
+POST that does not redirect. A response body mentioning "database is
+locked" is counted separately; the message only reaches the client while
+DEBUG is on, so run the server with DEBUG to see them.
+
+Only the standard library is used on the client side, so the harness
+measures the server rather than itself. Run it from another machine, or
+with fewer threads than the node has cores, when CPU saturation is the
+question.
+"""
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import timedelta
+from itertools import count
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.urls import NoReverseMatch, reverse
+from django.utils import timezone
+
+PASSWORD = 'load-test-password'
+LOCKED = b'database is locked'
+PERCENTILES = (50, 90, 99)
+UPLOAD = b'%PDF-1.4\n% load test submission\n' + b'0' * 16 * 1024
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status, body, url):
+        self.status = status
+        self.body = body
+        self.url = url
+
+
+class Session:
+    """One virtual user: a cookie jar, its CSRF token and a login."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+        self.responses = []
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None, files=None):
+        headers = {}
+        body = None
+        if data is not None or files:
+            headers['X-CSRFToken'] = self.csrf_token()
+            if files:
+                body, headers['Content-Type'] = _multipart(data or {}, files)
+            else:
+                body = urllib.parse.urlencode(data, doseq=True).encode()
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as reply:
+                response = Response(reply.status, reply.read(), reply.geturl())
+        except urllib.error.HTTPError as error:
+            response = Response(error.code, error.read(), error.geturl())
+        except OSError as error:
+            response = Response(0, str(error).encode(), self.base_url + path)
+        self.responses.append(response)
+        return response
+
+    def get(self, path):
+        return self.request(path)
+
+    def post(self, path, data, files=None):
+        """POST a form; a form that comes back instead of redirecting was rejected."""
+        response = self.request(path, data, files)
+        if 0 < response.status < 400 and urllib.parse.urlsplit(response.url).path == path:
+            raise ScenarioFailed(f'{path} was not accepted')
+        return response
+
+    def login(self, username):
+        path = reverse('login')
+        self.get(path)
+        self.post(path, {'username': username, 'password': PASSWORD})
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content, content_type) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def url(name, *args):
+    """Reverse ``name``; None when it is not routed."""
+    try:
+        return reverse(name, args=args)
+    except NoReverseMatch:
+        return None
+
+
+# Scenarios: (session, fixtures, rng) -> None, raising ScenarioFailed
+
+def dashboard(session, fixtures, rng):
+    session.get(url('dashboard:dashboard'))
+    session.get(url('dashboard:student_list'))
+
+
+def teacher_pages(session, fixtures, rng):
+    session.get(url('teacher_dashboard'))
+    session.get(url('course_detail', session.course))
+
+
+def student_home(session, fixtures, rng):
+    session.get(url('student_home'))
+
+
+def submit(session, fixtures, rng):
+    assignment, student = fixtures['submission_slots'](rng)
+    session.post(
+        url('admin:dashboard_submission_add'),
+        {'assignment': assignment, 'student': student, 'grade': '', 'feedback': ''},
+        files={'submitted_file': ('essay.pdf', UPLOAD, 'application/pdf')},
+    )
+
+
+def grade(session, fixtures, rng):
+    assignment = rng.choice(fixtures['tp_assignments'][session.course])
+    submissions = fixtures['tp_submissions'].get(assignment, [])
+    session.post(url('grade_assignment', assignment), {
+        f'grade_{submission}': rng.randint(0, 100) for submission in submissions
+    })
+
+
+def enroll(session, fixtures, rng):
+    session.post(url('add_student_to_course', session.course), {
+        'student_id': rng.choice(fixtures['tp_students']),
+    })
+
+
+class Scenario:
+    def __init__(self, name, role, weight, run, url_names, needs=()):
+        self.name = name
+        self.role = role
+        self.weight = weight
+        self.run = run
+        self.url_names = url_names
+        self.needs = needs
+
+    def is_available(self, fixtures):
+        # Reversing with a dummy id is enough to tell whether the view is routed
+        routed = all(
+            url(name) is not None or url(name, 1) is not None
+            for name in self.url_names
+        )
+        return routed and all(fixtures.get(need) for need in self.needs)
+
+
+SCENARIOS = [
+    Scenario('dashboard', 'admin', 4, dashboard, ['dashboard:dashboard', 'dashboard:student_list']),
+    Scenario('teacher_pages', 'teacher', 3, teacher_pages, ['teacher_dashboard', 'course_detail'], ['tp_courses']),
+    Scenario('student_home', 'student', 4, student_home, ['student_home']),
+    Scenario('submit', 'admin', 3, submit, ['admin:dashboard_submission_add'], ['dashboard_assignments']),
+    Scenario('grade', 'teacher', 2, grade, ['grade_assignment'], ['tp_courses']),
+    Scenario('enroll', 'teacher', 1, enroll, ['add_student_to_course'], ['tp_courses']),
+]
+
+
+def _portal():
+    """teacher_portal's models when the app is installed and its tables exist, else None."""
+    if not apps.is_installed('teacher_portal'):
+        return None
+    from teacher_portal import models
+
+    return models if models.Submission._meta.db_table in connection.introspection.table_names() else None
+
+
+def create_fixtures(prefix, teachers, students, assignments):
+    """Create the synthetic users and the data the scenarios work on."""
+    from dashboard import models as dashboard
+
+    portal = _portal()
+
+    User = get_user_model()
+    password = make_password(PASSWORD)  # Hash once: it is deliberately slow
+    admin = User.objects.create(
+        username=f'{prefix}_admin', role='admin', is_staff=True, is_superuser=True, password=password,
+    )
+    teacher_users = User.objects.bulk_create([
+        User(username=f'{prefix}_teacher{n}', role='teacher', is_staff=True, password=password)
+        for n in range(teachers)
+    ])
+    student_users = User.objects.bulk_create([
+        User(username=f'{prefix}_student{n}', role='student', password=password)
+        for n in range(students)
+    ])
+    due = timezone.now() + timedelta(days=30)
+
+    dashboard_teachers = dashboard.Teacher.objects.bulk_create([
+        dashboard.Teacher(user=user, specialty='Load test') for user in teacher_users
+    ])
+    dashboard_courses = dashboard.Course.objects.bulk_create([
+        dashboard.Course(code=f'{prefix}-{n}', name=f'Load test {n}') for n in range(teachers)
+    ])
+    for course, teacher in zip(dashboard_courses, dashboard_teachers):
+        course.teachers.add(teacher)
+    dashboard.Assignment.objects.bulk_create([
+        dashboard.Assignment(
+            course=course, teacher=teacher.user, title=f'Load test {n}', description='',
+            due_date=due, status='published',
+        )
+        for course, teacher in zip(dashboard_courses, dashboard_teachers)
+        for n in range(assignments)
+    ])
+    dashboard.Student.objects.bulk_create([
+        dashboard.Student(user=user, enrollment_id=f'{prefix}-{n}', course='Load test')
+        for n, user in enumerate(student_users)
+    ])
+
+    if portal:
+        courses = portal.Course.objects.bulk_create([
+            portal.Course(teacher=user, code=f'{prefix}-{n}', title=f'Load test {n}')
+            for n, user in enumerate(teacher_users)
+        ])
+        portal_assignments = portal.Assignment.objects.bulk_create([
+            portal.Assignment(course=course, title=f'Load test {n}', due_date=due, status='published')
+            for course in courses
+            for n in range(assignments)
+        ])
+        portal_students = portal.Student.objects.bulk_create([portal.Student(user=user) for user in student_users])
+        # Each course starts with half of the students, leaving the rest to enroll
+        enrolled = portal_students[:len(portal_students) // 2]
+        for course in courses:
+            course.students.add(*enrolled)
+        portal.Submission.objects.bulk_create([
+            portal.Submission(assignment=assignment, student=student)
+            for assignment in portal_assignments
+            for student in enrolled
+        ])
+
+
+def delete_fixtures(prefix):
+    from dashboard import models as dashboard
+
+    portal = _portal()
+
+    if portal:
+        portal.Course.objects.filter(code__startswith=f'{prefix}-').delete()
+        portal.Student.objects.filter(user__username__startswith=f'{prefix}_').delete()
+    dashboard.Course.objects.filter(code__startswith=f'{prefix}-').delete()
+    return get_user_model().objects.filter(username__startswith=f'{prefix}_').delete()[0]
+
+
+def load_fixtures(prefix):
+    """
+    The ids the scenarios need, read back from the database. Submissions
+    left by an earlier run are deleted so that every upload is new.
+    """
+    from dashboard import models as dashboard
+
+    portal = _portal()
+
+    users = get_user_model().objects.filter(username__startswith=f'{prefix}_')
+    fixtures = {
+        'admin': users.filter(role='admin').values_list('username', flat=True).first(),
+        'teachers': list(users.filter(role='teacher').order_by('pk').values_list('username', flat=True)),
+        'students': list(users.filter(role='student').order_by('pk').values_list('username', flat=True)),
+        'dashboard_assignments': list(
+            dashboard.Assignment.objects.filter(course__code__startswith=f'{prefix}-').values_list('pk', flat=True)
+        ),
+        'dashboard_students': list(
+            dashboard.Student.objects.filter(enrollment_id__startswith=f'{prefix}-').values_list('pk', flat=True)
+        ),
+    }
+    # Submissions are unique per (assignment, student): start from none and
+    # hand out every pair once
+    dashboard.Submission.objects.filter(assignment__in=fixtures['dashboard_assignments']).delete()
+    pairs = [
+        (assignment, student)
+        for student in fixtures['dashboard_students']
+        for assignment in fixtures['dashboard_assignments']
+    ]
+    random.shuffle(pairs)
+    slots = count()
+    slot_lock = threading.Lock()
+
+    def submission_slots(rng):
+        with slot_lock:
+            slot = next(slots)
+        if slot >= len(pairs):
+            raise ScenarioFailed('Every (assignment, student) pair has a submission; use more students')
+        return pairs[slot]
+    fixtures['submission_slots'] = submission_slots
+
+    if portal:
+        courses = dict(
+            portal.Course.objects.filter(code__startswith=f'{prefix}-').values_list('teacher__username', 'pk')
+        )
+        fixtures['tp_courses'] = [courses.get(username) for username in fixtures['teachers']]
+        fixtures['tp_assignments'] = {}
+        for pk, course in portal.Assignment.objects.filter(course__in=courses.values()).values_list('pk', 'course_id'):
+            fixtures['tp_assignments'].setdefault(course, []).append(pk)
+        fixtures['tp_submissions'] = {}
+        for pk, assignment in portal.Submission.objects.filter(
+            assignment__course__in=courses.values(),
+        ).values_list('pk', 'assignment_id'):
+            fixtures['tp_submissions'].setdefault(assignment, []).append(pk)
+        fixtures['tp_students'] = list(
+            portal.Student.objects.filter(user__username__startswith=f'{prefix}_').values_list('pk', flat=True)
+        )
+    return fixtures
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+        self.locked = 0
+        self.last_error = ''
+
+    def add(self, latency, responses, error):
+        self.latencies.append(latency)
+        self.requests += len(responses)
+        if error or any(r.status == 0 or r.status >= 400 for r in responses):
+            self.errors += 1
+            self.last_error = error or next(
+                f'HTTP {r.status} {r.url}' for r in responses if r.status == 0 or r.status >= 400
+            )
+        if any(LOCKED in r.body for r in responses):
+            self.locked += 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        runs = len(latencies)
+        return {
+            'runs': runs,
+            'requests': self.requests,
+            'throughput': runs / elapsed if elapsed else 0.0,
+            'percentiles': {
+                p: latencies[min(runs * p // 100, runs - 1)] * 1000 if runs else None for p in PERCENTILES
+            },
+            'max': latencies[-1] * 1000 if runs else None,
+            'error_rate': self.errors / runs if runs else 0.0,
+            'locked': self.locked,
+            'last_error': self.last_error,
+        }
+
+
+def run(base_url, fixtures, users, duration, think=0.0, ramp_up=0.0, scenarios=None, seed=None):
+    """
+    Replay ``scenarios`` (default: SCENARIOS) from ``users`` threads for
+    ``duration`` seconds. Returns ``({name: summary}, skipped names)``.
+    """
+    scenarios = scenarios if scenarios is not None else SCENARIOS
+    active = [s for s in scenarios if s.weight > 0 and s.is_available(fixtures)]
+    skipped = [s.name for s in scenarios if s not in active]
+    if not active:
+        return {}, skipped
+    stats = {scenario.name: Stats() for scenario in active}
+    stats['login'] = Stats()
+    lock = threading.Lock()
+    people_by_role = {'admin': [fixtures['admin']], 'teacher': fixtures['teachers'], 'student': fixtures['students']}
+    stop_at = time.monotonic() + ramp_up + duration
+
+    def record(name, started, session, error=''):
+        latency = time.perf_counter() - started
+        with lock:
+            stats[name].add(latency, session.responses, error)
+        session.responses = []
+
+    def worker(number):
+        rng = random.Random(None if seed is None else seed + number)
+        time.sleep(ramp_up * number / users)
+        sessions = {}
+        while time.monotonic() < stop_at:
+            scenario = rng.choices(active, weights=[s.weight for s in active])[0]
+            session = sessions.get(scenario.role)
+            if session is None:
+                session = Session(base_url)
+                people = people_by_role[scenario.role]
+                index = number % len(people)
+                session.course = None
+                if scenario.role == 'teacher' and fixtures.get('tp_courses'):
+                    # Teachers work on their own course
+                    session.course = fixtures['tp_courses'][index]
+                started = time.perf_counter()
+                try:
+                    session.login(people[index])
+                except ScenarioFailed as error:
+                    record('login', started, session, str(error))
+                    time.sleep(1)
+                    continue
+                record('login', started, session)
+                sessions[scenario.role] = session
+            started = time.perf_counter()
+            try:
+                scenario.run(session, fixtures, rng)
+            except ScenarioFailed as error:
+                record(scenario.name, started, session, str(error))
+            else:
+                record(scenario.name, started, session)
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(users)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Throughput over the time every user was running
+    elapsed = time.monotonic() - started - ramp_up / 2
+    return {name: entry.summary(elapsed) for name, entry in stats.items()}, skipped
@@ -0,0 +1,23 @@
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that does not ``COUNT(*)`` whole tables.
+
+    For an unfiltered queryset the largest primary key (an index lookup) stands
+    in for the row count once the table is big enough that an exact number no
+    longer matters on a changelist; filtered querysets are counted exactly.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct:
+            estimate = self.object_list.aggregate(estimate=Max('pk'))['estimate'] or 0
+            if estimate >= self.estimate_threshold:
+                return estimate
+        return super().count
@@ -0,0 +1,80 @@
+"""
+Run independent, blocking dashboard queries side by side from async views.
+
+Django's async ORM methods (``acount()`` and friends) all hop onto the same
+single sync thread, so awaiting several of them together still runs the SQL
+one statement at a time.  ``gather_widgets`` instead hands each query to a
+small, bounded thread pool (every pool thread holds its own DB connection)
+and waits for all of them, so the page costs as much as its slowest widget
+rather than the sum of all of them.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.WIDGET_QUERY_WORKERS, thread_name_prefix='widget',
+        )
+    return _executor
+
+
+def _run(func):
+    # Pool threads outlive requests, so apply the usual CONN_MAX_AGE rules
+    # around each query just like the request/response cycle does.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather_widgets(widgets, timeout=None, timeouts=None):
+    """
+    Evaluate ``{name: callable}`` concurrently and return ``(values, failed)``.
+
+    A widget that raises or runs longer than its timeout (``timeouts[name]``,
+    else ``timeout``, else ``settings.WIDGET_QUERY_TIMEOUT`` seconds) comes
+    back as ``None`` and its name is listed in ``failed``, so one slow
+    query degrades a single card instead of the whole page.  The query
+    itself cannot be cancelled; it finishes in the background.
+    """
+    if not widgets:
+        return {}, []
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    timeouts = timeouts or {}
+    default_timeout = timeout or settings.WIDGET_QUERY_TIMEOUT
+    names = list(widgets)
+    results = await asyncio.gather(
+        *[
+            asyncio.wait_for(
+                loop.run_in_executor(executor, _run, widgets[name]),
+                timeouts.get(name, default_timeout),
+            )
+            for name in names
+        ],
+        return_exceptions=True,
+    )
+    values, failed = {}, []
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            if isinstance(result, asyncio.TimeoutError):
+                logger.warning('Dashboard widget %r timed out', name)
+            else:
+                logger.error('Dashboard widget %r failed', name, exc_info=result)
+            values[name] = None
+            failed.append(name)
+        else:
+            values[name] = result
+    return values, failed
@@ -0,0 +1,187 @@
+"""
+On-demand profiling of single requests.
+
+``profile_call`` runs a callable under cProfile and tracemalloc while timing
+every SQL statement it sends through the current thread's database
+connections. ``format_report`` turns the result into plain text with three
+parts: the call-stack hotspots, the SQL grouped by statement (repeated
+statements point at N+1 queries) and the lines that allocated the most
+memory. ``save_report`` writes the text and a pstats dump into
+``PROFILE_REPORT_DIR``. The dump can be opened with ``python -m pstats`` or
+snakeviz.
+
+There are two entry points: ``manage.py profile_url`` and
+``ProfileRequestMiddleware``, which profiles a live request when a
+superuser sends the ``PROFILE_REQUEST_HEADER`` header. Profiling slows a
+request down several times over, so only one request per process is
+profiled at a time. Queries run on other threads (such as the dashboard
+widget pool) are not captured.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+HOTSPOT_LIMIT = 30
+QUERY_LIMIT = 15
+ALLOCATION_LIMIT = 15
+TRACEMALLOC_FRAMES = 10
+SQL_WIDTH = 300
+WHITESPACE = re.compile(r'\s+')
+
+_lock = threading.Lock()
+
+
+class QueryTimer:
+    """``execute_wrapper`` that records the time taken by each statement."""
+
+    def __init__(self):
+        self.statements = defaultdict(lambda: [0, 0.0])
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            entry = self.statements[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+            self.count += 1
+            self.duration += elapsed
+
+    def top(self, limit=QUERY_LIMIT):
+        """``[(sql, count, seconds)]``, the most time-consuming statements first."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+def profile_call(func, *args, label='', **kwargs):
+    """Run ``func(*args, **kwargs)``; returns ``(result, report)``."""
+    profiler = cProfile.Profile()
+    queries = QueryTimer()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    started = timezone.now()
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        _current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    allocations = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    return result, {
+        'label': label,
+        'started': started,
+        'duration': duration,
+        'profiler': profiler,
+        'queries': queries,
+        'peak_memory': peak,
+        'allocations': [stat for stat in allocations if stat.size_diff > 0][:ALLOCATION_LIMIT],
+        'allocated': sum(stat.size_diff for stat in allocations if stat.size_diff > 0),
+    }
+
+
+def _size(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+def format_report(report, sort='cumulative', limit=HOTSPOT_LIMIT):
+    queries = report['queries']
+    out = io.StringIO()
+    out.write(f"{report['label']}\n")
+    out.write(
+        f"{report['started']:%Y-%m-%d %H:%M:%S %Z}: {report['duration'] * 1000:.1f} ms, "
+        f"{queries.count} queries in {queries.duration * 1000:.1f} ms, "
+        f"{_size(report['allocated'])} allocated, peak {_size(report['peak_memory'])}\n"
+    )
+
+    out.write(f'\n== Hotspots (by {sort}) ==\n')
+    stats = pstats.Stats(report['profiler'], stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    out.write('\n== SQL (by total time) ==\n')
+    for sql, count, seconds in queries.top():
+        statement = WHITESPACE.sub(' ', sql)[:SQL_WIDTH]
+        out.write(f'{seconds * 1000:9.2f} ms {count:5}x  {statement}\n')
+
+    out.write('\n== Allocations (by size) ==\n')
+    for stat in report['allocations']:
+        frame = stat.traceback[0]
+        out.write(
+            f'{_size(stat.size_diff):>10} {stat.count_diff:7} blocks  '
+            f'{frame.filename}:{frame.lineno}\n'
+        )
+    return out.getvalue()
+
+
+def save_report(report, text=None):
+    """Write the text report and a pstats dump; returns the text file's path."""
+    directory = settings.PROFILE_REPORT_DIR
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^\w.-]+', '_', report['label']).strip('_')[:80] or 'profile'
+    base = os.path.join(directory, f"{report['started']:%Y%m%d-%H%M%S-%f}-{slug}")
+    report['profiler'].dump_stats(base + '.prof')
+    with open(base + '.txt', 'w') as report_file:
+        report_file.write(text if text is not None else format_report(report))
+    return base + '.txt'
+
+
+class ProfileRequestMiddleware:
+    """
+    Profile one live request when a superuser sends ``PROFILE_REQUEST_HEADER``.
+
+    The report is saved with ``save_report`` and its file name returned in the
+    same header of the response. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = settings.PROFILE_REQUEST_HEADER
+
+    def __call__(self, request):
+        if (
+            self.header not in request.headers
+            or not request.user.is_superuser
+            or not _lock.acquire(blocking=False)
+        ):
+            return self.get_response(request)
+        try:
+            label = f'{request.method} {request.get_full_path()}'
+            response, report = profile_call(self.get_response, request, label=label)
+            path = save_report(report)
+        finally:
+            _lock.release()
+        response[self.header] = os.path.basename(path)
+        return response
@@ -8,7 +8,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-$$2wu&3bdl&97=7u&na@f$6y&sx9@c&$q3f9wv$g#pos$9k&m%'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = []
 
@@ -22,14 +22,19 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'dashboard.apps.DashboardConfig',  # ✅ Added group member's app
+    'jobs',
+    'teacher_portal.apps.TeacherPortalConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'elearning_portal.middleware.StaticFilesMiddleware',
+    'elearning_portal.slowqueries.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'elearning_portal.profiling.ProfileRequestMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -40,17 +45,31 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # ✅ Compatible with os.path
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compiled templates are kept in memory for the life of the worker
+            # in production; in development they are re-read on every request.
+            'loaders': [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ] if DEBUG else [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
 
+# Pre-compile templates and resolve URLs when a WSGI/ASGI worker starts, so
+# the first real request does not pay for it.
+WARMUP_ON_START = not DEBUG
+
 WSGI_APPLICATION = 'elearning_portal.wsgi.application'
 
 # Database
@@ -61,6 +80,16 @@ DATABASES = {
     }
 }
 
+# Cache
+# File-based so every worker process on the node shares the version stamps and
+# cached fragments (see elearning_portal.cache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache'),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -80,6 +109,18 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]  # ✅ Development
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')    # ✅ Production
 
+# collectstatic writes content-hashed names plus .gz/.br variants, which
+# StaticFilesMiddleware serves with far-future immutable cache headers.
+# STATIC_ROOT is build output: run collectstatic on every deploy (README).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'elearning_portal.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'                                   # ✅ Added for uploads
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -87,5 +128,71 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Custom user model
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# Authenticated users (with their permissions) are kept in process memory for
+# this many seconds, saving the user and permission queries on most requests.
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+AUTH_USER_CACHE_TTL = 30
+
+# Sessions are read from the cache and written through to the database;
+# set DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies
+# to keep them client-side instead.
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Background jobs (manage.py runworker). Workers refresh the lock of a running
+# job every JOBS_HEARTBEAT_INTERVAL seconds; a lock older than JOBS_LOCK_TIMEOUT
+# means the worker died and the job is handed to another one (or failed once
+# it has used its attempts). Failed jobs are retried after JOBS_RETRY_DELAY
+# seconds, doubling each time.
+JOBS_LOCK_TIMEOUT = 600
+JOBS_HEARTBEAT_INTERVAL = 60
+JOBS_RETRY_DELAY = 30
+
+# Async dashboards run their independent widget queries on this many threads
+# (each with its own DB connection); a widget slower than
+# WIDGET_QUERY_TIMEOUT seconds is shown as unavailable instead of holding up
+# the page.
+WIDGET_QUERY_WORKERS = 8
+WIDGET_QUERY_TIMEOUT = 2.0
+
+# Students get a notification when an assignment they have not submitted is
+# due within each of these many hours (manage.py send_deadline_reminders).
+DEADLINE_REMINDER_WINDOWS = (72, 24, 1)
+
+# manage.py archive_term moves a closed term's assignments, submissions and
+# grades into the teacher_portal.Archived* tables, ARCHIVE_BATCH_SIZE
+# assignments per transaction; activity older than ACTIVITY_ARCHIVE_DAYS
+# goes with it.
+ARCHIVE_BATCH_SIZE = 200
+ACTIVITY_ARCHIVE_DAYS = 365
+
+# Uploaded submission files are hashed, typed, text-extracted and thumbnailed
+# in the background on a pool of this many processes; at most
+# SUBMISSION_TEXT_LIMIT characters of text are kept per file.
+SUBMISSION_PROCESS_WORKERS = 2
+SUBMISSION_TEXT_LIMIT = 100_000
+SUBMISSION_THUMBNAIL_SIZE = (320, 320)
+
+# Near-duplicate detection: submission texts are split into word shingles of
+# this length and MinHashed with SIMILARITY_NUM_PERM permutations, which LSH
+# splits into SIMILARITY_BANDS bands. Pairs estimated at least
+# SIMILARITY_THRESHOLD similar are reported on the assignment page.
+SIMILARITY_SHINGLE_SIZE = 5
+SIMILARITY_NUM_PERM = 128
+SIMILARITY_BANDS = 32
+SIMILARITY_THRESHOLD = 0.5
+
+# A superuser request carrying the PROFILE_REQUEST_HEADER header is profiled
+# (call stacks, SQL, allocations), as is anything run through
+# manage.py profile_url; reports are written to PROFILE_REPORT_DIR.
+PROFILE_REQUEST_HEADER = 'X-Profile'
+PROFILE_REPORT_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS (None turns this off) are
+# logged with their EXPLAIN plan to dashboard.SlowQuery, visible in the admin;
+# the log keeps the newest SLOW_QUERY_LOG_SIZE entries.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG_SIZE = 1000
+SLOW_QUERY_SQL_LENGTH = 10_000
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -0,0 +1,162 @@
+"""
+Slow-query log.
+
+Inside ``capture()`` every statement sent through the current thread's
+database connections is timed by an ``execute_wrapper``. Statements slower
+than ``SLOW_QUERY_THRESHOLD_MS`` are noted together with the view or job
+that ran them and the innermost stack frame from project code. The wrapper
+only reads a clock, and the stack is walked only for statements over the
+threshold.
+
+When the block ends, with the wrapper removed, each noted SELECT is run
+again under ``EXPLAIN`` (``EXPLAIN QUERY PLAN`` on SQLite). The results are
+stored as ``dashboard.SlowQuery`` rows, which the admin lists, flagging
+plans that scan a whole table. The table is a ring buffer: every
+``TRIM_EVERY`` rows, whatever is older than the newest
+``SLOW_QUERY_LOG_SIZE`` is dropped.
+
+``SlowQueryMiddleware`` captures every request and jobs.queue captures
+every job. Statements are grouped by a fingerprint of their SQL. ``IN``
+lists of any length share one fingerprint, and parameters are only kept as
+a hash, so no row values end up in the log.
+"""
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Max
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+WHITESPACE = re.compile(r'\s+')
+# Whole-table scans: SQLite's "SCAN t" without an index, PostgreSQL's Seq Scan
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)|Seq Scan')
+TRIM_EVERY = 50
+
+_active = ContextVar('elearning_portal_slow_queries', default=None)
+
+
+def _digest(text):
+    return blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+def fingerprint(sql):
+    """Identifies a statement whatever its parameters and ``IN`` list lengths."""
+    return _digest(IN_LIST.sub('IN (...)', WHITESPACE.sub(' ', sql).strip()))
+
+
+def calling_frame():
+    """``path:line in function`` of the innermost project frame on the stack."""
+    root = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(root) and frame.filename != __file__ and 'site-packages' not in frame.filename:
+            return f'{frame.filename[len(root) + 1:]}:{frame.lineno} in {frame.name}'
+    return ''
+
+
+class SlowQueryRecorder:
+    """``execute_wrapper`` noting the statements slower than ``threshold`` milliseconds."""
+
+    def __init__(self, threshold, label=''):
+        self.threshold = threshold
+        self.label = label
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= self.threshold:
+                self.slow.append({
+                    'connection': context['connection'],
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'duration': duration,
+                    'frame': calling_frame(),
+                })
+
+
+def explain(connection, sql, params):
+    """The plan of one SELECT as text, or '' when it cannot be explained."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as error:
+        return f'(EXPLAIN failed: {error})'
+    # SQLite returns (id, parent, notused, detail) rows; others one text column
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def save(recorder):
+    from dashboard.models import SlowQuery
+
+    entries = []
+    for query in recorder.slow:
+        plan = '' if query['many'] else explain(query['connection'], query['sql'], query['params'])
+        entries.append(SlowQuery(
+            fingerprint=fingerprint(query['sql']),
+            sql=query['sql'][:settings.SLOW_QUERY_SQL_LENGTH],
+            params_fingerprint=_digest(repr(query['params'])),
+            duration=query['duration'],
+            source=recorder.label[:200],
+            frame=query['frame'][:255],
+            plan=plan,
+            full_scan=bool(FULL_SCAN.search(plan)),
+        ))
+    saved = SlowQuery.objects.bulk_create(entries)
+    # Ring buffer: every TRIM_EVERY rows, drop whatever fell off the end
+    newest = saved[-1].pk or SlowQuery.objects.aggregate(newest=Max('pk'))['newest']
+    if newest // TRIM_EVERY != (newest - len(saved)) // TRIM_EVERY:
+        SlowQuery.objects.filter(pk__lte=newest - settings.SLOW_QUERY_LOG_SIZE).delete()
+
+
+@contextmanager
+def capture(label=''):
+    """Log the slow statements of the block (see the module docstring)."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold is None or _active.get() is not None:
+        yield None
+        return
+    recorder = SlowQueryRecorder(threshold, label)
+    token = _active.set(recorder)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield recorder
+    finally:
+        _active.reset(token)
+        if recorder.slow:
+            try:
+                save(recorder)
+            except DatabaseError:
+                logger.exception('Could not save %s slow queries of %s', len(recorder.slow), recorder.label)
+
+
+class SlowQueryMiddleware:
+    """Capture the slow queries of every request, labelled with its view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with capture() as recorder:
+            response = self.get_response(request)
+            if recorder is not None:
+                # Resolved by now, so the log can name the view
+                match = getattr(request, 'resolver_match', None)
+                recorder.label = f'{request.method} {match.view_name if match else request.path}'
+        return response
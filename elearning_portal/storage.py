@@ -0,0 +1,96 @@
+"""
+Static files storage that fingerprints and precompresses at collectstatic time.
+
+Every collected file gets a content-hashed copy (via the manifest storage) and,
+for text-like assets, ``.gz`` and ``.br`` siblings next to it.  The static
+middleware then serves the smallest variant the client accepts with far-future
+cache headers, so neither compression nor hashing happens per request.
+
+``STATIC_ROOT`` is build output and is not committed: deploys run
+``manage.py collectstatic --noinput``, which writes the hashed files, their
+variants and ``staticfiles.json``. A name missing from that manifest
+(collectstatic not run yet, or a template naming an asset that does not
+exist) is logged and served under its plain URL instead of failing the page.
+"""
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are still written
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico',
+    '.ttf', '.eot', '.otf',
+}
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Files smaller than this are not worth the extra request-time stat()
+    min_compress_size = 256
+    # A variant is only kept when it saves at least 5% over the original
+    max_compress_ratio = 0.95
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Names already warned about, so a missing asset is logged once
+        self.missing_names = set()
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if name not in self.missing_names:
+                self.missing_names.add(name)
+                logger.warning('%s is not in the staticfiles manifest; run collectstatic', name)
+            return name
+
+    def compressors(self):
+        yield '.gz', _gzip
+        if brotli is not None:
+            yield '.br', _brotli
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        if not self.exists(name):
+            return
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < self.min_compress_size:
+            return
+
+        for suffix, compressor in self.compressors():
+            compressed = compressor(data)
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            if len(compressed) > len(data) * self.max_compress_ratio:
+                continue
+            self._save(compressed_name, ContentFile(compressed))
+            yield compressed_name
@@ -6,5 +6,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('dashboard/', include(('dashboard.urls', 'dashboard'), namespace='dashboard')),  # Added with namespace
+    path('teacher/', include('teacher_portal.urls')),
     path('', lambda request: redirect('login')),  #  Keeps redirect to login
 ]
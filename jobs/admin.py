@@ -0,0 +1,18 @@
+from django.contrib import admin
+from elearning_portal.paginator import EstimatedCountPaginator
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'priority', 'run_at', 'attempts', 'max_attempts', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected jobs')
+    def requeue(self, request, queryset):
+        queryset.update(status=Job.QUEUED, attempts=0, locked_by='', locked_at=None)
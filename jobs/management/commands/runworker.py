@@ -0,0 +1,61 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import claim, purge_finished, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs on a thread or process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at the same time.')
+        parser.add_argument('--processes', action='store_true', help='Use a process pool instead of threads.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Exit once no due jobs are left.')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+        if options['processes']:
+            # Children must not inherit the parent's open DB connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job')
+
+        self.stdout.write(f'Worker {worker_id} started ({concurrency} {"processes" if options["processes"] else "threads"}).')
+        running = set()
+        last_maintenance = 0
+        try:
+            while True:
+                now = time.monotonic()
+                if now - last_maintenance > 60:
+                    requeue_stale()
+                    purge_finished()
+                    last_maintenance = now
+
+                free = concurrency - len(running)
+                claimed = claim(worker_id, limit=free) if free else []
+                if options['processes']:
+                    connections.close_all()
+                for pk in claimed:
+                    running.add(executor.submit(run_job, pk))
+
+                if running:
+                    done, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    running = set(running)
+                elif options['burst']:
+                    break
+                elif not claimed:
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping: waiting for running jobs to finish...')
+        finally:
+            executor.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f'Worker {worker_id} stopped.'))
@@ -0,0 +1,181 @@
+"""
+Durable background jobs stored in the database.
+
+``enqueue()`` writes a Job row in the caller's transaction, so the job only
+becomes visible to workers if the surrounding work commits.
+``enqueue_on_commit()`` defers the insert itself until after the commit.
+Workers (``manage.py runworker``) claim due jobs with a conditional UPDATE,
+so no two workers run the same job. A job whose worker dies is re-claimed
+once its lock goes stale, which gives at-least-once delivery: tasks must be
+safe to run twice.
+
+While a job runs, a heartbeat thread refreshes its ``locked_at`` every
+``JOBS_HEARTBEAT_INTERVAL`` seconds, so only jobs whose worker is gone go
+stale, however long they take. The outcome is only written while the job
+is still locked by the worker that ran it. A job that keeps killing its
+worker uses up its attempts like one that raises, and then fails.
+"""
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from elearning_portal import slowqueries
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task_name(task):
+    if isinstance(task, str):
+        return task
+    return f'{task.__module__}.{task.__qualname__}'
+
+
+def enqueue(task, args=(), kwargs=None, priority=0, run_at=None, delay=None, max_attempts=3):
+    """
+    Queue ``task`` (a module-level function or its dotted path) to run in a
+    worker with JSON-serialisable ``args``/``kwargs``. ``run_at`` or ``delay``
+    (seconds or timedelta) schedules it for later.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+        if delay:
+            run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    return Job.objects.create(
+        task=task_name(task),
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=priority,
+        run_at=run_at,
+        max_attempts=max_attempts,
+    )
+
+
+def enqueue_on_commit(task, *enqueue_args, **enqueue_kwargs):
+    """Like ``enqueue()``, but only once the current transaction commits."""
+    transaction.on_commit(lambda: enqueue(task, *enqueue_args, **enqueue_kwargs))
+
+
+def requeue_stale(now=None):
+    """
+    Release jobs whose worker stopped heartbeating (crashed or killed).
+    Jobs that have used up their attempts are failed instead.
+    """
+    now = now or timezone.now()
+    stale_before = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale_before)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, locked_by='', locked_at=None,
+        last_error='Worker stopped heartbeating on the last attempt.',
+    )
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(worker_id, limit=1, now=None):
+    """Claim up to ``limit`` due jobs for ``worker_id`` and return their ids."""
+    now = now or timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        .order_by('-priority', 'run_at')
+        .values_list('pk', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for pk in candidates:
+        # Only one worker can flip a given row from queued to running
+        won = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if won:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def retry_delay(attempts):
+    """Exponential back-off: base, 2x base, 4x base, ..."""
+    return timedelta(seconds=settings.JOBS_RETRY_DELAY * 2 ** max(attempts - 1, 0))
+
+
+def heartbeat(job):
+    """Refresh the lock of a running ``job``; False once another worker holds it."""
+    return bool(Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+        locked_at=timezone.now(),
+    ))
+
+
+class Heartbeat(threading.Thread):
+    """Calls ``heartbeat(job)`` every ``JOBS_HEARTBEAT_INTERVAL`` seconds until stopped."""
+
+    def __init__(self, job):
+        super().__init__(name=f'job-{job.pk}-heartbeat', daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOBS_HEARTBEAT_INTERVAL):
+                try:
+                    if not heartbeat(self.job):
+                        logger.warning('Job %s (%s) lost its lock while running', self.job.pk, self.job.task)
+                        return
+                except DatabaseError:
+                    # Retried on the next beat; the lock timeout leaves room for a few misses
+                    logger.exception('Heartbeat of job %s failed', self.job.pk)
+        finally:
+            # This thread's own connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(pk):
+    """Execute one claimed job and record the outcome. Safe to call in any thread/process."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk, status=Job.RUNNING)
+    except Job.DoesNotExist:
+        return None
+    beat = Heartbeat(job)
+    beat.start()
+    try:
+        with slowqueries.capture(label=job.task):
+            import_string(job.task)(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.task, job.attempts)
+        if job.attempts < job.max_attempts:
+            update = {'status': Job.QUEUED, 'run_at': timezone.now() + retry_delay(job.attempts)}
+        else:
+            update = {'status': Job.FAILED, 'finished_at': timezone.now()}
+        outcome, fields = False, dict(last_error=error, locked_by='', locked_at=None, **update)
+    else:
+        outcome, fields = True, dict(status=Job.DONE, finished_at=timezone.now(), last_error='')
+    finally:
+        beat.stop()
+    try:
+        # A job requeued as stale may already be running elsewhere; leave it to that worker
+        if not Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(**fields):
+            logger.warning('Job %s (%s) lost its lock; outcome not recorded', job.pk, job.task)
+            return None
+        return outcome
+    finally:
+        close_old_connections()
+
+
+def purge_finished(older_than_days=7):
+    """Delete finished jobs so the queue table stays small."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Job.objects.filter(
+        Q(status=Job.DONE) | Q(status=Job.FAILED), finished_at__lt=cutoff,
+    ).delete()[0]
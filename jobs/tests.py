@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .queue import claim, enqueue, heartbeat, requeue_stale, run_job
+
+CALLS = []
+
+
+def record_call(value):
+    CALLS.append(value)
+
+
+def always_fail():
+    raise ValueError('boom')
+
+
+def steal_lock():
+    # What requeue_stale and another worker's claim do to a job that went stale
+    Job.objects.update(locked_by='other-worker')
+
+
+class ClaimTests(TestCase):
+    def test_claims_due_jobs_by_priority_once(self):
+        low = enqueue(record_call, args=[1])
+        high = enqueue(record_call, args=[2], priority=5)
+        enqueue(record_call, args=[3], delay=3600)
+
+        self.assertEqual(claim('a', limit=1), [high.pk])
+        self.assertEqual(claim('b', limit=5), [low.pk])
+        self.assertEqual(claim('c', limit=5), [])
+
+        high.refresh_from_db()
+        self.assertEqual((high.status, high.locked_by, high.attempts), (Job.RUNNING, 'a', 1))
+
+
+class RequeueStaleTests(TestCase):
+    def running_job(self, attempts, max_attempts=3, age=3600):
+        return Job.objects.create(
+            task='jobs.tests.record_call', status=Job.RUNNING, locked_by='dead',
+            locked_at=timezone.now() - timedelta(seconds=age),
+            attempts=attempts, max_attempts=max_attempts,
+        )
+
+    @override_settings(JOBS_LOCK_TIMEOUT=600)
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        retry = self.running_job(attempts=1)
+        exhausted = self.running_job(attempts=3)
+        alive = self.running_job(attempts=1, age=10)
+
+        self.assertEqual(requeue_stale(), 1)
+
+        retry.refresh_from_db()
+        exhausted.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((retry.status, retry.locked_by), (Job.QUEUED, ''))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+        self.assertEqual(alive.status, Job.RUNNING)
+
+    def test_heartbeat_keeps_the_lock_fresh(self):
+        job = self.running_job(attempts=1)
+        self.assertTrue(heartbeat(job))
+        self.assertEqual(requeue_stale(), 0)
+
+        job.locked_by = 'someone-else'
+        self.assertFalse(heartbeat(job))
+
+
+class RunJobTests(TransactionTestCase):
+    # run_job closes connections the way a worker does, which a TestCase's
+    # wrapping transaction would not survive
+
+    def setUp(self):
+        CALLS.clear()
+
+    def run_claimed(self, job):
+        self.assertEqual(claim('w'), [job.pk])
+        return run_job(job.pk)
+
+    def test_success(self):
+        job = enqueue(record_call, args=['x'])
+        self.assertIs(self.run_claimed(job), True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(CALLS, ['x'])
+
+    @override_settings(JOBS_RETRY_DELAY=30)
+    def test_failures_back_off_then_fail(self):
+        job = enqueue(always_fail, max_attempts=2)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertIs(self.run_claimed(job), False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, 1, ''))
+        self.assertIn('ValueError: boom', job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertIs(self.run_claimed(job), False)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_outcome_is_dropped_once_the_lock_is_lost(self):
+        job = enqueue(steal_lock)
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertIsNone(self.run_claimed(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, 'other-worker'))
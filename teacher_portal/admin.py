@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib import admin
 from django.contrib.auth import get_user_model
-from .models import Course, Assignment, Student, Submission
+from elearning_portal.cache import get_or_set_versioned
+from elearning_portal.paginator import EstimatedCountPaginator
+from .models import Course, Assignment, AssignmentReminder, GradeCategory, GradeEvent, Student, Submission, SubmissionMetadata
 
 User = get_user_model()
 
@@ -15,10 +17,39 @@ class CourseForm(forms.ModelForm):
         # Only show staff users as teacher options
         self.fields['teacher'].queryset = User.objects.filter(is_staff=True)
 
+class CourseTeacherFilter(admin.SimpleListFilter):
+    title = 'teacher'
+    parameter_name = 'teacher'
+
+    def lookups(self, request, model_admin):
+        # Only users that actually teach a course, cached until courses or users change
+        def build():
+            rows = (
+                User.objects.filter(taught_courses__isnull=False).distinct()
+                .order_by('username').values_list('id', 'username', 'first_name', 'last_name')
+            )
+            return [(pk, f"{first} {last}".strip() or username) for pk, username, first, last in rows]
+        return get_or_set_versioned(
+            'admin:course_teacher_choices', ['teacher_portal.Course', 'accounts.CustomUser'], build
+        )
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(teacher_id=self.value())
+        return queryset
+
+class GradeCategoryInline(admin.TabularInline):
+    model = GradeCategory
+    extra = 0
+
 class CourseAdmin(admin.ModelAdmin):
     form = CourseForm
+    inlines = (GradeCategoryInline,)
     list_display = ('code', 'title', 'teacher')
-    list_filter = ('teacher',)
+    list_filter = (CourseTeacherFilter,)
+    list_select_related = ('teacher',)
+    search_fields = ('code', 'title')
+    autocomplete_fields = ('teacher', 'students')
     
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -42,6 +73,10 @@ class AssignmentForm(forms.ModelForm):
 class AssignmentAdmin(admin.ModelAdmin):
     form = AssignmentForm
     list_display = ('title', 'course', 'due_date')
+    list_select_related = ('course',)
+    autocomplete_fields = ('course',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
@@ -60,15 +95,70 @@ class StudentForm(forms.ModelForm):
 
 class StudentAdmin(admin.ModelAdmin):
     form = StudentForm
+    list_select_related = ('user',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name')
+    autocomplete_fields = ('user',)
+    # (app_label, model_name, field_name) of the autocomplete that enrols students
+    ENROLMENT_FIELD = ('teacher_portal', 'course', 'students')
    
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        if request.user.is_superuser:
+        if request.user.is_superuser or self.is_enrolment_lookup(request):
             return qs
         # Only show students enrolled in teacher's courses
-        return qs.filter(courses__teacher=request.user).distinct()
+        return qs.filter(enrolled_courses__teacher=request.user).distinct()
+
+    def is_enrolment_lookup(self, request):
+        # Enrolling a student must be able to find students outside the teacher's courses
+        match = getattr(request, 'resolver_match', None)
+        return (
+            match is not None and match.url_name == 'autocomplete'
+            and tuple(request.GET.get(key) for key in ('app_label', 'model_name', 'field_name')) == self.ENROLMENT_FIELD
+        )
+
+class SubmissionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'submitted_date', 'grade', 'is_graded', 'is_late')
+    list_filter = ('is_graded', 'is_late')
+    list_select_related = ('student__user', 'assignment__course')
+    raw_id_fields = ('assignment', 'student')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class AssignmentReminderAdmin(admin.ModelAdmin):
+    list_display = ('assignment', 'window', 'sent_at', 'recipients')
+    list_filter = ('window',)
+    list_select_related = ('assignment__course',)
+    raw_id_fields = ('assignment',)
+
+class SubmissionMetadataAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'status', 'mime_type', 'size', 'page_count', 'processed_at')
+    list_filter = ('status', 'mime_type')
+    search_fields = ('sha256', 'file_name')
+    raw_id_fields = ('submission',)
+    exclude = ('text',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+class GradeEventAdmin(admin.ModelAdmin):
+    list_display = ('ts', 'assignment_id', 'student_id', 'source', 'value', 'changed_by_id')
+    list_filter = ('source',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # The history is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 admin.site.register(Course, CourseAdmin)
 admin.site.register(Assignment, AssignmentAdmin)
 admin.site.register(Student, StudentAdmin)
-admin.site.register(Submission)
\ No newline at end of file
+admin.site.register(Submission, SubmissionAdmin)
+admin.site.register(AssignmentReminder, AssignmentReminderAdmin)
+admin.site.register(SubmissionMetadata, SubmissionMetadataAdmin)
+admin.site.register(GradeEvent, GradeEventAdmin)
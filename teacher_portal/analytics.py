@@ -0,0 +1,153 @@
+"""
+Grade statistics for assignments and courses.
+
+Marks are pulled with ``values_list`` (no model instances) into NumPy
+arrays and every statistic is computed over the whole array at once, so a
+course with tens of thousands of graded submissions is summarised in a few
+milliseconds.  As in teacher_portal.grading, a student's mark is the
+submission's grade unless a gradebook entry (``Grade.value``) overrides it.
+Results are cached against the Submission/Grade/Assignment version stamps
+and are recomputed only after a mark or an assignment changes.
+
+Course-level figures use percentages of each assignment's ``total_points``
+so assignments marked out of different totals can be compared.
+"""
+from itertools import chain
+
+import numpy as np
+
+from elearning_portal.cache import get_or_set_versioned
+
+from .models import Grade, Submission
+
+PERCENTILES = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10  # 0-10%, 10-20%, ..., 90-100%
+CACHE_LABELS = ('teacher_portal.Submission', 'teacher_portal.Grade', 'teacher_portal.Assignment')
+
+
+def _marks(**lookup):
+    """
+    ``assignment_ids, student_ids, marks, totals`` columns (float arrays) of
+    every mark of the assignments matched by ``lookup``.
+    """
+    fields = ('assignment_id', 'student_id', 'assignment__total_points')
+    marks = {
+        (assignment, student): (grade, total)
+        for assignment, student, total, grade in Submission.objects.filter(grade__isnull=False, **lookup)
+        .order_by().values_list(*fields, 'grade')
+    }
+    # A Grade entry is the teacher's final word on the mark
+    marks.update(
+        ((assignment, student), (value, total))
+        for assignment, student, total, value in Grade.objects.filter(value__isnull=False, **lookup)
+        .order_by().values_list(*fields, 'value')
+    )
+    rows = ((assignment, student, mark, total) for (assignment, student), (mark, total) in marks.items())
+    data = np.fromiter(chain.from_iterable(rows), dtype=float, count=4 * len(marks))
+    return data.reshape(-1, 4).T
+
+
+def describe(percentages):
+    """Summary statistics of a 1-D array of scores given as percentages."""
+    count = int(percentages.size)
+    if not count:
+        return {'count': 0}
+    percentiles = np.percentile(percentages, PERCENTILES)
+    histogram, edges = np.histogram(
+        np.clip(percentages, 0, 100), bins=HISTOGRAM_BINS, range=(0, 100),
+    )
+    peak = histogram.max()
+    return {
+        'count': count,
+        'mean': float(percentages.mean()),
+        'median': float(percentiles[PERCENTILES.index(50)]),
+        'std': float(percentages.std()),
+        'min': float(percentages.min()),
+        'max': float(percentages.max()),
+        'percentiles': dict(zip(PERCENTILES, percentiles.tolist())),
+        'histogram': [
+            {
+                'low': int(low), 'high': int(high), 'count': int(n),
+                'height': round(100 * n / peak) if peak else 0,
+            }
+            for low, high, n in zip(edges[:-1], edges[1:], histogram)
+        ],
+    }
+
+
+def z_scores(values):
+    """Standard scores of ``values``; all zeros when there is no spread."""
+    if not values.size:
+        return np.zeros_like(values)
+    std = values.std()
+    if not std:
+        return np.zeros_like(values)
+    return (values - values.mean()) / std
+
+
+def _group_means_medians(groups, values):
+    """Per-group count, mean and median of ``values``, vectorised (no Python loop per group)."""
+    keys, inverse, counts = np.unique(groups, return_inverse=True, return_counts=True)
+    means = np.bincount(inverse, weights=values) / counts
+    # Sort by (group, value); each group's median sits in the middle of its run
+    ordered = values[np.lexsort((values, inverse))]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+    return keys, counts, means, medians
+
+
+def compute_assignment_stats(assignment):
+    _assignment_ids, student_ids, grades, _totals = _marks(assignment=assignment)
+    total = assignment.total_points or 100
+    stats = describe(grades * 100 / total)
+    stats['total_points'] = total
+    stats['z_scores'] = dict(zip(student_ids.astype(int).tolist(), z_scores(grades).round(2).tolist()))
+    return stats
+
+
+def compute_course_stats(course):
+    assignment_ids, student_ids, grades, totals = _marks(assignment__course=course)
+    totals[totals == 0] = 100
+    percentages = grades * 100 / totals
+    stats = describe(percentages)
+    if not stats['count']:
+        stats.update(assignments={}, students=[])
+        return stats
+
+    keys, counts, means, medians = _group_means_medians(assignment_ids, percentages)
+    stats['assignments'] = {
+        int(key): {'count': int(n), 'mean': float(mean), 'median': float(median)}
+        for key, n, mean, median in zip(keys, counts, means, medians)
+    }
+
+    keys, counts, means, _medians = _group_means_medians(student_ids, percentages)
+    order = np.argsort(-means, kind='stable')
+    student_z = z_scores(means)
+    stats['students'] = [
+        {
+            'student_id': int(keys[i]), 'graded': int(counts[i]),
+            'mean': float(means[i]), 'z_score': round(float(student_z[i]), 2),
+        }
+        for i in order
+    ]
+    return stats
+
+
+def assignment_stats(assignment):
+    """Cached grade statistics for one assignment, plus a z-score per student id."""
+    return get_or_set_versioned(
+        'grade_stats:assignment:%s' % assignment.pk, CACHE_LABELS,
+        lambda: compute_assignment_stats(assignment),
+    )
+
+
+def course_stats(course):
+    """
+    Cached grade statistics for a course: the overall distribution, the mean
+    and median of every assignment, and each student's average with its
+    z-score within the course (best first).
+    """
+    return get_or_set_versioned(
+        'grade_stats:course:%s' % course.pk, CACHE_LABELS,
+        lambda: compute_course_stats(course),
+    )
@@ -0,0 +1,268 @@
+"""
+Read-only JSON API over the teacher's portal data.
+
+Rows are built with ``.values()`` (no model instances, no ``__str__`` that
+follows foreign keys) from only the columns the client asks for:
+
+    GET api/assignments/?fields=id,title,due_date,course_code&course=3&limit=100
+
+``fields`` picks a sparse fieldset from the resource's ``fields``. Derived
+fields (joins, counts) cost nothing unless they are requested. Lists use
+keyset pagination on the primary key: ``next`` is an opaque cursor to pass
+back as ``?cursor=``, so deep pages cost the same as the first one. Every
+response carries a version-stamp ETag and is encoded without whitespace.
+"""
+import base64
+import binascii
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Exists, F, OuterRef
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_GET
+
+from elearning_portal.annotations import SubqueryCount
+from elearning_portal.cache import versioned_etag
+
+from .models import Assignment, Course, Grade, Student, Submission
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+COMPACT = {'separators': (',', ':')}
+
+
+class Resource:
+    """
+    One API collection.
+
+    ``fields`` maps public names to an ORM path or an expression;
+    ``default_fields`` are returned when ``?fields=`` is absent; ``filters``
+    maps accepted query parameters to integer lookups; ``labels`` are the
+    models whose version stamps make up the ETag.
+    """
+
+    def __init__(self, queryset, fields, default_fields, filters=None, labels=()):
+        self.queryset = queryset
+        self.fields = fields
+        self.default_fields = default_fields
+        self.filters = filters or {}
+        self.labels = labels
+
+    def get_queryset(self, user):
+        return self.queryset(user)
+
+
+def _taught_students(user):
+    enrolled = Course.students.through.objects.filter(student=OuterRef('pk'), course__teacher=user)
+    return Student.objects.filter(Exists(enrolled))
+
+
+RESOURCES = {
+    'courses': Resource(
+        lambda user: Course.objects.filter(teacher=user),
+        fields={
+            'id': 'id',
+            'code': 'code',
+            'title': 'title',
+            'description': 'description',
+            'created_at': 'created_at',
+            'student_count': lambda: SubqueryCount(
+                Course.students.through.objects.filter(course=OuterRef('pk'))
+            ),
+            'assignment_count': lambda: SubqueryCount(Assignment.objects.filter(course=OuterRef('pk'))),
+        },
+        default_fields=('id', 'code', 'title'),
+        labels=('teacher_portal.Course', 'teacher_portal.Student', 'teacher_portal.Assignment'),
+    ),
+    'assignments': Resource(
+        lambda user: Assignment.objects.filter(course__teacher=user),
+        fields={
+            'id': 'id',
+            'course_id': 'course_id',
+            'course_code': 'course__code',
+            'title': 'title',
+            'description': 'description',
+            'due_date': 'due_date',
+            'total_points': 'total_points',
+            'status': 'status',
+            'created_at': 'created_at',
+            'attachment': 'attachment',
+            'submission_count': lambda: SubqueryCount(Submission.objects.filter(assignment=OuterRef('pk'))),
+        },
+        default_fields=('id', 'course_id', 'title', 'due_date', 'status'),
+        filters={'course': 'course_id'},
+        labels=('teacher_portal.Course', 'teacher_portal.Assignment', 'teacher_portal.Submission'),
+    ),
+    'submissions': Resource(
+        lambda user: Submission.objects.filter(assignment__course__teacher=user),
+        fields={
+            'id': 'id',
+            'assignment_id': 'assignment_id',
+            'student_id': 'student_id',
+            'student_username': 'student__user__username',
+            'submitted_date': 'submitted_date',
+            'file': 'file',
+            'grade': 'grade',
+            'is_graded': 'is_graded',
+            'is_late': 'is_late',
+            'feedback': 'feedback',
+        },
+        default_fields=('id', 'assignment_id', 'student_id', 'submitted_date', 'grade', 'is_late'),
+        filters={'assignment': 'assignment_id', 'student': 'student_id', 'course': 'assignment__course_id'},
+        labels=('accounts.CustomUser', 'teacher_portal.Course', 'teacher_portal.Assignment', 'teacher_portal.Submission'),
+    ),
+    'students': Resource(
+        _taught_students,
+        fields={
+            'id': 'id',
+            'user_id': 'user_id',
+            'username': 'user__username',
+            'first_name': 'user__first_name',
+            'last_name': 'user__last_name',
+            'email': 'user__email',
+            'enrollment_date': 'enrollment_date',
+        },
+        default_fields=('id', 'username', 'first_name', 'last_name'),
+        labels=('accounts.CustomUser', 'teacher_portal.Course', 'teacher_portal.Student'),
+    ),
+    'grades': Resource(
+        lambda user: Grade.objects.filter(assignment__course__teacher=user),
+        fields={
+            'id': 'id',
+            'assignment_id': 'assignment_id',
+            'student_id': 'student_id',
+            'value': 'value',
+            'feedback': 'feedback',
+            'graded_at': 'graded_at',
+        },
+        default_fields=('id', 'assignment_id', 'student_id', 'value'),
+        filters={'assignment': 'assignment_id', 'student': 'student_id', 'course': 'assignment__course_id'},
+        labels=('teacher_portal.Course', 'teacher_portal.Assignment', 'teacher_portal.Grade'),
+    ),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def get_resource(name):
+    try:
+        return RESOURCES[name]
+    except KeyError:
+        raise Http404(f"Unknown resource '{name}'")
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(str(pk).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest('Invalid cursor.')
+
+
+def selected_fields(request, resource):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(resource.default_fields)
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise BadRequest(
+            'Unknown field(s): %s. Available: %s.' % (', '.join(unknown), ', '.join(resource.fields))
+        )
+    return list(dict.fromkeys(names))
+
+
+def get_limit(request):
+    try:
+        return max(1, min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be an integer.')
+
+
+def apply_filters(request, resource, queryset):
+    for param, lookup in resource.filters.items():
+        value = request.GET.get(param)
+        if value is None:
+            continue
+        if not value.isdigit():
+            raise BadRequest(f'{param} must be an integer id.')
+        queryset = queryset.filter(**{lookup: int(value)})
+    return queryset
+
+
+def rows(queryset, resource, fields):
+    """``queryset.values()`` of just ``fields``, keyed by their public names."""
+    plain, renamed = [], {}
+    for name in fields:
+        spec = resource.fields[name]
+        if callable(spec):
+            renamed[name] = spec()
+        elif spec == name:
+            plain.append(name)
+        else:
+            renamed[name] = F(spec)
+    # The primary key is always fetched for the cursor, under a private name
+    renamed['_cursor'] = F('pk')
+    return queryset.order_by().values(*plain, **renamed)
+
+
+def api_etag(request, resource, pk=None):
+    if resource not in RESOURCES:
+        return None
+    return versioned_etag(*RESOURCES[resource].labels)(request)
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, json_dumps_params=COMPACT)
+
+
+def teacher_required(view):
+    @login_required
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_staff:
+            raise PermissionDenied
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as error:
+            return json_response({'error': str(error)}, status=400)
+    return wrapper
+
+
+@require_GET
+@teacher_required
+@condition(etag_func=api_etag)
+def api_list(request, resource):
+    resource_obj = get_resource(resource)
+    fields = selected_fields(request, resource_obj)
+    limit = get_limit(request)
+    queryset = apply_filters(request, resource_obj, resource_obj.get_queryset(request.user))
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(pk__gt=decode_cursor(cursor))
+
+    page = list(rows(queryset, resource_obj, fields).order_by('pk')[:limit + 1])
+    more = len(page) > limit
+    page = page[:limit]
+    next_cursor = encode_cursor(page[-1]['_cursor']) if more else None
+    return json_response({
+        'results': [{name: row[name] for name in fields} for row in page],
+        'next': next_cursor,
+    })
+
+
+@require_GET
+@teacher_required
+@condition(etag_func=api_etag)
+def api_detail(request, resource, pk):
+    resource_obj = get_resource(resource)
+    fields = selected_fields(request, resource_obj)
+    row = rows(resource_obj.get_queryset(request.user).filter(pk=pk), resource_obj, fields).first()
+    if row is None:
+        raise Http404
+    return json_response({name: row[name] for name in fields})
@@ -0,0 +1,179 @@
+"""
+Cold archive for closed terms.
+
+Dashboards, gradebooks and the API scan Assignment, Submission, Grade and
+ActivityLog, so every past term makes them slower. ``archive_term()`` moves a
+closed term's assignments (with their submissions and grades) into the
+``Archived*`` tables, ``ARCHIVE_BATCH_SIZE`` assignments per transaction, so
+a large term never holds a long write lock and an interrupted run can simply
+be restarted. ``archive_activity()`` does the same for old activity entries.
+Archived rows keep their primary keys.
+
+Only the marks and the submitted files are archived. What was derived from
+the files for live grading (``SubmissionMetadata``: extracted text, MinHash,
+thumbnail; ``SimilarityBucket`` and ``SimilarityMatch`` rows) is deleted
+with the term. The thumbnail files go once the batch commits
+(teacher_portal.signals).
+
+Nothing reads the archive tables except the read API below. It answers from
+live and archived rows in a single UNION query:
+
+    transcript(student)     every submission with its course and term
+    grade_history(student)  every Grade
+    activity(user)          a user's activity feed
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
+
+from .models import (
+    ActivityLog,
+    ArchivedActivityLog,
+    ArchivedAssignment,
+    ArchivedGrade,
+    ArchivedSubmission,
+    Assignment,
+    AssignmentReminder,
+    Grade,
+    SimilarityBucket,
+    SimilarityMatch,
+    Submission,
+    SubmissionMetadata,
+)
+
+ARCHIVE_LABELS = (
+    'teacher_portal.Assignment', 'teacher_portal.Submission', 'teacher_portal.Grade',
+    'teacher_portal.SubmissionMetadata', 'teacher_portal.SimilarityMatch', 'teacher_portal.ActivityLog',
+)
+
+
+def _batches(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _copy(queryset, archive_model):
+    """Insert the rows of ``queryset`` into ``archive_model``, column for column."""
+    live_columns = {field.attname for field in queryset.model._meta.concrete_fields}
+    columns = [
+        field.attname for field in archive_model._meta.concrete_fields
+        if field.attname in live_columns
+    ]
+    return len(archive_model.objects.bulk_create(
+        [archive_model(**row) for row in queryset.order_by().values(*columns)]
+    ))
+
+
+def archive_term(term, batch_size=None):
+    """
+    Move every assignment of courses in ``term`` into the archive, with its
+    submissions and grades. The courses stay where they are. Returns the
+    number of rows moved per table.
+    """
+    if not term:
+        raise ValueError("A term is required; courses without one are never archived.")
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    moved = {'assignments': 0, 'submissions': 0, 'grades': 0}
+    ids = list(
+        Assignment.objects.filter(course__term=term).order_by('pk').values_list('pk', flat=True)
+    )
+    for batch in _batches(ids, batch_size):
+        with transaction.atomic():
+            submissions = Submission.objects.filter(assignment__in=batch)
+            grades = Grade.objects.filter(assignment__in=batch)
+            moved['assignments'] += _copy(Assignment.objects.filter(pk__in=batch), ArchivedAssignment)
+            moved['submissions'] += _copy(submissions, ArchivedSubmission)
+            moved['grades'] += _copy(grades, ArchivedGrade)
+            # Children first, so deleting the assignments has nothing left to cascade to
+            AssignmentReminder.objects.filter(assignment__in=batch).delete()
+            SimilarityMatch.objects.filter(assignment__in=batch).delete()
+            SimilarityBucket.objects.filter(assignment__in=batch).delete()
+            SubmissionMetadata.objects.filter(submission__assignment__in=batch).delete()
+            grades.delete()
+            submissions.delete()
+            Assignment.objects.filter(pk__in=batch).delete()
+    if ids:
+        bump_version(*ARCHIVE_LABELS)
+    return moved
+
+
+def archive_activity(before=None, batch_size=None):
+    """Move activity entries older than ``before`` (default: ACTIVITY_ARCHIVE_DAYS ago)."""
+    if before is None:
+        before = timezone.now() - timedelta(days=settings.ACTIVITY_ARCHIVE_DAYS)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE * 10
+    ids = list(ActivityLog.objects.filter(timestamp__lt=before).order_by('pk').values_list('pk', flat=True))
+    for batch in _batches(ids, batch_size):
+        with transaction.atomic():
+            _copy(ActivityLog.objects.filter(pk__in=batch), ArchivedActivityLog)
+            ActivityLog.objects.filter(pk__in=batch).delete()
+    if ids:
+        bump_version('teacher_portal.ActivityLog')
+    return len(ids)
+
+
+def compact():
+    """Refresh planner statistics and, on SQLite, give the freed pages back to the OS."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+        if connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+
+
+def _transcript_rows(queryset, archived):
+    return queryset.order_by().values(
+        'id', 'submitted_date', 'grade', 'is_graded', 'is_late', 'feedback',
+        term=F('assignment__course__term'),
+        course_code=F('assignment__course__code'),
+        course_title=F('assignment__course__title'),
+        assignment_title=F('assignment__title'),
+        due_date=F('assignment__due_date'),
+        total_points=F('assignment__total_points'),
+        archived=Value(archived),
+    )
+
+
+def transcript(student):
+    """All of ``student``'s submissions, live and archived, oldest first."""
+    return _transcript_rows(Submission.objects.filter(student=student), False).union(
+        _transcript_rows(ArchivedSubmission.objects.filter(student=student), True),
+        all=True,
+    ).order_by('submitted_date')
+
+
+def _grade_rows(queryset, archived):
+    return queryset.order_by().values(
+        'id', 'value', 'feedback', 'graded_at',
+        term=F('assignment__course__term'),
+        course_code=F('assignment__course__code'),
+        assignment_title=F('assignment__title'),
+        archived=Value(archived),
+    )
+
+
+def grade_history(student):
+    """All of ``student``'s Grade rows, live and archived, oldest first."""
+    return _grade_rows(Grade.objects.filter(student=student), False).union(
+        _grade_rows(ArchivedGrade.objects.filter(student=student), True),
+        all=True,
+    ).order_by('graded_at')
+
+
+def _activity_rows(queryset, archived):
+    return queryset.order_by().values(
+        'id', 'action', 'object_type', 'object_id', 'object_name', 'timestamp',
+        archived=Value(archived),
+    )
+
+
+def activity(user):
+    """``user``'s activity entries, live and archived, newest first."""
+    return _activity_rows(ActivityLog.objects.filter(user=user), False).union(
+        _activity_rows(ArchivedActivityLog.objects.filter(user=user), True),
+        all=True,
+    ).order_by('-timestamp')
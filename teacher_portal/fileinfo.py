@@ -0,0 +1,200 @@
+"""
+Inspect one uploaded file: checksum, size, sniffed type, page count,
+extracted text and a preview thumbnail.
+
+This module runs inside worker processes (see teacher_portal.processing), so
+it deliberately imports nothing from Django: it takes a path and returns a
+plain dict. Pillow and pypdf are optional. Without pypdf, PDF pages are
+counted from the page objects and no text is extracted. Without Pillow,
+only the preview images embedded in office documents are used, unscaled.
+"""
+import hashlib
+import io
+import mimetypes
+import re
+import zipfile
+from xml.etree import ElementTree
+
+try:
+    from PIL import Image
+except ImportError:  # optional
+    Image = None
+
+try:
+    import pypdf
+except ImportError:  # optional
+    pypdf = None
+
+CHUNK_SIZE = 1024 * 1024
+SNIFF_SIZE = 2048
+
+SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'RIFF', 'image/webp'),
+    (b'{\\rtf', 'application/rtf'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/msword'),
+    (b'PK\x03\x04', 'application/zip'),
+)
+
+# Office Open XML packages are recognised by their main part
+OOXML_PARTS = (
+    ('word/document.xml', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    ('ppt/presentation.xml', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'),
+    ('xl/workbook.xml', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+)
+EMBEDDED_THUMBNAILS = ('docProps/thumbnail.jpeg', 'docProps/thumbnail.png', 'Thumbnails/thumbnail.png')
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+ODF_TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+def sniff_mime_type(head, name, archive=None):
+    """The MIME type from the file's leading bytes, falling back to its name."""
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            break
+    else:
+        mime_type = None
+    if mime_type == 'image/webp' and head[8:12] != b'WEBP':
+        mime_type = None
+    if mime_type == 'application/zip' and archive is not None:
+        names = set(archive.namelist())
+        if 'mimetype' in names:
+            # OpenDocument stores its type uncompressed as the first member
+            return archive.read('mimetype').decode('ascii', 'replace').strip()
+        for part, ooxml_type in OOXML_PARTS:
+            if part in names:
+                return ooxml_type
+    if mime_type:
+        return mime_type
+    guessed = mimetypes.guess_type(name)[0]
+    if _looks_like_text(head):
+        return guessed if guessed and guessed.startswith('text/') else 'text/plain'
+    return guessed or 'application/octet-stream'
+
+
+def _looks_like_text(head):
+    if b'\x00' in head:
+        return False
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as error:
+        # A multi-byte character cut off by the sniff window is still text
+        return error.start >= len(head) - 3
+    return True
+
+
+def _docx_text(archive):
+    root = ElementTree.fromstring(archive.read('word/document.xml'))
+    return '\n'.join(''.join(p.itertext()) for p in root.iter(f'{WORD_NS}p'))
+
+
+def _odf_text(archive):
+    root = ElementTree.fromstring(archive.read('content.xml'))
+    blocks = (root.iter(f'{ODF_TEXT_NS}{tag}') for tag in ('h', 'p'))
+    return '\n'.join(''.join(block.itertext()) for tag_blocks in blocks for block in tag_blocks)
+
+
+def _office_pages(archive):
+    """Page count recorded by the authoring application, if any."""
+    for part, pattern in (
+        ('docProps/app.xml', rb'<Pages>(\d+)</Pages>'),
+        ('meta.xml', rb'meta:page-count="(\d+)"'),
+    ):
+        try:
+            match = re.search(pattern, archive.read(part))
+        except KeyError:
+            continue
+        if match:
+            return int(match.group(1))
+    return None
+
+
+def _pdf_details(path, text_limit):
+    if pypdf is None:
+        with open(path, 'rb') as handle:
+            return len(PDF_PAGE.findall(handle.read())) or None, ''
+    reader = pypdf.PdfReader(path)
+    text, length = [], 0
+    for page in reader.pages:
+        if length >= text_limit:
+            break
+        page_text = page.extract_text() or ''
+        text.append(page_text)
+        length += len(page_text)
+    return len(reader.pages), '\n'.join(text)
+
+
+def _thumbnail(data, size):
+    """PNG bytes of ``data`` (an image) scaled to fit ``size``; unscaled without Pillow."""
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail(size)
+        out = io.BytesIO()
+        image.convert('RGBA' if image.mode in ('P', 'LA', 'RGBA') else 'RGB').save(out, 'PNG')
+    return out.getvalue()
+
+
+def _thumbnail_type(data):
+    return 'png' if data.startswith(b'\x89PNG') else 'jpg'
+
+
+def inspect_file(path, name, text_limit, thumbnail_size):
+    """
+    Everything we store about the file at ``path`` (originally called
+    ``name``): ``sha256``, ``size``, ``mime_type``, ``page_count``, ``text``
+    and ``thumbnail`` (image bytes or None) with its ``thumbnail_type``.
+    """
+    digest, size = hashlib.sha256(), 0
+    with open(path, 'rb') as handle:
+        head = handle.read(SNIFF_SIZE)
+        handle.seek(0)
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+
+    info = {
+        'sha256': digest.hexdigest(), 'size': size, 'page_count': None, 'text': '',
+        'thumbnail': None, 'thumbnail_type': '',
+    }
+    archive = None
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            archive = zipfile.ZipFile(path)
+        except zipfile.BadZipFile:
+            archive = None
+    try:
+        mime_type = info['mime_type'] = sniff_mime_type(head, name, archive)
+        if mime_type == 'application/pdf':
+            info['page_count'], info['text'] = _pdf_details(path, text_limit)
+        elif mime_type.startswith('text/'):
+            with open(path, 'rb') as handle:
+                info['text'] = handle.read(text_limit * 4).decode('utf-8', 'replace')
+        elif mime_type.startswith('image/') and Image is not None:
+            with open(path, 'rb') as handle:
+                info['thumbnail'] = _thumbnail(handle.read(), thumbnail_size)
+        elif archive is not None:
+            info['page_count'] = _office_pages(archive)
+            names = set(archive.namelist())
+            if 'word/document.xml' in names:
+                info['text'] = _docx_text(archive)
+            elif mime_type.startswith('application/vnd.oasis.opendocument.text'):
+                info['text'] = _odf_text(archive)
+            for part in EMBEDDED_THUMBNAILS:
+                if part in names:
+                    info['thumbnail'] = _thumbnail(archive.read(part), thumbnail_size)
+                    break
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if info['thumbnail']:
+        info['thumbnail_type'] = _thumbnail_type(info['thumbnail'])
+    info['text'] = info['text'][:text_limit]
+    return info
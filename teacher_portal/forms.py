@@ -1,14 +1,15 @@
 from django import forms
-from .models import Course, Assignment,Submission,Student
+from .models import Course, Assignment, GradeCategory, Submission, Student
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
 class CourseForm(forms.ModelForm):
     class Meta:
         model = Course
-        fields = ['title', 'code', 'description']
+        fields = ['title', 'code', 'term', 'description', 'late_penalty']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'code': forms.TextInput(attrs={'class': 'form-control'}),
+            'term': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
@@ -39,9 +40,10 @@ class CourseForm(forms.ModelForm):
 class AssignmentForm(forms.ModelForm):
     class Meta:
         model = Assignment
-        fields = ['course', 'title', 'description', 'due_date', 'total_points', 'status', 'attachment']
+        fields = ['course', 'category', 'title', 'description', 'due_date', 'total_points', 'status', 'attachment']
         widgets = {
             'course': forms.Select(attrs={'class': 'form-control'}),
+            'category': forms.Select(attrs={'class': 'form-control'}),
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'description': forms.Textarea(attrs={
                 'class': 'form-control',
@@ -62,7 +64,7 @@ class AssignmentForm(forms.ModelForm):
 
 
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, teacher=None, **kwargs):
         super().__init__(*args, **kwargs)
         # Make fields required
         self.fields['title'].required = True
@@ -72,6 +74,28 @@ class AssignmentForm(forms.ModelForm):
         # Add help text
         self.fields['attachment'].help_text = "Upload assignment file (PDF, DOCX, etc.)"
         self.fields['status'].help_text = "Draft: Not visible to students. Published: Visible to students."
+        self.fields['category'].queryset = self.category_choices(teacher)
+        self.fields['category'].help_text = "Counts towards this weighted part of the course grade."
+
+    def category_choices(self, teacher):
+        """The chosen course's categories, else those of the teacher's courses."""
+        if self.is_bound:
+            course_id = self.data.get(self.add_prefix('course'))
+        else:
+            course_id = self.initial.get('course') or self.instance.course_id
+        categories = GradeCategory.objects.select_related('course')
+        if str(course_id or '').isdigit():
+            return categories.filter(course_id=course_id)
+        if teacher is not None and teacher.is_authenticated:
+            return categories.filter(course__teacher=teacher)
+        return categories.none()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        course, category = cleaned_data.get('course'), cleaned_data.get('category')
+        if course and category and category.course_id != course.pk:
+            self.add_error('category', "Pick a category of the assignment's course.")
+        return cleaned_data
 
     def clean_total_points(self):
         points = self.cleaned_data.get('total_points')
@@ -90,7 +114,7 @@ class GradeSubmissionForm(forms.ModelForm):
                 'step': 0.5
             }),
             'feedback': forms.Textarea(attrs={
-                'class': 'form-control',
+                'class': 'form-control feedback-textarea',
                 'rows': 3,
                 'placeholder': 'Enter feedback for the student...'
             }),
@@ -147,4 +171,25 @@ class StudentForm(forms.ModelForm):
         if commit:
             student.save()
             self.save_m2m()  # save courses many-to-many
-        return student
\ No newline at end of file
+        return student
+
+class CourseRolloverForm(forms.Form):
+    courses = forms.ModelMultipleChoiceField(
+        queryset=Course.objects.none(),
+        widget=forms.CheckboxSelectMultiple,
+        help_text="Courses to copy, with all their assignments",
+    )
+    term = forms.CharField(
+        max_length=10,
+        help_text="New term, e.g. F26. copies are coded CODE-TERM, with CODE shortened to fit",
+    )
+    days = forms.IntegerField(
+        initial=0,
+        help_text="Shift every due date by this many days",
+    )
+
+    def __init__(self, *args, teacher=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['courses'].queryset = Course.objects.filter(teacher=teacher)
+        for name in ('term', 'days'):
+            self.fields[name].widget.attrs.update({'class': 'form-control'})
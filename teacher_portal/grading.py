@@ -0,0 +1,168 @@
+"""
+Weighted course grades.
+
+A student's course grade is built from the marks of a course's assignments:
+
+* each mark is a share of its assignment's ``total_points``; a ``Grade``
+  row for the student and assignment overrides the submission's mark;
+* a late submission loses ``Course.late_penalty`` percent of its mark;
+* within each ``GradeCategory`` the ``drop_lowest`` weakest shares are
+  ignored (at least one always counts) and the rest are pooled by points;
+* category percentages are combined by ``weight``.  Assignments without a
+  category form one more group weighted with whatever is left of 100%, or
+  with 100% when the course has no categories at all.  Only categories the
+  student has marks in count, so the grade reflects the work marked so far.
+
+``compute_final_grades`` fetches the marks of a whole course with two
+queries and does the rest with NumPy group-by arithmetic, so a large course
+costs about the same as one student. ``final_grades`` caches one entry per
+(course, student). A changed mark only drops that student's entry
+(teacher_portal.signals), and the next read recomputes just the students
+that are missing. Changes to the course's structure (categories, weights,
+points, penalty) bump a per-course version stamp instead.
+"""
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from elearning_portal.cache import bump_version, version_stamp
+
+from .models import Grade, Submission
+
+UNCATEGORISED = 'Other'
+CACHE_TIMEOUT = 60 * 60 * 24
+NO_GRADE = {'percent': None, 'categories': {}, 'graded': 0}
+
+
+def course_label(course_id):
+    return 'teacher_portal.FinalGrades.course%s' % course_id
+
+
+def _cache_key(course_id, stamp, student_id):
+    return 'final_grade:%s:%s:%s' % (course_id, stamp, student_id)
+
+
+def _categories(course, assignments):
+    """``[(id, name, weight, drop_lowest)]`` with the uncategorised group last."""
+    categories = [
+        (pk, name, float(weight), drop)
+        for pk, name, weight, drop in course.grade_categories.values_list('pk', 'name', 'weight', 'drop_lowest')
+    ]
+    if any(category_id is None for category_id, _total in assignments.values()):
+        assigned = sum(weight for _pk, _name, weight, _drop in categories)
+        categories.append((None, UNCATEGORISED, max(100.0 - assigned, 0.0) if categories else 100.0, 0))
+    return categories
+
+
+def _marks(course, student_ids=None):
+    """``{(student_id, assignment_id): (points, is_late)}`` for every marked piece of work."""
+    submissions = Submission.objects.filter(assignment__course=course, grade__isnull=False)
+    grades = Grade.objects.filter(assignment__course=course, value__isnull=False)
+    if student_ids is not None:
+        submissions = submissions.filter(student_id__in=student_ids)
+        grades = grades.filter(student_id__in=student_ids)
+    marks = {
+        (student, assignment): (float(grade), late)
+        for student, assignment, grade, late in submissions.order_by().values_list(
+            'student_id', 'assignment_id', 'grade', 'is_late',
+        )
+    }
+    for student, assignment, value in grades.order_by().values_list('student_id', 'assignment_id', 'value'):
+        # A Grade entry is the teacher's final word on the mark, lateness still applies
+        marks[student, assignment] = (float(value), marks.get((student, assignment), (None, False))[1])
+    return marks
+
+
+def compute_final_grades(course, student_ids=None):
+    """
+    ``{student_id: {'percent', 'categories', 'graded'}}`` for every student
+    with at least one mark (optionally only ``student_ids``).
+    """
+    assignments = dict(
+        (pk, (category, total))
+        for pk, category, total in course.assignments.values_list('pk', 'category_id', 'total_points')
+    )
+    marks = _marks(course, student_ids)
+    marks = {key: value for key, value in marks.items() if assignments.get(key[1], (None, 0))[1]}
+    if not marks:
+        return {}
+    categories = _categories(course, assignments)
+    position = {pk: i for i, (pk, _name, _weight, _drop) in enumerate(categories)}
+    weights = np.array([weight for _pk, _name, weight, _drop in categories])
+    drops = np.array([drop for _pk, _name, _weight, drop in categories])
+
+    count = len(marks)
+    students = np.fromiter((student for student, _assignment in marks), dtype=np.int64, count=count)
+    category = np.fromiter((position[assignments[a][0]] for _s, a in marks), dtype=np.int64, count=count)
+    possible = np.fromiter((assignments[a][1] for _s, a in marks), dtype=float, count=count)
+    earned = np.fromiter((points for points, _late in marks.values()), dtype=float, count=count)
+    late = np.fromiter((is_late for _points, is_late in marks.values()), dtype=bool, count=count)
+    earned = np.where(late, earned * (1 - course.late_penalty / 100), earned)
+
+    # One group per (student, category); rank each mark within its group, weakest first
+    student_ids_, student_index = np.unique(students, return_inverse=True)
+    groups, group_index, group_sizes = np.unique(
+        student_index * len(categories) + category, return_inverse=True, return_counts=True,
+    )
+    order = np.lexsort((earned / possible, group_index))
+    starts = np.concatenate(([0], np.cumsum(group_sizes)[:-1]))
+    rank = np.empty(count, dtype=np.int64)
+    rank[order] = np.arange(count) - starts[group_index[order]]
+    dropped = np.minimum(drops[category], group_sizes[group_index] - 1)
+    kept = rank >= dropped
+
+    group_earned = np.bincount(group_index[kept], weights=earned[kept], minlength=len(groups))
+    group_possible = np.bincount(group_index[kept], weights=possible[kept], minlength=len(groups))
+    group_percent = 100 * group_earned / group_possible
+    group_student = groups // len(categories)
+    group_weight = weights[groups % len(categories)]
+
+    weight_total = np.bincount(group_student, weights=group_weight, minlength=len(student_ids_))
+    weighted = np.bincount(group_student, weights=group_weight * group_percent, minlength=len(student_ids_))
+    graded = np.bincount(student_index, minlength=len(student_ids_))
+
+    result = {
+        int(student): {
+            'percent': round(float(weighted[i] / weight_total[i]), 2) if weight_total[i] else None,
+            'categories': {},
+            'graded': int(graded[i]),
+        }
+        for i, student in enumerate(student_ids_)
+    }
+    for group, student, percent in zip(groups.tolist(), group_student.tolist(), group_percent.tolist()):
+        name = categories[group % len(categories)][1]
+        result[int(student_ids_[student])]['categories'][name] = round(percent, 2)
+    return result
+
+
+def final_grades(course, student_ids):
+    """
+    Cached ``compute_final_grades`` rows for ``student_ids`` (students without
+    marks get ``NO_GRADE``). Only students whose entry is missing are computed,
+    in one pass.
+    """
+    student_ids = list(student_ids)
+    stamp = version_stamp(course_label(course.pk))
+    keys = {student: _cache_key(course.pk, stamp, student) for student in student_ids}
+    found = cache.get_many(keys.values())
+    missing = [student for student, key in keys.items() if key not in found]
+    if missing:
+        # Nothing cached yet: one unfiltered pass over the course is cheapest
+        computed = compute_final_grades(course, None if len(missing) == len(keys) else missing)
+        fresh = {keys[student]: computed.get(student, NO_GRADE) for student in missing}
+        cache.set_many(fresh, CACHE_TIMEOUT)
+        found.update(fresh)
+    return {student: found[key] for student, key in keys.items()}
+
+
+def forget_student(course_id, student_id):
+    """Drop one student's cached grade once the change to their marks commits."""
+    transaction.on_commit(
+        lambda: cache.delete(_cache_key(course_id, version_stamp(course_label(course_id)), student_id))
+    )
+
+
+def forget_course(course_id):
+    """Drop every cached grade of a course after its grading structure changed."""
+    bump_version(course_label(course_id))
+
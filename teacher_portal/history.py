@@ -0,0 +1,112 @@
+"""
+Append-only history of grade changes.
+
+Every save that changes ``Submission.grade`` or ``Grade.value`` appends a
+``GradeEvent`` (teacher_portal.signals). Saves that leave the mark alone,
+such as feedback edits or file re-uploads, append nothing. Inside
+``batch()`` the events are buffered and written with a single multi-row
+insert when the block ends, in the same transaction as the grades, so a
+grading page costs one extra statement however many marks it changes.
+Grading views wrap their POST handling in it and name the teacher
+responsible.
+
+Rows are narrow (ids, a source code, the value and a timestamp) and carry a
+single index on (assignment, student, ts). ``gradebook_at`` rebuilds the
+marks as they stood at any moment from that index alone.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.utils import timezone
+
+from .models import GradeEvent
+
+_pending = ContextVar('teacher_portal_grade_events', default=None)
+_actor = ContextVar('teacher_portal_grade_actor', default=None)
+
+SOURCE_FIELDS = {
+    GradeEvent.SUBMISSION: ('grade', '_loaded_grade'),
+    GradeEvent.GRADEBOOK: ('value', '_loaded_value'),
+}
+
+
+@contextmanager
+def batch(user=None):
+    """Buffer the grade events of the block and insert them together at its end."""
+    if _pending.get() is not None:
+        # Already inside a batch: the outermost one writes
+        yield
+        return
+    events = []
+    pending_token = _pending.set(events)
+    actor_token = _actor.set(user.pk if user is not None and user.is_authenticated else None)
+    try:
+        with transaction.atomic():
+            yield
+            _write(events)
+    finally:
+        _pending.reset(pending_token)
+        _actor.reset(actor_token)
+
+
+def _write(events):
+    if events:
+        GradeEvent.objects.bulk_create(events)
+
+
+def record(instance, source, update_fields=None):
+    """Append an event if saving ``instance`` changed its mark."""
+    field, loaded = SOURCE_FIELDS[source]
+    if update_fields is not None and field not in update_fields:
+        return
+    value = getattr(instance, field)
+    previous = getattr(instance, loaded, None)
+    # A deferred mark was never read, so any save of it may be a change
+    if previous is not DEFERRED and previous == value:
+        return
+    event = GradeEvent(
+        assignment_id=instance.assignment_id,
+        student_id=instance.student_id,
+        source=source,
+        value=value,
+        changed_by_id=_actor.get(),
+        ts=timezone.now(),
+    )
+    events = _pending.get()
+    if events is None:
+        _write([event])
+    else:
+        events.append(event)
+
+
+def gradebook_at(when, assignments):
+    """
+    The marks of ``assignments`` (ids or a queryset) as they stood at
+    ``when``: ``{(assignment_id, student_id): value}``. As in
+    teacher_portal.grading, a gradebook entry overrides the submission's
+    grade. Marks that had been cleared are left out.
+    """
+    latest = {}
+    events = (
+        GradeEvent.objects.filter(assignment__in=assignments, ts__lte=when)
+        .order_by('assignment_id', 'student_id', 'ts', 'pk')
+        .values_list('assignment_id', 'student_id', 'source', 'value')
+    )
+    for assignment, student, source, value in events.iterator(chunk_size=2000):
+        latest[assignment, student, source] = value
+    marks = {}
+    for (assignment, student, source), value in sorted(latest.items(), key=lambda item: item[0][2]):
+        if value is not None:
+            marks[assignment, student] = value
+    return marks
+
+
+def mark_history(assignment_id, student_id):
+    """Every recorded change to one mark, oldest first."""
+    return list(
+        GradeEvent.objects.filter(assignment_id=assignment_id, student_id=student_id)
+        .select_related('changed_by')
+        .order_by('ts', 'pk')
+    )
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher_portal.archive import archive_activity, archive_term, compact
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the assignments, submissions and grades of closed terms, and old activity '
+        'entries, out of the live tables into the archive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('terms', nargs='*', help='Closed terms to archive, e.g. S25 F25.')
+        parser.add_argument('--batch-size', type=int, help='Assignments per transaction.')
+        parser.add_argument(
+            '--activity', action='store_true',
+            help='Also archive activity older than ACTIVITY_ARCHIVE_DAYS.',
+        )
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Run ANALYZE (and VACUUM on SQLite) afterwards to shrink the database file.',
+        )
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='Queue the run on the background job queue instead of running it here.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['terms'] and not options['activity']:
+            raise CommandError('Name at least one term, or pass --activity.')
+        if options['enqueue']:
+            from jobs.queue import enqueue
+
+            for term in options['terms']:
+                job = enqueue(archive_term, args=[term], kwargs={'batch_size': options['batch_size']})
+                self.stdout.write(f'Queued job {job.pk} for {term}.')
+            if options['activity']:
+                job = enqueue(archive_activity)
+                self.stdout.write(f'Queued job {job.pk} for activity.')
+            return
+
+        for term in options['terms']:
+            moved = archive_term(term, batch_size=options['batch_size'])
+            self.stdout.write(
+                f"{term}: {moved['assignments']} assignments, {moved['submissions']} submissions, "
+                f"{moved['grades']} grades archived"
+            )
+        if options['activity']:
+            self.stdout.write(f'{archive_activity()} activity entries archived')
+        if options['vacuum']:
+            compact()
+        self.stdout.write(self.style.SUCCESS('Archive complete.'))
@@ -0,0 +1,129 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q
+
+from elearning_portal.annotations import SubqueryCount
+from teacher_portal.models import Assignment, Course, Student, Submission
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare join-based Count() annotations with correlated subquery counts on '
+        'synthetic data: query plans, timings and results. Everything is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--courses', type=int, default=50)
+        parser.add_argument('--assignments', type=int, default=10, help='Assignments per course.')
+        parser.add_argument('--enrollments', type=int, default=5, help='Courses per student.')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per query; the best is reported.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with transaction.atomic():
+            course = self.populate(options)
+            for label, before, after in self.cases(course):
+                self.compare(label, before, after, options['repeat'])
+            transaction.set_rollback(True)
+
+    def populate(self, options):
+        User = get_user_model()
+        self.stdout.write('Building synthetic data...')
+        teacher = User.objects.create_user('bench-teacher', is_staff=True)
+        users = User.objects.bulk_create(
+            [User(username=f'bench-student-{i}') for i in range(options['students'])],
+            batch_size=1000,
+        )
+        students = Student.objects.bulk_create([Student(user=user) for user in users], batch_size=1000)
+        courses = Course.objects.bulk_create([
+            Course(teacher=teacher, code=f'B{i:05d}', title=f'Bench course {i}')
+            for i in range(options['courses'])
+        ])
+        assignments = Assignment.objects.bulk_create([
+            Assignment(course=course, title=f'{course.code} assignment {i}', status='published')
+            for course in courses for i in range(options['assignments'])
+        ], batch_size=1000)
+        by_course = {}
+        for assignment in assignments:
+            by_course.setdefault(assignment.course_id, []).append(assignment)
+
+        enrollments, submissions = [], []
+        Enrollment = Course.students.through
+        for student in students:
+            for course in random.sample(courses, min(options['enrollments'], len(courses))):
+                enrollments.append(Enrollment(course_id=course.pk, student_id=student.pk))
+                for assignment in by_course[course.pk]:
+                    if random.random() < 0.8:
+                        graded = random.random() < 0.6
+                        submissions.append(Submission(
+                            assignment=assignment, student=student,
+                            grade=random.randint(0, 100) if graded else None, is_graded=graded,
+                        ))
+        Enrollment.objects.bulk_create(enrollments, batch_size=5000)
+        Submission.objects.bulk_create(submissions, batch_size=5000)
+        self.stdout.write(
+            f'{len(students)} students, {len(courses)} courses, {len(assignments)} assignments, '
+            f'{len(enrollments)} enrollments, {len(submissions)} submissions'
+        )
+        # The busiest course, for the per-course page
+        return Course.objects.annotate(n=Count('students')).order_by('-n').first()
+
+    def cases(self, course):
+        submissions = Submission.objects.filter(student=OuterRef('pk'))
+        yield (
+            'student_list',
+            Student.objects.annotate(
+                course_count=Count('enrolled_courses', distinct=True),
+                assignment_count=Count('user__student_profile__submissions', distinct=True),
+                graded_count=Count(
+                    'user__student_profile__submissions',
+                    filter=Q(user__student_profile__submissions__grade__isnull=False),
+                    distinct=True,
+                ),
+            ),
+            Student.objects.annotate(
+                course_count=SubqueryCount(Course.students.through.objects.filter(student=OuterRef('pk'))),
+                assignment_count=SubqueryCount(submissions),
+                graded_count=SubqueryCount(submissions.filter(grade__isnull=False)),
+            ),
+        )
+        course_submissions = submissions.filter(assignment__course=course)
+        yield (
+            f'course_detail ({course.code})',
+            course.students.annotate(
+                assignment_count=Count('submissions', filter=Q(submissions__assignment__course=course)),
+                graded_count=Count(
+                    'submissions',
+                    filter=Q(submissions__assignment__course=course, submissions__grade__isnull=False),
+                ),
+            ),
+            course.students.annotate(
+                assignment_count=SubqueryCount(course_submissions),
+                graded_count=SubqueryCount(course_submissions.filter(grade__isnull=False)),
+            ),
+        )
+
+    def compare(self, label, before, after, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {label} =='))
+        fields = [name for name in after.query.annotations]
+        results = {}
+        for name, queryset in (('join Count', before), ('subquery', after)):
+            queryset = queryset.order_by('pk')
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = list(queryset.values_list('pk', *fields))
+                timings.append(time.perf_counter() - start)
+            results[name] = rows
+            self.stdout.write(f'-- {name}: best of {repeat} {min(timings) * 1000:.1f} ms, {len(rows)} rows')
+            self.stdout.write(queryset.explain())
+        if results['join Count'] == results['subquery']:
+            self.stdout.write(self.style.SUCCESS('Results identical.'))
+        else:
+            self.stdout.write(self.style.ERROR('Results differ!'))
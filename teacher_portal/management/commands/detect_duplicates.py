@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from teacher_portal.models import Assignment
+from teacher_portal.similarity import rebuild_assignment
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the MinHash/LSH similarity index and near-duplicate report of assignments '
+        'from the processed submission texts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assignment', type=int, action='append', default=[], help='Assignment id; repeatable.')
+
+    def handle(self, *args, **options):
+        assignments = Assignment.objects.filter(submissions__metadata__status='done').distinct()
+        if options['assignment']:
+            assignments = assignments.filter(pk__in=options['assignment'])
+        for assignment in assignments.order_by('pk'):
+            start = time.perf_counter()
+            matches = rebuild_assignment(assignment)
+            self.stdout.write(f'{assignment}: {matches} similar pairs ({time.perf_counter() - start:.2f}s)')
+        self.stdout.write(self.style.SUCCESS('Similarity index rebuilt.'))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from teacher_portal.models import Submission
+from teacher_portal.processing import process_submission, process_submissions
+
+
+class Command(BaseCommand):
+    help = 'Hash, type, text-extract and thumbnail submission files that have not been processed yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--assignment', type=int, help='Only this assignment id.')
+        parser.add_argument('--force', action='store_true', help='Reprocess files that are already done.')
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='Queue one background job per submission instead of processing here.',
+        )
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.exclude(file='').exclude(file__isnull=True).order_by('pk')
+        if options['assignment']:
+            submissions = submissions.filter(assignment_id=options['assignment'])
+
+        if options['enqueue']:
+            from jobs.queue import enqueue
+
+            ids = list(submissions.values_list('pk', flat=True))
+            for pk in ids:
+                enqueue(process_submission, args=[pk])
+            self.stdout.write(f'Queued {len(ids)} jobs.')
+            return
+
+        start = time.perf_counter()
+        count = process_submissions(submissions, force=options['force'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {count} submission files in {time.perf_counter() - start:.2f}s.'
+        ))
@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from teacher_portal.models import Course
+from teacher_portal.rollover import CODE_FORMAT, rollover
+
+
+class Command(BaseCommand):
+    help = 'Copy courses and their assignments into a new term in one transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('term', help='The new term, e.g. F26.')
+        parser.add_argument('--days', type=int, default=0, help='Shift due dates by this many days.')
+        parser.add_argument('--from-term', help='Only roll over courses of this term.')
+        parser.add_argument('--course', action='append', default=[], help='Course code; repeatable.')
+        parser.add_argument('--teacher', help='Only roll over courses taught by this username.')
+        parser.add_argument('--code-format', default=CODE_FORMAT, help='Default: %(default)s')
+
+    def handle(self, *args, **options):
+        courses = Course.objects.select_related('teacher')
+        if options['from_term'] is not None:
+            courses = courses.filter(term=options['from_term'])
+        if options['course']:
+            courses = courses.filter(code__in=options['course'])
+        if options['teacher']:
+            User = get_user_model()
+            try:
+                courses = courses.filter(teacher=User.objects.get(username=options['teacher']))
+            except User.DoesNotExist:
+                raise CommandError(f"No user '{options['teacher']}'.")
+        if not courses.exists():
+            raise CommandError('No courses match.')
+
+        start = time.perf_counter()
+        try:
+            clones = rollover(
+                courses, options['term'], timedelta(days=options['days']),
+                code_format=options['code_format'],
+            )
+        except ValidationError as e:
+            raise CommandError('\n'.join(e.messages))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled {len(clones)} courses into {options["term"]} in {time.perf_counter() - start:.2f}s.'
+        ))
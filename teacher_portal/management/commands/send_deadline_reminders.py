@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from teacher_portal.reminders import send_due_reminders
+
+
+class Command(BaseCommand):
+    help = 'Notify students about upcoming deadlines they have not submitted for. Run every few minutes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue', action='store_true',
+            help='Queue the run on the background job queue instead of running it here.',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            from jobs.queue import enqueue
+
+            job = enqueue(send_due_reminders)
+            self.stdout.write(f'Queued job {job.pk}.')
+            return
+        sent = send_due_reminders()
+        for window, count in sent.items():
+            self.stdout.write(f'{window}h window: {count} notifications')
+        self.stdout.write(self.style.SUCCESS('Deadline reminders sent.'))
@@ -0,0 +1,141 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('course_create', 'Course Created'), ('course_update', 'Course Updated'), ('assignment_create', 'Assignment Created'), ('assignment_submit', 'Assignment Submitted'), ('grade_submit', 'Grade Submitted'), ('student_add', 'Student Added')], max_length=20)),
+                ('object_type', models.CharField(max_length=50)),
+                ('object_id', models.PositiveIntegerField()),
+                ('object_name', models.CharField(max_length=100)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=10, unique=True)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('teacher', models.ForeignKey(limit_choices_to={'is_staff': True}, on_delete=django.db.models.deletion.CASCADE, related_name='taught_courses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Courses',
+                'ordering': ['code'],
+                'permissions': [('view_all_courses', 'Can view all courses')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Assignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('total_points', models.PositiveIntegerField(default=100)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('archived', 'Archived')], default='draft', max_length=10)),
+                ('attachment', models.FileField(blank=True, null=True, upload_to='assignment_files/')),
+                ('grade', models.CharField(blank=True, max_length=10, null=True)),
+                ('feedback', models.TextField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='teacher_portal.course')),
+            ],
+            options={
+                'ordering': ['-due_date'],
+                'permissions': [('view_all_assignments', 'Can view all assignments')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('read', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('url', models.URLField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image', models.CharField(default='default_profile.png', help_text='Path to profile image (relative to static files)', max_length=255)),
+                ('bio', models.TextField(blank=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollment_date', models.DateField(default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(limit_choices_to={'is_staff': False}, on_delete=django.db.models.deletion.CASCADE, related_name='student_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['user__last_name', 'user__first_name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='enrolled_courses', to='teacher_portal.student'),
+        ),
+        migrations.CreateModel(
+            name='Grade',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.DecimalField(blank=True, decimal_places=2, help_text='Grade value (e.g., 85.50)', max_digits=5, null=True)),
+                ('feedback', models.TextField(blank=True)),
+                ('graded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='teacher_portal.assignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='teacher_portal.student')),
+            ],
+            options={
+                'ordering': ['student__user__first_name', 'student__user__last_name'],
+                'permissions': [('view_all_grades', 'Can view all grades')],
+                'unique_together': {('student', 'assignment')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Submission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submitted_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('file', models.FileField(blank=True, null=True, upload_to='submissions/%Y/%m/%d/')),
+                ('grade', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_graded', models.BooleanField(default=False)),
+                ('feedback', models.TextField(blank=True)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='teacher_portal.assignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='teacher_portal.student')),
+            ],
+            options={
+                'ordering': ['-submitted_date'],
+                'unique_together': {('assignment', 'student')},
+            },
+        ),
+    ]
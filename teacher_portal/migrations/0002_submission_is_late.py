@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:04
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def recompute_lateness(apps, schema_editor):
+    # Submissions saved before the column existed get it from their due dates
+    Assignment = apps.get_model('teacher_portal', 'Assignment')
+    Submission = apps.get_model('teacher_portal', 'Submission')
+    past_due = Assignment.objects.filter(
+        pk=OuterRef('assignment_id'), due_date__lt=OuterRef('submitted_date'),
+    )
+    Submission.objects.using(schema_editor.connection.alias).update(is_late=Exists(past_due))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='is_late',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['is_late', 'assignment'], name='tp_submission_lateness_idx'),
+        ),
+        migrations.RunPython(recompute_lateness, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0002_submission_is_late'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.PositiveSmallIntegerField(help_text='Hours before the due date')),
+                ('sent_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipients', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-sent_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['status', 'due_date'], name='tp_assignment_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='assignmentreminder',
+            name='assignment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='teacher_portal.assignment'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='assignmentreminder',
+            unique_together={('assignment', 'window')},
+        ),
+    ]
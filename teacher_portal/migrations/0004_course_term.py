@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0003_assignmentreminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='term',
+            field=models.CharField(blank=True, db_index=True, max_length=10),
+        ),
+    ]
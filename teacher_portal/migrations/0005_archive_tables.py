@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0004_course_term'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedActivityLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('course_create', 'Course Created'), ('course_update', 'Course Updated'), ('assignment_create', 'Assignment Created'), ('assignment_submit', 'Assignment Submitted'), ('grade_submit', 'Grade Submitted'), ('student_add', 'Student Added')], max_length=20)),
+                ('object_type', models.CharField(max_length=50)),
+                ('object_id', models.PositiveIntegerField()),
+                ('object_name', models.CharField(max_length=100)),
+                ('timestamp', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAssignment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('due_date', models.DateTimeField(blank=True, null=True)),
+                ('total_points', models.PositiveIntegerField(default=100)),
+                ('created_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('published', 'Published'), ('archived', 'Archived')], max_length=10)),
+                ('attachment', models.FileField(blank=True, null=True, upload_to='assignment_files/')),
+                ('grade', models.CharField(blank=True, max_length=10, null=True)),
+                ('feedback', models.TextField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_assignments', to='teacher_portal.course')),
+            ],
+            options={
+                'ordering': ['due_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubmission',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('submitted_date', models.DateTimeField()),
+                ('file', models.FileField(blank=True, null=True, upload_to='submissions/%Y/%m/%d/')),
+                ('grade', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_graded', models.BooleanField(default=False)),
+                ('feedback', models.TextField(blank=True)),
+                ('is_late', models.BooleanField(default=False)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='teacher_portal.archivedassignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_submissions', to='teacher_portal.student')),
+            ],
+            options={
+                'ordering': ['-submitted_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedGrade',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('feedback', models.TextField(blank=True)),
+                ('graded_at', models.DateTimeField()),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grades', to='teacher_portal.archivedassignment')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_grades', to='teacher_portal.student')),
+            ],
+            options={
+                'unique_together': {('student', 'assignment')},
+            },
+        ),
+    ]
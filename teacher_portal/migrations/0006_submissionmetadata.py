@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0005_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionMetadata',
+            fields=[
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='metadata', serialize=False, to='teacher_portal.submission')),
+                ('file_name', models.CharField(help_text='The stored file these details describe', max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Processed'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('sha256', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('text', models.TextField(blank=True)),
+                ('thumbnail', models.FileField(blank=True, null=True, upload_to='submission_thumbnails/')),
+                ('error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Submission metadata',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0006_submissionmetadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionmetadata',
+            name='minhash',
+            field=models.BinaryField(blank=True, help_text='MinHash signature of the text (see teacher_portal.similarity)', null=True),
+        ),
+        migrations.CreateModel(
+            name='SimilarityBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='teacher_portal.assignment')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_buckets', to='teacher_portal.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assignment', 'band', 'bucket'], name='tp_similarity_bucket_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Estimated Jaccard similarity of the texts, 0-1')),
+                ('identical', models.BooleanField(default=False, help_text='Byte-for-byte the same file')),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_matches', to='teacher_portal.assignment')),
+                ('first', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='teacher_portal.submission')),
+                ('second', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='teacher_portal.submission')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['assignment', '-score'], name='tp_similarity_score_idx')],
+                'unique_together': {('first', 'second')},
+            },
+        ),
+    ]
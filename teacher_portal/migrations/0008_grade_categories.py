@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0007_similarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='late_penalty',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Percent taken off the mark of a late submission'),
+        ),
+        migrations.CreateModel(
+            name='GradeCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('weight', models.DecimalField(decimal_places=2, help_text='Share of the course grade, in percent', max_digits=5)),
+                ('drop_lowest', models.PositiveSmallIntegerField(default=0, help_text='Number of lowest scores in this category that do not count')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_categories', to='teacher_portal.course')),
+            ],
+            options={
+                'verbose_name_plural': 'Grade categories',
+                'ordering': ['name'],
+                'unique_together': {('course', 'name')},
+            },
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='assignments', to='teacher_portal.gradecategory'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0008_grade_categories'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.PositiveSmallIntegerField(choices=[(1, 'Submission grade'), (2, 'Gradebook entry')])),
+                ('value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now)),
+                ('assignment', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='teacher_portal.assignment')),
+                ('changed_by', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='teacher_portal.student')),
+            ],
+            options={
+                'ordering': ['-ts'],
+                'indexes': [models.Index(fields=['assignment', 'student', 'ts'], name='tp_grade_event_idx')],
+            },
+        ),
+    ]
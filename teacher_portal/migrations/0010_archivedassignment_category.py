@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teacher_portal', '0009_gradeevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedassignment',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_assignments', to='teacher_portal.gradecategory'),
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.utils import timezone
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.core.exceptions import ValidationError
+from django.db.models import DEFERRED, Exists, OuterRef
+
+from elearning_portal.cache import bump_version
 
 class Profile(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -37,6 +40,11 @@ class Course(models.Model):
     code = models.CharField(max_length=10, unique=True)
     title = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    term = models.CharField(max_length=10, blank=True, db_index=True)
+    late_penalty = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Percent taken off the mark of a late submission"
+    )
     created_at = models.DateTimeField(default=timezone.now)
     students = models.ManyToManyField(
         'Student',
@@ -58,6 +66,32 @@ class Course(models.Model):
         if hasattr(self, 'teacher') and self.teacher and not self.teacher.is_staff:
             raise ValidationError("The assigned teacher must be a staff member.")
 
+class GradeCategory(models.Model):
+    """A weighted group of a course's assignments (e.g. Homework 40%), see teacher_portal.grading."""
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='grade_categories'
+    )
+    name = models.CharField(max_length=50)
+    weight = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        help_text="Share of the course grade, in percent"
+    )
+    drop_lowest = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of lowest scores in this category that do not count"
+    )
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ['course', 'name']
+        verbose_name_plural = "Grade categories"
+
+    def __str__(self):
+        return f"{self.course.code} - {self.name} ({self.weight}%)"
+
 class Student(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -92,6 +126,13 @@ class Assignment(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     attachment = models.FileField(upload_to='assignment_files/', blank=True, null=True)
+    category = models.ForeignKey(
+        GradeCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='assignments'
+    )
     grade = models.CharField(max_length=10, blank=True, null=True)
     feedback = models.TextField(blank=True, null=True)
 
@@ -100,10 +141,42 @@ class Assignment(models.Model):
         permissions = [
             ('view_all_assignments', 'Can view all assignments'),
         ]
+        indexes = [
+            # Deadline scans: published assignments due within a window
+            models.Index(fields=['status', 'due_date'], name='tp_assignment_due_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.course.code})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored due date so save() can tell when it moves
+        instance._loaded_due_date = instance.__dict__.get('due_date')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        due_date_changed = (
+            hasattr(self, '_loaded_due_date')
+            and self._loaded_due_date != self.due_date
+            and (update_fields is None or 'due_date' in update_fields)
+        )
+        super().save(*args, **kwargs)
+        self._loaded_due_date = self.due_date
+        if due_date_changed:
+            self.submissions.all().recompute_lateness()
+            self.reset_reminders()
+
+    def reset_reminders(self):
+        """Forget reminders for windows the (moved) due date has not reached yet."""
+        if self.due_date is None:
+            self.reminders.all().delete()
+            return
+        hours_left = (self.due_date - timezone.now()).total_seconds() / 3600
+        self.reminders.filter(window__lt=hours_left).delete()
+
     @property
     def is_past_due(self):
         if self.due_date is None:
@@ -156,6 +229,26 @@ class Assignment(models.Model):
             self.status = 'archived'
             self.save()
 
+class SubmissionQuerySet(models.QuerySet):
+    def late(self):
+        return self.filter(is_late=True)
+
+    def on_time(self):
+        return self.filter(is_late=False)
+
+    def recompute_lateness(self):
+        """
+        Re-derive ``is_late`` for these submissions from their assignment's
+        current due date in a single UPDATE; returns the number of rows.
+        """
+        past_due = Assignment.objects.filter(
+            pk=OuterRef('assignment_id'), due_date__lt=OuterRef('submitted_date'),
+        )
+        updated = self.update(is_late=Exists(past_due))
+        # update() sends no signals, so invalidate derived caches by hand
+        bump_version(self.model._meta.label)
+        return updated
+
 class Submission(models.Model):
     assignment = models.ForeignKey(
         Assignment,
@@ -176,24 +269,128 @@ class Submission(models.Model):
     grade = models.PositiveIntegerField(null=True, blank=True)
     is_graded = models.BooleanField(default=False)
     feedback = models.TextField(blank=True)
+    is_late = models.BooleanField(default=False)
+
+    objects = SubmissionQuerySet.as_manager()
 
     class Meta:
         ordering = ['-submitted_date']
         unique_together = ['assignment', 'student']
+        indexes = [
+            # Late/on-time filters, overall and per assignment
+            models.Index(fields=['is_late', 'assignment'], name='tp_submission_lateness_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.assignment}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored file so a re-upload can be told from a regrade
+        instance._loaded_file = instance.__dict__.get('file')
+        # And a regrade from a save that leaves the mark alone (teacher_portal.history)
+        instance._loaded_grade = instance.__dict__.get('grade', DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        due_date = self.assignment.due_date
+        self.is_late = bool(due_date and self.submitted_date and self.submitted_date > due_date)
+        update_fields = kwargs.get('update_fields')
+        # Read by the post_save handler that queues file processing
+        self.file_changed = bool(self.file) and (
+            getattr(self, '_loaded_file', None) != self.file.name
+            and (update_fields is None or 'file' in update_fields)
+        )
+        super().save(*args, **kwargs)
+        self._loaded_file = self.file.name
+        if update_fields is None or 'grade' in update_fields:
+            self._loaded_grade = self.grade
+
     @property
     def late_submission(self):
-        if self.assignment.due_date is None:
-            return False
-        return self.submitted_date > self.assignment.due_date
+        # Kept for templates; stored so listing submissions doesn't load each assignment
+        return self.is_late
 
     def clean(self):
         if not self.student.enrolled_courses.filter(id=self.assignment.course.id).exists():
             raise ValidationError("Student must be enrolled in the course")
 
+class SubmissionMetadata(models.Model):
+    """What teacher_portal.processing found in a submission's file, so pages never open it."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('done', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    submission = models.OneToOneField(
+        Submission,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='metadata'
+    )
+    file_name = models.CharField(max_length=255, help_text="The stored file these details describe")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    page_count = models.PositiveIntegerField(null=True, blank=True)
+    text = models.TextField(blank=True)
+    thumbnail = models.FileField(upload_to='submission_thumbnails/', blank=True, null=True)
+    minhash = models.BinaryField(null=True, blank=True, help_text="MinHash signature of the text (see teacher_portal.similarity)")
+    error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Submission metadata"
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+class SimilarityBucket(models.Model):
+    """One LSH band of a submission's MinHash signature; equal buckets make candidate pairs."""
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    submission = models.ForeignKey(
+        Submission,
+        on_delete=models.CASCADE,
+        related_name='similarity_buckets'
+    )
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assignment', 'band', 'bucket'], name='tp_similarity_bucket_idx'),
+        ]
+
+class SimilarityMatch(models.Model):
+    """A pair of submissions to the same assignment whose texts (or files) look alike."""
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='similarity_matches'
+    )
+    first = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    second = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text="Estimated Jaccard similarity of the texts, 0-1")
+    identical = models.BooleanField(default=False, help_text="Byte-for-byte the same file")
+    detected_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-score']
+        unique_together = ['first', 'second']
+        indexes = [
+            models.Index(fields=['assignment', '-score'], name='tp_similarity_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.first} ~ {self.second}: {self.score:.0%}"
+
 class Grade(models.Model):
     student = models.ForeignKey(
         Student,
@@ -225,6 +422,87 @@ class Grade(models.Model):
     def __str__(self):
         return f"{self.student} - {self.assignment}: {self.value}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_value = instance.__dict__.get('value', DEFERRED)
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'value' in update_fields:
+            self._loaded_value = self.value
+
+class GradeEvent(models.Model):
+    """
+    One change to a student's mark, appended by teacher_portal.history and
+    never edited. The references carry no foreign key constraints or indexes
+    of their own, so that the only index to maintain is the one that rebuilds
+    a gradebook, and so that the history outlives deleted and archived rows.
+    """
+    SUBMISSION = 1
+    GRADEBOOK = 2
+    SOURCE_CHOICES = [
+        (SUBMISSION, 'Submission grade'),
+        (GRADEBOOK, 'Gradebook entry'),
+    ]
+
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    source = models.PositiveSmallIntegerField(choices=SOURCE_CHOICES)
+    value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    ts = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-ts']
+        indexes = [
+            # A gradebook at a point in time: the last event per mark up to then
+            models.Index(fields=['assignment', 'student', 'ts'], name='tp_grade_event_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.assignment_id}: {self.value} at {self.ts:%Y-%m-%d %H:%M}"
+
+class AssignmentReminder(models.Model):
+    """Marks that the deadline reminder for one window went out for an assignment."""
+    assignment = models.ForeignKey(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    window = models.PositiveSmallIntegerField(help_text="Hours before the due date")
+    sent_at = models.DateTimeField(default=timezone.now)
+    recipients = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-sent_at']
+        unique_together = ['assignment', 'window']
+
+    def __str__(self):
+        return f"{self.assignment} - {self.window}h reminder"
+
 class NotificationManager(models.Manager):
     def unread(self, user):
         return self.filter(user=user, read=False)
@@ -269,3 +547,100 @@ class ActivityLog(models.Model):
 
     def __str__(self):
         return f"{self.get_action_display()} - {self.object_name}"
+
+
+# Cold storage for closed terms (see teacher_portal.archive). Rows keep their
+# original primary keys and are never edited, so they carry no signals.
+
+class ArchivedAssignment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='archived_assignments'
+    )
+    title = models.CharField(max_length=100)
+    description = models.TextField(blank=True, null=True)
+    due_date = models.DateTimeField(null=True, blank=True)
+    total_points = models.PositiveIntegerField(default=100)
+    created_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=Assignment.STATUS_CHOICES)
+    attachment = models.FileField(upload_to='assignment_files/', blank=True, null=True)
+    category = models.ForeignKey(
+        GradeCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_assignments'
+    )
+    grade = models.CharField(max_length=10, blank=True, null=True)
+    feedback = models.TextField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['due_date']
+
+    def __str__(self):
+        return f"{self.title} ({self.course.code}, archived)"
+
+class ArchivedSubmission(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    assignment = models.ForeignKey(
+        ArchivedAssignment,
+        on_delete=models.CASCADE,
+        related_name='submissions'
+    )
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        related_name='archived_submissions'
+    )
+    submitted_date = models.DateTimeField()
+    file = models.FileField(upload_to='submissions/%Y/%m/%d/', blank=True, null=True)
+    grade = models.PositiveIntegerField(null=True, blank=True)
+    is_graded = models.BooleanField(default=False)
+    feedback = models.TextField(blank=True)
+    is_late = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-submitted_date']
+
+    def __str__(self):
+        return f"{self.student} - {self.assignment} (archived)"
+
+class ArchivedGrade(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(
+        Student,
+        on_delete=models.CASCADE,
+        related_name='archived_grades'
+    )
+    assignment = models.ForeignKey(
+        ArchivedAssignment,
+        on_delete=models.CASCADE,
+        related_name='grades'
+    )
+    value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    feedback = models.TextField(blank=True)
+    graded_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('student', 'assignment')
+
+    def __str__(self):
+        return f"{self.student} - {self.assignment}: {self.value}"
+
+class ArchivedActivityLog(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    action = models.CharField(max_length=20, choices=ActivityLog.ACTION_CHOICES)
+    object_type = models.CharField(max_length=50)
+    object_id = models.PositiveIntegerField()
+    object_name = models.CharField(max_length=100)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-timestamp']
+
+    def __str__(self):
+        return f"{self.get_action_display()} - {self.object_name} (archived)"
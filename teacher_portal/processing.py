@@ -0,0 +1,151 @@
+"""
+Post-upload processing of submission files.
+
+When a submission is saved with a new file, a background job
+(``process_submission``) is queued once the transaction commits. The job
+hands the file to a bounded process pool, which runs
+teacher_portal.fileinfo.inspect_file. Hashing, PDF parsing and thumbnailing
+are CPU-bound and would otherwise hold the GIL of a whole worker. Results
+come back to the calling process and are stored on ``SubmissionMetadata``,
+together with a thumbnail file. Grading pages read only that row. The
+extracted text is then indexed for near-duplicate detection
+(teacher_portal.similarity).
+
+The pool is shared by every thread of the process and holds at most
+``SUBMISSION_PROCESS_WORKERS`` processes. Children only read files: all
+database work stays in the parent.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
+
+from .fileinfo import inspect_file
+from .models import Submission, SubmissionMetadata
+from .similarity import update_submission
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: callers are often multi-threaded job workers,
+            # and the children need nothing but teacher_portal.fileinfo
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.SUBMISSION_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _discard_pool(pool):
+    # A child that dies (killed, out of memory) breaks the whole pool for good
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def needs_processing(submission):
+    if not submission.file:
+        return False
+    try:
+        metadata = submission.metadata
+    except SubmissionMetadata.DoesNotExist:
+        return True
+    return metadata.status != 'done' or metadata.file_name != submission.file.name
+
+
+def _inspect(pool, submission):
+    return pool.submit(
+        inspect_file,
+        submission.file.path,
+        os.path.basename(submission.file.name),
+        settings.SUBMISSION_TEXT_LIMIT,
+        settings.SUBMISSION_THUMBNAIL_SIZE,
+    )
+
+
+def _store(submission, info=None, error=''):
+    metadata = SubmissionMetadata(
+        submission=submission,
+        file_name=submission.file.name,
+        status='failed' if error else 'done',
+        error=error,
+        processed_at=timezone.now(),
+    )
+    try:
+        previous = SubmissionMetadata.objects.get(pk=submission.pk)
+    except SubmissionMetadata.DoesNotExist:
+        previous = None
+    if previous and previous.thumbnail:
+        previous.thumbnail.delete(save=False)
+    if info:
+        thumbnail = info.pop('thumbnail')
+        thumbnail_type = info.pop('thumbnail_type')
+        for field, value in info.items():
+            setattr(metadata, field, value)
+        if thumbnail:
+            metadata.thumbnail.save(f'{submission.pk}.{thumbnail_type}', ContentFile(thumbnail), save=False)
+    metadata.save()
+    return metadata
+
+
+def process_submissions(submissions, force=False):
+    """
+    Inspect the files of ``submissions`` (a queryset) on the process pool and
+    store the results. Submissions already processed for their current file
+    are skipped unless ``force``. Returns the number processed.
+    """
+    pending = [
+        submission for submission in submissions.select_related('metadata')
+        if force or needs_processing(submission)
+    ]
+    pool = get_pool()
+    futures = {}
+    for submission in pending:
+        try:
+            futures[_inspect(pool, submission)] = submission
+        except NotImplementedError:
+            # Remote storage has no local path to hand to the pool
+            _store(submission, error='Storage does not expose a local file path.')
+
+    for future in as_completed(futures):
+        submission = futures[future]
+        try:
+            info = future.result()
+        except Exception as error:
+            if isinstance(error, BrokenProcessPool):
+                _discard_pool(pool)
+            logger.warning('Could not process submission %s: %s', submission.pk, error)
+            _store(submission, error=f'{type(error).__name__}: {error}')
+        else:
+            update_submission(submission, _store(submission, info))
+    if pending:
+        bump_version(SubmissionMetadata._meta.label)
+    return len(pending)
+
+
+def process_submission(submission_id):
+    """Background job entry point for one uploaded file."""
+    process_submissions(Submission.objects.filter(pk=submission_id))
+
+
+def queue_processing(submission):
+    from jobs.queue import enqueue_on_commit
+
+    enqueue_on_commit(process_submission, args=[submission.pk])
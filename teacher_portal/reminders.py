@@ -0,0 +1,101 @@
+"""
+Deadline reminders for students.
+
+Each run looks only at published assignments due within the widest reminder
+window (an index range scan on ``status, due_date``). For every such
+assignment it picks the tightest window the deadline falls into. If that
+window's reminder has not gone out yet, it notifies the enrolled students
+who have not submitted. An ``AssignmentReminder`` row per (assignment,
+window) makes each reminder go out exactly once, even when runs overlap.
+Wider windows that were skipped over (e.g. an assignment published 20 hours
+before its deadline) are marked as sent along with it.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
+
+from .models import Assignment, AssignmentReminder, Notification, Student, Submission
+
+
+def _describe(hours):
+    if hours % 24 == 0:
+        days = hours // 24
+        return f"{days} day{'s' if days != 1 else ''}"
+    return f"{hours} hour{'s' if hours != 1 else ''}"
+
+
+def pending_recipients(assignment):
+    """User ids of students enrolled in the course with no submission (anti-join)."""
+    submitted = Submission.objects.filter(assignment=assignment, student=OuterRef('pk'))
+    return list(
+        Student.objects.filter(enrolled_courses=assignment.course_id)
+        .filter(~Exists(submitted))
+        .order_by()
+        .values_list('user_id', flat=True)
+    )
+
+
+def send_reminder(assignment, window, windows):
+    """
+    Notify the students who still owe ``assignment`` and record the reminder.
+    Returns the number of notifications, or None if another run sent it first.
+    """
+    try:
+        with transaction.atomic():
+            reminder = AssignmentReminder.objects.create(assignment=assignment, window=window)
+            user_ids = pending_recipients(assignment)
+            message = (
+                f"Reminder: \"{assignment.title}\" ({assignment.course.code}) "
+                f"is due in {_describe(window)}."
+            )
+            Notification.objects.bulk_create(
+                [Notification(user_id=user_id, message=message) for user_id in user_ids]
+            )
+            reminder.recipients = len(user_ids)
+            reminder.save(update_fields=['recipients'])
+            AssignmentReminder.objects.bulk_create(
+                [AssignmentReminder(assignment=assignment, window=wider)
+                 for wider in windows if wider > window],
+                ignore_conflicts=True,
+            )
+    except IntegrityError:
+        return None
+    return len(user_ids)
+
+
+def send_due_reminders(now=None):
+    """
+    Send every reminder that is due; returns ``{window: notifications sent}``.
+    Cost is proportional to the assignments due soon, not to all assignments.
+    """
+    now = now or timezone.now()
+    windows = sorted(settings.DEADLINE_REMINDER_WINDOWS)
+    due_soon = list(
+        Assignment.objects.filter(
+            status='published',
+            due_date__gt=now,
+            due_date__lte=now + timedelta(hours=windows[-1]),
+        ).select_related('course').order_by('due_date')
+    )
+    already_sent = set(
+        AssignmentReminder.objects.filter(assignment__in=due_soon)
+        .values_list('assignment_id', 'window')
+    )
+
+    sent = {window: 0 for window in windows}
+    for assignment in due_soon:
+        window = next(w for w in windows if assignment.due_date <= now + timedelta(hours=w))
+        if (assignment.pk, window) in already_sent:
+            continue
+        count = send_reminder(assignment, window, windows)
+        if count:
+            sent[window] += count
+    if any(sent.values()):
+        # bulk_create sends no signals, so invalidate derived caches by hand
+        bump_version(Notification._meta.label)
+    return sent
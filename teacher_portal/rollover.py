@@ -0,0 +1,142 @@
+"""
+Term rollover: copy courses and their assignments into a new term.
+
+Everything is written with a handful of ``bulk_create`` calls inside one
+transaction, so hundreds of courses roll over in seconds and a failure
+leaves nothing half-copied.  Clones get a new code and the new term; the
+original code is shortened as needed for the new one to fit ``Course.code``.
+Their grade categories and late penalty are copied. Their assignments are
+shifted by a fixed offset and reset to draft, and they point at the
+original attachment files instead of copying them.
+Enrolments, submissions and grades belong to the old term and are not
+copied.
+"""
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from elearning_portal.cache import bump_version
+
+from .models import ActivityLog, Assignment, Course, GradeCategory
+
+CODE_FORMAT = '{code}-{term}'
+BATCH_SIZE = 1000
+
+
+def new_code(course, term, code_format=CODE_FORMAT):
+    """
+    ``code_format`` filled in. When that is too long for ``Course.code``, the
+    old code is shortened, taking letters off its subject prefix so the
+    course number that tells courses apart survives (MATH2040 -> MA2040).
+    """
+    code = code_format.format(code=course.code, term=term)
+    overflow = len(code) - Course._meta.get_field('code').max_length
+    if overflow <= 0 or overflow >= len(course.code):
+        return code
+    prefix = len(course.code.rstrip('0123456789'))
+    if prefix > overflow:
+        short = course.code[:prefix - overflow] + course.code[prefix:]
+    else:
+        short = course.code[:-overflow]
+    return code_format.format(code=short, term=term)
+
+
+def check_codes(courses, term, code_format=CODE_FORMAT):
+    """Return ``{course pk: new code}``, or raise ValidationError listing every clash."""
+    max_length = Course._meta.get_field('code').max_length
+    codes = {course.pk: new_code(course, term, code_format) for course in courses}
+    errors = [
+        f'"{code}" is longer than {max_length} characters.'
+        for code in codes.values() if len(code) > max_length
+    ]
+    counts = Counter(codes.values())
+    errors += [f'"{code}" would be created twice.' for code, n in sorted(counts.items()) if n > 1]
+    taken = Course.objects.filter(code__in=codes.values()).values_list('code', flat=True)
+    errors += [f'A course with code "{code}" already exists.' for code in taken]
+    if errors:
+        raise ValidationError(errors)
+    return codes
+
+
+@transaction.atomic
+def rollover(courses, term, offset, teacher=None, code_format=CODE_FORMAT):
+    """
+    Clone ``courses`` (a queryset or list) with all their assignments into
+    ``term``, moving due dates by ``offset`` (a timedelta). Returns the new
+    courses. ``teacher`` reassigns the clones; by default each keeps its
+    teacher.
+    """
+    courses = list(courses)
+    codes = check_codes(courses, term, code_format)
+    now = timezone.now()
+
+    try:
+        with transaction.atomic():
+            clones = Course.objects.bulk_create([
+                Course(
+                    teacher=teacher or course.teacher,
+                    code=codes[course.pk],
+                    title=course.title,
+                    description=course.description,
+                    term=term,
+                    late_penalty=course.late_penalty,
+                    created_at=now,
+                )
+                for course in courses
+            ], batch_size=BATCH_SIZE)
+    except IntegrityError:
+        # A code was taken after check_codes() looked; name it the same way
+        check_codes(courses, term, code_format)
+        raise ValidationError('A course with one of the new codes was just created; try again.')
+    clone_of = {course.pk: clone for course, clone in zip(courses, clones)}
+
+    categories = list(GradeCategory.objects.filter(course__in=courses).order_by('pk'))
+    category_clones = GradeCategory.objects.bulk_create([
+        GradeCategory(
+            course=clone_of[category.course_id],
+            name=category.name,
+            weight=category.weight,
+            drop_lowest=category.drop_lowest,
+        )
+        for category in categories
+    ], batch_size=BATCH_SIZE)
+    category_of = {category.pk: clone for category, clone in zip(categories, category_clones)}
+
+    assignments = Assignment.objects.filter(course__in=courses).order_by().values(
+        'course_id', 'category_id', 'title', 'description', 'due_date', 'total_points', 'attachment',
+    )
+    Assignment.objects.bulk_create([
+        Assignment(
+            course=clone_of[row['course_id']],
+            category=category_of.get(row['category_id']),
+            title=row['title'],
+            description=row['description'],
+            due_date=row['due_date'] + offset if row['due_date'] else None,
+            total_points=row['total_points'],
+            # Same stored file name: the clone shares the original upload
+            attachment=row['attachment'],
+            status='draft',
+            created_at=now,
+        )
+        for row in assignments.iterator(chunk_size=BATCH_SIZE)
+    ], batch_size=BATCH_SIZE)
+
+    ActivityLog.objects.bulk_create([
+        ActivityLog(
+            user_id=clone.teacher_id,
+            action='course_create',
+            object_type='course',
+            object_id=clone.pk,
+            object_name=clone.title,
+        )
+        for clone in clones
+    ], batch_size=BATCH_SIZE)
+
+    # bulk_create sends no signals, so invalidate derived caches by hand
+    bump_version(
+        'teacher_portal.Course', 'teacher_portal.GradeCategory', 'teacher_portal.Assignment',
+        'teacher_portal.ActivityLog',
+    )
+    return clones
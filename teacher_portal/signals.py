@@ -1,13 +1,22 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from elearning_portal.cache import track_versions
 from .models import (
     Course, 
     Assignment, 
     Student, 
     Submission,
+    SubmissionMetadata,
     Grade,  # Add this import
-    ActivityLog  # Make sure this is imported
+    GradeCategory,
+    GradeEvent,
+    ActivityLog,  # Make sure this is imported
+    Notification,
 )
+from .grading import forget_course, forget_student
+from .history import record as record_grade_event
+from .processing import queue_processing
 
 # Course Activities
 @receiver(post_save, sender=Course)
@@ -45,6 +54,19 @@ def log_submission_activity(sender, instance, created, **kwargs):
             object_name=f"{instance.assignment.title} submission"
         )
 
+# Uploaded files are inspected in the background (see teacher_portal.processing)
+@receiver(post_save, sender=Submission)
+def process_submission_file(sender, instance, **kwargs):
+    if getattr(instance, 'file_changed', False):
+        queue_processing(instance)
+
+@receiver(post_delete, sender=SubmissionMetadata)
+def delete_thumbnail(sender, instance, **kwargs):
+    # Whether the submission was deleted or archived, its preview is not needed
+    if instance.thumbnail:
+        storage, name = instance.thumbnail.storage, instance.thumbnail.name
+        transaction.on_commit(lambda: storage.delete(name))
+
 # Grading Activities
 @receiver(post_save, sender=Grade)
 def log_grade_activity(sender, instance, created, **kwargs):
@@ -57,6 +79,15 @@ def log_grade_activity(sender, instance, created, **kwargs):
             object_name=f"Grade for {instance.assignment.title}"
         )
 
+# Grade history (see teacher_portal.history)
+@receiver(post_save, sender=Submission)
+def record_submission_grade(sender, instance, update_fields=None, **kwargs):
+    record_grade_event(instance, GradeEvent.SUBMISSION, update_fields)
+
+@receiver(post_save, sender=Grade)
+def record_gradebook_entry(sender, instance, update_fields=None, **kwargs):
+    record_grade_event(instance, GradeEvent.GRADEBOOK, update_fields)
+
 # Student Enrollment Activities
 @receiver(post_save, sender=Student.enrolled_courses.through)
 def log_student_enrollment(sender, instance, created, **kwargs):
@@ -67,4 +98,28 @@ def log_student_enrollment(sender, instance, created, **kwargs):
             object_type='enrollment',
             object_id=instance.id,
             object_name=f"{instance.student.user.username} to {instance.course.title}"
-        )
\ No newline at end of file
+        )
+
+# Cached course grades (see teacher_portal.grading): a changed mark only
+# drops that student's entry, a structural change drops the whole course
+@receiver([post_save, post_delete], sender=Submission)
+@receiver([post_save, post_delete], sender=Grade)
+def forget_final_grade(sender, instance, **kwargs):
+    try:
+        course_id = instance.assignment.course_id
+    except Assignment.DoesNotExist:
+        return
+    forget_student(course_id, instance.student_id)
+
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=GradeCategory)
+def forget_course_grades(sender, instance, **kwargs):
+    forget_course(instance.course_id)
+
+@receiver(post_save, sender=Course)
+def forget_course_grades_on_penalty(sender, instance, created, **kwargs):
+    if not created:
+        forget_course(instance.pk)
+
+# Version stamps for cached fragments (see elearning_portal.cache)
+track_versions(Course, Assignment, Student, Submission, Grade, GradeCategory, Notification, ActivityLog, SubmissionMetadata)
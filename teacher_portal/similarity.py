@@ -0,0 +1,224 @@
+"""
+Near-duplicate detection between submissions to the same assignment.
+
+Comparing every pair of texts is quadratic, so each text is reduced to a
+MinHash signature instead:
+
+* the text is split into overlapping word shingles (SIMILARITY_SHINGLE_SIZE
+  words), each hashed to 32 bits;
+* ``SIMILARITY_NUM_PERM`` random linear permutations of those hashes are
+  applied with NumPy, and the minimum of each permutation forms the
+  signature.  The share of positions where two signatures agree estimates
+  the Jaccard similarity of the shingle sets.  A signature is stored as
+  ``4 * SIMILARITY_NUM_PERM`` bytes on ``SubmissionMetadata.minhash``;
+* locality-sensitive hashing cuts the signature into ``SIMILARITY_BANDS``
+  bands and stores a hash of each as a ``SimilarityBucket``.  Only
+  submissions sharing at least one bucket are ever compared.
+
+A new submission costs a single indexed lookup on its buckets plus one
+comparison per candidate (``update_submission``, called once its file has
+been processed). ``rebuild_assignment`` recomputes a whole assignment in
+memory in near-linear time. Byte-identical files are always reported, even
+when they have no text.
+"""
+import re
+import zlib
+from collections import defaultdict
+from functools import lru_cache
+from hashlib import blake2b
+from itertools import combinations
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from elearning_portal.cache import bump_version
+
+from .models import SimilarityBucket, SimilarityMatch, Submission, SubmissionMetadata
+
+WORD = re.compile(r'\w+')
+# Permutations are (a * hash + b) mod PRIME. Every factor is below 2**32, so
+# the product fits in uint64 and the result in uint32
+PRIME = np.uint64(4294967291)  # the largest prime below 2**32
+SEED = 20240917  # Signatures are stored, so the permutations must never change
+CHUNK_SIZE = 4096
+MIN_SHINGLES = 10  # Shorter texts say nothing about copying
+REPORT_SIZE = 20
+
+
+@lru_cache(maxsize=None)
+def _permutations(num_perm):
+    rng = np.random.default_rng(SEED)
+    a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def shingle_hashes(text, size=None):
+    """The distinct 32-bit hashes of the text's ``size``-word shingles."""
+    size = size or settings.SIMILARITY_SHINGLE_SIZE
+    words = WORD.findall(text.lower())
+    shingles = (' '.join(words[i:i + size]) for i in range(max(len(words) - size + 1, 0)))
+    return np.unique(np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64))
+
+
+def minhash(hashes, num_perm=None):
+    """MinHash signature (``uint32[num_perm]``) of an array of shingle hashes."""
+    a, b = _permutations(num_perm or settings.SIMILARITY_NUM_PERM)
+    signature = np.full(len(a), PRIME, dtype=np.uint64)
+    for start in range(0, len(hashes), CHUNK_SIZE):
+        chunk = hashes[start:start + CHUNK_SIZE] % PRIME
+        permuted = (np.outer(a, chunk) % PRIME + b[:, None]) % PRIME
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def text_signature(text):
+    """The signature of ``text``, or None when it is too short to judge."""
+    hashes = shingle_hashes(text or '')
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    return minhash(hashes)
+
+
+def to_bytes(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def from_bytes(data):
+    return np.frombuffer(bytes(data), dtype='<u4')
+
+
+def band_buckets(signature, bands=None):
+    """One signed 64-bit bucket id per LSH band of ``signature``."""
+    bands = bands or settings.SIMILARITY_BANDS
+    rows = len(signature) // bands
+    data = to_bytes(signature)
+    width = rows * 4
+    return [
+        int.from_bytes(blake2b(data[band * width:(band + 1) * width], digest_size=8).digest(), 'little', signed=True)
+        for band in range(bands)
+    ]
+
+
+def estimate(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(first == second))
+
+
+def _match(assignment_id, one, other, score, identical=False):
+    first, second = sorted((one, other))
+    return SimilarityMatch(
+        assignment_id=assignment_id, first_id=first, second_id=second,
+        score=score, identical=identical,
+    )
+
+
+def _identical(assignment_id, sha256, exclude=()):
+    return (
+        Submission.objects.filter(assignment_id=assignment_id, metadata__sha256=sha256)
+        .exclude(pk__in=exclude)
+        .values_list('pk', flat=True)
+    )
+
+
+@transaction.atomic
+def update_submission(submission, metadata):
+    """Index one (re)processed submission and record its matches; returns them."""
+    assignment_id = submission.assignment_id
+    SimilarityBucket.objects.filter(submission=submission).delete()
+    SimilarityMatch.objects.filter(Q(first=submission) | Q(second=submission)).delete()
+
+    matches = {}
+    signature = text_signature(metadata.text)
+    metadata.minhash = to_bytes(signature) if signature is not None else None
+    SubmissionMetadata.objects.filter(pk=metadata.pk).update(minhash=metadata.minhash)
+    if signature is not None:
+        buckets = band_buckets(signature)
+        SimilarityBucket.objects.bulk_create([
+            SimilarityBucket(assignment_id=assignment_id, submission=submission, band=band, bucket=bucket)
+            for band, bucket in enumerate(buckets)
+        ])
+        same_bucket = Q()
+        for band, bucket in enumerate(buckets):
+            same_bucket |= Q(band=band, bucket=bucket)
+        candidates = (
+            SimilarityBucket.objects.filter(same_bucket, assignment_id=assignment_id)
+            .exclude(submission=submission)
+            .values('submission_id')
+        )
+        others = SubmissionMetadata.objects.filter(pk__in=candidates, minhash__isnull=False)
+        threshold = settings.SIMILARITY_THRESHOLD
+        for pk, data in others.values_list('pk', 'minhash'):
+            score = estimate(signature, from_bytes(data))
+            if score >= threshold:
+                matches[pk] = _match(assignment_id, submission.pk, pk, score)
+    if metadata.sha256:
+        for pk in _identical(assignment_id, metadata.sha256, exclude=[submission.pk]):
+            matches[pk] = _match(assignment_id, submission.pk, pk, 1.0, identical=True)
+
+    SimilarityMatch.objects.bulk_create(matches.values())
+    bump_version(SimilarityMatch._meta.label)
+    return list(matches.values())
+
+
+@transaction.atomic
+def rebuild_assignment(assignment):
+    """Recompute every signature, bucket and match of ``assignment``; returns the match count."""
+    rows = list(
+        SubmissionMetadata.objects.filter(submission__assignment=assignment, status='done')
+        .values_list('pk', 'text', 'sha256')
+    )
+    SimilarityBucket.objects.filter(assignment=assignment).delete()
+    SimilarityMatch.objects.filter(assignment=assignment).delete()
+
+    ids, signatures, by_sha, stored = [], [], defaultdict(list), []
+    for pk, text, sha256 in rows:
+        if sha256:
+            by_sha[sha256].append(pk)
+        signature = text_signature(text)
+        stored.append(SubmissionMetadata(pk=pk, minhash=to_bytes(signature) if signature is not None else None))
+        if signature is not None:
+            ids.append(pk)
+            signatures.append(signature)
+    SubmissionMetadata.objects.bulk_update(stored, ['minhash'], batch_size=500)
+
+    # Submissions that share a bucket in any band become candidate pairs
+    buckets, members = [], defaultdict(list)
+    for pk, signature in zip(ids, signatures):
+        for band, bucket in enumerate(band_buckets(signature)):
+            buckets.append(SimilarityBucket(assignment=assignment, submission_id=pk, band=band, bucket=bucket))
+            members[band, bucket].append(pk)
+    SimilarityBucket.objects.bulk_create(buckets, batch_size=1000)
+    candidates = set()
+    for group in members.values():
+        candidates.update(combinations(sorted(group), 2))
+
+    matches = {}
+    if candidates:
+        position = {pk: i for i, pk in enumerate(ids)}
+        matrix = np.vstack(signatures)
+        pairs = np.array(sorted(candidates))
+        left = matrix[[position[pk] for pk in pairs[:, 0]]]
+        right = matrix[[position[pk] for pk in pairs[:, 1]]]
+        scores = (left == right).mean(axis=1)
+        for (first, second), score in zip(pairs.tolist(), scores.tolist()):
+            if score >= settings.SIMILARITY_THRESHOLD:
+                matches[first, second] = _match(assignment.pk, first, second, score)
+    for group in by_sha.values():
+        for first, second in combinations(sorted(group), 2):
+            matches[first, second] = _match(assignment.pk, first, second, 1.0, identical=True)
+
+    SimilarityMatch.objects.bulk_create(matches.values(), batch_size=1000)
+    bump_version(SimilarityMatch._meta.label)
+    return len(matches)
+
+
+def report(assignment, limit=REPORT_SIZE):
+    """The most similar pairs of ``assignment``, most similar first."""
+    return list(
+        assignment.similarity_matches
+        .select_related('first__student__user', 'second__student__user')
+        .order_by('-score', 'first_id', 'second_id')[:limit]
+    )
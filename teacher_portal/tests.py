@@ -1,3 +1,570 @@
-from django.test import TestCase
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models import Count, OuterRef
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from elearning_portal.annotations import SubqueryAvg, SubqueryCount, SubquerySum
+
+from . import archive, history, processing, rollover, similarity
+from .analytics import assignment_stats, compute_course_stats
+from .fileinfo import inspect_file
+from .reminders import send_due_reminders
+from .grading import compute_final_grades
+from .models import (
+    ActivityLog, ArchivedAssignment, Assignment, Course, Grade, GradeCategory, GradeEvent, Notification, SimilarityMatch,
+    Student, Submission, SubmissionMetadata,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class PortalTestCase(TestCase):
+    """A course with two enrolled students, alice and bob."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.teacher = User.objects.create_user('teacher1', password='x', role='teacher', is_staff=True)
+        self.course = Course.objects.create(teacher=self.teacher, code='CS101', title='Programming')
+        self.alice, self.bob = (
+            Student.objects.create(user=User.objects.create_user(name, password='x', role='student'))
+            for name in ('alice', 'bob')
+        )
+        self.course.students.add(self.alice, self.bob)
+
+    def assignment(self, title, total_points=100, category=None, due_date=None):
+        return Assignment.objects.create(
+            course=self.course, title=title, total_points=total_points, category=category,
+            due_date=due_date or timezone.now() + timedelta(days=7), status='published',
+        )
+
+    def submit(self, assignment, student, grade=None, **kwargs):
+        return Submission.objects.create(assignment=assignment, student=student, grade=grade, **kwargs)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FinalGradeTests(PortalTestCase):
+    def test_weighted_categories_drop_lowest_and_late_penalty(self):
+        self.course.late_penalty = 10
+        self.course.save()
+        homework = GradeCategory.objects.create(course=self.course, name='Homework', weight=40, drop_lowest=1)
+        exams = GradeCategory.objects.create(course=self.course, name='Exams', weight=60)
+        first, second, third = (self.assignment(f'HW{i}', 10, homework) for i in (1, 2, 3))
+        exam = self.assignment('Final', 100, exams, due_date=timezone.now() - timedelta(days=2))
+
+        # Homework: 10, 5 and 8 of 10 with the 5 dropped is 18/20
+        for assignment, grade in ((first, 10), (second, 5), (third, 8)):
+            self.submit(assignment, self.alice, grade)
+        # Exam: the gradebook's 80 overrides the submission's 50, less 10% for lateness
+        late = self.submit(exam, self.alice, 50, submitted_date=timezone.now() - timedelta(days=1))
+        self.assertTrue(late.is_late)
+        Grade.objects.create(student=self.alice, assignment=exam, value=80)
+        # A single homework mark is never dropped, and unmarked categories do not count
+        self.submit(first, self.bob, 6)
+
+        grades = compute_final_grades(self.course)
+
+        self.assertEqual(grades[self.alice.pk], {
+            'percent': 79.2,
+            'categories': {'Homework': 90.0, 'Exams': 72.0},
+            'graded': 4,
+        })
+        self.assertEqual(grades[self.bob.pk], {'percent': 60.0, 'categories': {'Homework': 60.0}, 'graded': 1})
+        self.assertEqual(list(compute_final_grades(self.course, student_ids=[self.bob.pk])), [self.bob.pk])
+
+    def test_uncategorised_assignments_share_the_remaining_weight(self):
+        quizzes = GradeCategory.objects.create(course=self.course, name='Quizzes', weight=25)
+        self.submit(self.assignment('Quiz', 20, quizzes), self.alice, 10)
+        self.submit(self.assignment('Project'), self.alice, 90)
+        # No points at all: left out rather than divided by zero
+        self.submit(self.assignment('Survey', 0), self.alice, 0)
+
+        grade = compute_final_grades(self.course)[self.alice.pk]
+
+        self.assertEqual(grade['categories'], {'Quizzes': 50.0, 'Other': 90.0})
+        self.assertEqual(grade['percent'], 80.0)
+        self.assertEqual(grade['graded'], 2)
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AnalyticsTests(PortalTestCase):
+    def test_gradebook_entries_override_submission_grades(self):
+        quiz = self.assignment('Quiz', 50)
+        self.submit(quiz, self.alice, 20)
+        Grade.objects.create(student=self.alice, assignment=quiz, value=45)
+        self.submit(quiz, self.bob, 30)
+
+        stats = assignment_stats(quiz)
+        self.assertEqual((stats['count'], stats['mean']), (2, 75.0))
+        self.assertEqual(stats['z_scores'], {self.alice.pk: 1.0, self.bob.pk: -1.0})
+        course = compute_course_stats(self.course)
+        self.assertEqual([row['student_id'] for row in course['students']], [self.alice.pk, self.bob.pk])
+        self.assertEqual(course['assignments'][quiz.pk]['median'], 75.0)
+
+        # A gradebook entry alone invalidates the cached figures
+        with self.captureOnCommitCallbacks(execute=True):
+            Grade.objects.create(student=self.bob, assignment=quiz, value=45)
+        self.assertEqual(assignment_stats(quiz)['mean'], 90.0)
+
+
+
+class StudentAutocompleteTests(PortalTestCase):
+    def setUp(self):
+        super().setUp()
+        User = get_user_model()
+        other = User.objects.create_user('teacher2', password='x', role='teacher', is_staff=True)
+        self.dave = Student.objects.create(user=User.objects.create_user('dave', password='x', role='student'))
+        Course.objects.create(teacher=other, code='CS201', title='Algorithms').students.add(self.dave)
+        self.teacher.user_permissions.add(*Permission.objects.filter(
+            content_type__app_label='teacher_portal', codename__in=['view_student', 'view_course', 'view_submission'],
+        ))
+        self.client.force_login(self.teacher)
+
+    def autocomplete(self, model_name, field_name):
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'teacher_portal', 'model_name': model_name, 'field_name': field_name, 'term': '',
+        })
+        self.assertEqual(response.status_code, 200)
+        return {int(result['id']) for result in response.json()['results']}
+
+    def test_other_teachers_students_are_only_listed_for_enrolment(self):
+        self.assertEqual(self.autocomplete('submission', 'student'), {self.alice.pk, self.bob.pk})
+        self.assertEqual(self.autocomplete('course', 'students'), {self.alice.pk, self.bob.pk, self.dave.pk})
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChangelistQueryCountTests(PortalTestCase):
+    """Each changelist costs the same number of queries however many rows it lists."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(get_user_model().objects.create_superuser('root', password='x', role='admin'))
+        self.created = 0
+
+    def add_rows(self, count):
+        User = get_user_model()
+        for _ in range(count):
+            n = self.created = self.created + 1
+            course = Course.objects.create(teacher=self.teacher, code=f'C{n}', title=f'Course {n}')
+            student = Student.objects.create(user=User.objects.create_user(f'student{n}', password='x', role='student'))
+            course.students.add(student)
+            self.submit(Assignment.objects.create(course=course, title=f'Essay {n}'), student, 50)
+
+    def assertChangelistQueries(self, model_name, num):
+        url = reverse(f'admin:teacher_portal_{model_name}_changelist')
+        for count in (2, 8):
+            self.add_rows(count)
+            self.client.get(url)  # Fill the cached filter choices
+            with self.assertNumQueries(num):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_course_changelist(self):
+        self.assertChangelistQueries('course', 3)
+
+    def test_assignment_changelist(self):
+        self.assertChangelistQueries('assignment', 3)
+
+    def test_submission_changelist(self):
+        self.assertChangelistQueries('submission', 3)
+
+    def test_student_changelist(self):
+        self.assertChangelistQueries('student', 3)
+
+
+
+class LatenessTests(PortalTestCase):
+    def test_moving_the_due_date_recomputes_lateness(self):
+        assignment = self.assignment('Essay')
+        submission = self.submit(assignment, self.alice, submitted_date=timezone.now() - timedelta(hours=1))
+        self.submit(assignment, self.bob, submitted_date=timezone.now() - timedelta(days=3))
+        self.assertFalse(submission.is_late)
+
+        assignment.due_date = timezone.now() - timedelta(days=1)
+        assignment.save()
+
+        self.assertEqual(list(assignment.submissions.late().values_list('student', flat=True)), [self.alice.pk])
+        self.assertEqual(assignment.submissions.on_time().count(), 1)
+        # Saving other fields leaves the submissions alone
+        Submission.objects.update(is_late=False)
+        assignment.title = 'Long essay'
+        assignment.save()
+        self.assertFalse(assignment.submissions.late().exists())
+
+
+
+@override_settings(DEADLINE_REMINDER_WINDOWS=(72, 24, 1))
+class ReminderTests(PortalTestCase):
+    def test_reminders_skip_students_who_submitted_and_go_out_once(self):
+        now = timezone.now()
+        essay = self.assignment('Essay', due_date=now + timedelta(hours=20))
+        self.submit(essay, self.alice)
+        # Drafts get no reminders
+        self.assignment('Draft', due_date=now + timedelta(hours=2))
+        Assignment.objects.filter(title='Draft').update(status='draft')
+
+        self.assertEqual(send_due_reminders(now), {72: 0, 24: 1, 1: 0})
+        self.assertEqual(list(Notification.objects.values_list('user', flat=True)), [self.bob.user_id])
+        # The wider window that was skipped over counts as sent too
+        self.assertEqual(set(essay.reminders.values_list('window', flat=True)), {24, 72})
+
+        self.assertEqual(send_due_reminders(now + timedelta(minutes=5)), {72: 0, 24: 0, 1: 0})
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(send_due_reminders(now + timedelta(hours=19, minutes=30))[1], 1)
+
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ApiTests(PortalTestCase):
+    def setUp(self):
+        super().setUp()
+        for n in range(4):
+            Course.objects.create(teacher=self.teacher, code=f'CS20{n}', title=f'Course {n}')
+        other = get_user_model().objects.create_user('teacher2', password='x', role='teacher', is_staff=True)
+        Course.objects.create(teacher=other, code='MA101', title='Not mine')
+        self.client.force_login(self.teacher)
+        self.url = reverse('api_list', args=['courses'])
+
+    def test_sparse_fields_and_cursor_round_trip(self):
+        codes, params = [], {'fields': 'code,student_count', 'limit': 2}
+        while True:
+            data = self.client.get(self.url, params).json()
+            self.assertTrue(all(set(row) == {'code', 'student_count'} for row in data['results']))
+            codes += [row['code'] for row in data['results']]
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(codes, ['CS101', 'CS200', 'CS201', 'CS202', 'CS203'])
+        self.assertEqual(self.client.get(self.url, {'fields': 'student_count', 'limit': 1}).json()['results'],
+                         [{'student_count': 2}])
+        self.assertEqual(set(self.client.get(self.url).json()['results'][0]), {'id', 'code', 'title'})
+
+    def test_unknown_fields_and_bad_cursors_are_rejected(self):
+        response = self.client.get(self.url, {'fields': 'code,teacher__password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('teacher__password', response.json()['error'])
+        self.assertEqual(self.client.get(self.url, {'cursor': '!!'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_list', args=['users'])).status_code, 404)
+
+
+
+class RolloverTests(PortalTestCase):
+    def test_clones_courses_with_codes_that_fit(self):
+        maths = Course.objects.create(teacher=self.teacher, code='MATH2040', title='Calculus', late_penalty=5)
+        due = timezone.now() + timedelta(days=3)
+        self.assignment('Essay', due_date=due)
+
+        clones = rollover.rollover(Course.objects.filter(pk__in=[self.course.pk, maths.pk]), 'F26', timedelta(days=120))
+
+        self.assertEqual(sorted(clone.code for clone in clones), ['CS101-F26', 'MA2040-F26'])
+        clone = Course.objects.get(code='CS101-F26')
+        self.assertEqual((clone.term, clone.students.count()), ('F26', 0))
+        self.assertEqual(Course.objects.get(code='MA2040-F26').late_penalty, 5)
+        copied = clone.assignments.get()
+        self.assertEqual((copied.status, copied.due_date), ('draft', due + timedelta(days=120)))
+
+    def test_code_clashes_are_reported_and_nothing_is_copied(self):
+        Course.objects.create(teacher=self.teacher, code='CS101-F26', title='Taken')
+        other = Course.objects.create(teacher=self.teacher, code='CS102', title='Other')
+
+        with self.assertRaises(ValidationError) as raised:
+            rollover.rollover([self.course, other], 'F26', timedelta(0))
+        self.assertEqual(raised.exception.messages, ['A course with code "CS101-F26" already exists.'])
+        with self.assertRaises(ValidationError) as raised:
+            rollover.rollover([self.course, other], 'F26', timedelta(0), code_format='{term}-X')
+        self.assertEqual(raised.exception.messages, ['"F26-X" would be created twice.'])
+        self.assertEqual(Course.objects.count(), 3)
+
+    def test_a_code_taken_after_the_check_is_named(self):
+        check_codes = rollover.check_codes
+
+        def racing(courses, term, code_format):
+            codes = check_codes(courses, term, code_format)
+            if not Course.objects.filter(code='CS101-F26').exists():
+                Course.objects.create(teacher=self.teacher, code='CS101-F26', title='Raced')
+            return codes
+
+        with mock.patch.object(rollover, 'check_codes', racing):
+            with self.assertRaises(ValidationError) as raised:
+                rollover.rollover([self.course], 'F26', timedelta(0))
+        self.assertIn('already exists', raised.exception.messages[0])
+
+
+
+class ArchiveTests(PortalTestCase):
+    def test_archive_term_moves_marks_and_the_read_api_unions_them(self):
+        self.course.term = 'S25'
+        self.course.save()
+        homework = GradeCategory.objects.create(course=self.course, name='Homework', weight=100)
+        old = [self.assignment(f'Old {n}', category=homework) for n in range(3)]
+        for n, assignment in enumerate(old):
+            submission = self.submit(assignment, self.alice, 60 + n)
+            SubmissionMetadata.objects.create(submission=submission, file_name='a.txt', status='done')
+            Grade.objects.create(student=self.alice, assignment=assignment, value=70 + n)
+        current = Course.objects.create(teacher=self.teacher, code='CS101-F26', title='Programming', term='F26')
+        live = Assignment.objects.create(course=current, title='New')
+        self.submit(live, self.alice, 90)
+
+        with self.assertRaises(ValueError):
+            archive.archive_term('')
+        moved = archive.archive_term('S25', batch_size=2)
+
+        self.assertEqual(moved, {'assignments': 3, 'submissions': 3, 'grades': 3})
+        self.assertEqual(list(Assignment.objects.all()), [live])
+        self.assertFalse(SubmissionMetadata.objects.exists())
+        self.assertFalse(Grade.objects.exists())
+        self.assertEqual(
+            sorted(ArchivedAssignment.objects.values_list('pk', 'category')),
+            sorted((assignment.pk, homework.pk) for assignment in old),
+        )
+        self.assertEqual(archive.archive_term('S25'), {'assignments': 0, 'submissions': 0, 'grades': 0})
+
+        transcript = list(archive.transcript(self.alice))
+        self.assertEqual(
+            [(row['assignment_title'], row['term'], row['grade'], row['archived']) for row in transcript],
+            [('Old 0', 'S25', 60, True), ('Old 1', 'S25', 61, True), ('Old 2', 'S25', 62, True),
+             ('New', 'F26', 90, False)],
+        )
+        self.assertEqual([row['value'] for row in archive.grade_history(self.alice)], [70, 71, 72])
+
+    def test_archive_activity_keeps_the_feed_whole(self):
+        for n in range(3):
+            ActivityLog.objects.create(
+                user=self.teacher, action='course_create', object_type='course', object_id=n, object_name=f'Course {n}',
+            )
+        before = [row['id'] for row in archive.activity(self.teacher)]
+        logged = ActivityLog.objects.count()
+
+        self.assertGreaterEqual(logged, 3)
+        self.assertEqual(archive.archive_activity(before=timezone.now() + timedelta(seconds=1), batch_size=2), logged)
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual([row['id'] for row in archive.activity(self.teacher)], before)
+
+
+
+class SubqueryAnnotationTests(PortalTestCase):
+    def test_counts_match_distinct_join_counts_without_multiplying_rows(self):
+        for title in ('One', 'Two', 'Three'):
+            assignment = self.assignment(title)
+            self.submit(assignment, self.alice, 80)
+            self.submit(assignment, self.bob)
+        Course.objects.create(teacher=self.teacher, code='CS102', title='Empty')
+        submissions = Submission.objects.filter(assignment__course=OuterRef('pk'))
+
+        courses = Course.objects.annotate(
+            assignment_count=SubqueryCount(Assignment.objects.filter(course=OuterRef('pk'))),
+            student_count=SubqueryCount(Course.students.through.objects.filter(course=OuterRef('pk'))),
+            graded=SubqueryCount(submissions.filter(grade__isnull=False)),
+            points=SubquerySum(submissions, 'grade'),
+            average=SubqueryAvg(submissions, 'grade'),
+        ).order_by('pk')
+
+        self.assertEqual(
+            [(c.assignment_count, c.student_count, c.graded, c.points, c.average) for c in courses],
+            [(3, 2, 3, 240, 80.0), (0, 0, 0, None, None)],
+        )
+        self.assertEqual(
+            [(c.assignment_count, c.student_count) for c in courses],
+            list(Course.objects.annotate(
+                assignment_count=Count('assignments', distinct=True), student_count=Count('students', distinct=True),
+            ).order_by('pk').values_list('assignment_count', 'student_count')),
+        )
+        self.assertNotIn('GROUP BY', str(courses.query))
+
+
+
+class SubmissionProcessingTests(PortalTestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.enterContext(override_settings(MEDIA_ROOT=self.media))
+        self.addCleanup(lambda: processing._discard_pool(processing.get_pool()))
+
+    def test_files_are_inspected_once_on_the_pool(self):
+        essay = self.submit(self.assignment('Essay'), self.alice, file=ContentFile(b'Recursion explained', 'essay.txt'))
+        lost = self.submit(self.assignment('Lab'), self.bob, file=ContentFile(b'x', 'lab.txt'))
+        os.remove(lost.file.path)
+        submissions = Submission.objects.filter(pk__in=[essay.pk, lost.pk])
+
+        with self.assertLogs('teacher_portal.processing', 'WARNING'):
+            self.assertEqual(processing.process_submissions(submissions), 2)
+
+        metadata = SubmissionMetadata.objects.get(submission=essay)
+        self.assertEqual(
+            (metadata.status, metadata.mime_type, metadata.size, metadata.text),
+            ('done', 'text/plain', 19, 'Recursion explained'),
+        )
+        self.assertEqual(SubmissionMetadata.objects.get(submission=lost).status, 'failed')
+        # Only the failed file is retried
+        with self.assertLogs('teacher_portal.processing', 'WARNING'):
+            self.assertEqual(processing.process_submissions(submissions), 1)
+
+    def test_docx_text_and_page_count(self):
+        path = os.path.join(self.media, 'report.docx')
+        with zipfile.ZipFile(path, 'w') as package:
+            package.writestr('word/document.xml', (
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+                '<w:p><w:r><w:t>Hello</w:t></w:r></w:p><w:p><w:r><w:t>world</w:t></w:r></w:p>'
+                '</w:body></w:document>'
+            ))
+            package.writestr('docProps/app.xml', (
+                '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+                '<Pages>3</Pages></Properties>'
+            ))
+        info = inspect_file(path, 'report.docx', text_limit=8, thumbnail_size=(32, 32))
+
+        self.assertEqual(info['mime_type'], 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual((info['page_count'], info['text'], info['thumbnail']), (3, 'Hello\nwo', None))
+
+
+class SimilarityTests(PortalTestCase):
+    ESSAY = ' '.join(f'word{i}' for i in range(60))
+
+    def setUp(self):
+        super().setUp()
+        self.carol = Student.objects.create(user=get_user_model().objects.create_user('carol', password='x', role='student'))
+        self.course.students.add(self.carol)
+        self.essay = self.assignment('Essay')
+
+    def processed(self, student, text='', sha256=''):
+        submission = self.submit(self.essay, student)
+        metadata = SubmissionMetadata.objects.create(
+            submission=submission, file_name=f'{student.user.username}.txt', status='done', text=text, sha256=sha256,
+        )
+        return submission, metadata
+
+    def pairs(self):
+        return {
+            (match.first_id, match.second_id, match.identical)
+            for match in SimilarityMatch.objects.filter(assignment=self.essay)
+        }
+
+    def test_signature_estimates_jaccard_similarity(self):
+        self.assertIsNone(similarity.text_signature('too short to judge'))
+        original = similarity.text_signature(self.ESSAY)
+        # One word changed out of 60 touches 5 of the 56 shingles: Jaccard 51/61
+        edited = similarity.text_signature(self.ESSAY.replace('word30', 'changed'))
+        unrelated = similarity.text_signature(' '.join(f'other{i}' for i in range(60)))
+        self.assertEqual(len(original), 128)
+        self.assertAlmostEqual(similarity.estimate(original, edited), 51 / 61, delta=0.15)
+        self.assertLess(similarity.estimate(original, unrelated), 0.1)
+        self.assertTrue(
+            set(enumerate(similarity.band_buckets(original))) & set(enumerate(similarity.band_buckets(edited)))
+        )
+        self.assertTrue((similarity.from_bytes(similarity.to_bytes(original)) == original).all())
+
+    def test_near_duplicates_and_identical_files_are_matched(self):
+        first, first_meta = self.processed(self.alice, self.ESSAY)
+        copy, copy_meta = self.processed(self.bob, self.ESSAY.replace('word30', 'changed'))
+        own, own_meta = self.processed(self.carol, ' '.join(f'other{i}' for i in range(60)))
+
+        self.assertEqual(similarity.update_submission(first, first_meta), [])
+        matches = similarity.update_submission(copy, copy_meta)
+        self.assertEqual([(m.first_id, m.second_id) for m in matches], [(first.pk, copy.pk)])
+        self.assertGreaterEqual(matches[0].score, 0.5)
+        self.assertEqual(similarity.update_submission(own, own_meta), [])
+        self.assertEqual(self.pairs(), {(first.pk, copy.pk, False)})
+
+        # Re-uploading the same image as someone else is reported as identical
+        SubmissionMetadata.objects.filter(pk__in=[first.pk, own.pk]).update(text='', sha256='a' * 64)
+        own_meta.refresh_from_db()
+        matches = similarity.update_submission(own, own_meta)
+        self.assertEqual([(m.first_id, m.second_id, m.score, m.identical) for m in matches],
+                         [(first.pk, own.pk, 1.0, True)])
+
+        # Reprocessing a file drops its old buckets and matches: no text, no near-duplicate
+        first_meta.refresh_from_db()
+        similarity.update_submission(first, first_meta)
+        self.assertEqual(self.pairs(), {(first.pk, own.pk, True)})
+        self.assertFalse(first.similarity_buckets.exists())
+
+    def test_rebuild_matches_incremental_updates(self):
+        submissions = [
+            self.processed(self.alice, self.ESSAY),
+            self.processed(self.bob, self.ESSAY.replace('word30', 'changed')),
+            self.processed(self.carol, sha256='b' * 64),
+        ]
+        for submission, metadata in submissions:
+            similarity.update_submission(submission, metadata)
+        incremental = self.pairs()
+
+        self.assertEqual(similarity.rebuild_assignment(self.essay), 1)
+        self.assertEqual(self.pairs(), incremental)
+        self.assertEqual(similarity.report(self.essay)[0].first_id, submissions[0][0].pk)
+
+
+class GradebookHistoryTests(PortalTestCase):
+    def test_gradebook_at_replays_the_marks_as_they_stood(self):
+        quiz = self.assignment('Quiz')
+        submission = self.submit(quiz, self.alice, 60)
+        submission.grade = 70
+        submission.save()
+        submission.feedback = 'Better'
+        submission.save()  # Mark unchanged: no event
+        entry = Grade.objects.create(student=self.alice, assignment=quiz, value=85)
+        entry.value = None
+        entry.save()
+        self.submit(quiz, self.bob, 40)
+
+        # Space the events an hour apart, in the order they were recorded
+        start = timezone.now() - timedelta(days=1)
+        events = list(GradeEvent.objects.order_by('pk'))
+        self.assertEqual(
+            [(event.student_id, event.source, event.value) for event in events],
+            [
+                (self.alice.pk, GradeEvent.SUBMISSION, 60),
+                (self.alice.pk, GradeEvent.SUBMISSION, 70),
+                (self.alice.pk, GradeEvent.GRADEBOOK, 85),
+                (self.alice.pk, GradeEvent.GRADEBOOK, None),
+                (self.bob.pk, GradeEvent.SUBMISSION, 40),
+            ],
+        )
+        for hours, event in enumerate(events, start=1):
+            GradeEvent.objects.filter(pk=event.pk).update(ts=start + timedelta(hours=hours))
+
+        def at(hours):
+            return history.gradebook_at(start + timedelta(hours=hours), [quiz.pk])
+
+        alice, bob = (quiz.pk, self.alice.pk), (quiz.pk, self.bob.pk)
+        self.assertEqual(at(0), {})
+        self.assertEqual(at(1), {alice: 60})
+        self.assertEqual(at(2.5), {alice: 70})
+        # The gradebook entry overrides the submission until it is cleared
+        self.assertEqual(at(3), {alice: 85})
+        self.assertEqual(at(4), {alice: 70})
+        self.assertEqual(at(5), {alice: 70, bob: 40})
+        self.assertEqual(history.gradebook_at(start + timedelta(hours=5), Assignment.objects.none()), {})
+
+    def test_batch_writes_the_events_together_with_the_actor(self):
+        quiz = self.assignment('Quiz')
+        submissions = [self.submit(quiz, student) for student in (self.alice, self.bob)]
+
+        with CaptureQueriesContext(connection) as queries:
+            with history.batch(self.teacher):
+                for submission, grade in zip(submissions, (90, 75)):
+                    submission.grade = grade
+                    submission.save(update_fields=['grade'])
+                # Still buffered until the block ends
+                self.assertFalse(GradeEvent.objects.exists())
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "teacher_portal_gradeevent"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            sorted(GradeEvent.objects.values_list('student_id', 'value', 'changed_by_id')),
+            sorted([(self.alice.pk, 90, self.teacher.pk), (self.bob.pk, 75, self.teacher.pk)]),
+        )
+        self.assertEqual([event.value for event in history.mark_history(quiz.pk, self.alice.pk)], [90])
@@ -1,16 +1,17 @@
 from django.urls import path
-from . import views
-
-app_name = 'teacher_portal'
+from . import api, views
 
+# Not namespaced: the views and templates reverse plain names ('course_list', ...)
 urlpatterns = [
     # Dashboard
-    path('dashboard/', views.teacher_dashboard, name='teacher_dashboard'),
+    path('dashboard/', views.dashboard, name='teacher_dashboard'),
 
     # Courses
     path('courses/', views.course_list, name='course_list'),
     path('courses/add/', views.course_create, name='course_create'),
+    path('courses/rollover/', views.course_rollover, name='course_rollover'),
     path('courses/<int:course_id>/', views.course_detail, name='course_detail'),
+    path('courses/<int:course_id>/analytics/', views.course_analytics, name='course_analytics'),
     path('courses/<int:course_id>/edit/', views.course_edit, name='course_edit'),
     path('courses/<int:course_id>/delete/', views.course_delete, name='course_delete'),
 
@@ -25,6 +26,7 @@ urlpatterns = [
     path('assignments/<int:assignment_id>/edit/', views.assignment_edit, name='assignment_edit'),
     path('assignments/<int:assignment_id>/grade/', views.grade_assignment, name='grade_assignment'),
     path('assignments/<int:assignment_id>/delete/', views.assignment_delete, name='assignment_delete'),
+    path('submissions/<int:submission_id>/grade/', views.grade_submission, name='grade_submission'),
 
     # Students (CRUD)
     path('students/', views.student_list, name='student_list'),
@@ -48,4 +50,8 @@ urlpatterns = [
     # Settings and Profile
     path('settings/', views.teacher_settings, name='teacher_settings'),
     path('profile/', views.profile, name='profile'),
+
+    # JSON API
+    path('api/<str:resource>/', api.api_list, name='api_list'),
+    path('api/<str:resource>/<int:pk>/', api.api_detail, name='api_detail'),
 ]
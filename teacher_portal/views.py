@@ -1,14 +1,19 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, HttpResponseForbidden
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils import timezone
 from django.contrib import messages
 from django.db import transaction
-from datetime import date
+from django.views.decorators.http import condition
+from datetime import date, timedelta
+from elearning_portal.annotations import SubqueryCount
+from elearning_portal.cache import fragment_is_cached, version_stamp, versioned_etag
+from elearning_portal.parallel import gather_widgets
 
 
 @login_required
@@ -17,7 +22,7 @@ def role_redirect(request):
     if user.role == 'admin':
         return redirect('dashboard:dashboard')  # admin dashboard
     elif user.role == 'teacher':
-        return redirect('teacher_portal:dashboard')  # teacher dashboard
+        return redirect('teacher_dashboard')  # teacher dashboard
     elif user.role == 'student':
         return redirect('student_portal:dashboard')  # if you have one
     else:
@@ -36,79 +41,110 @@ from .models import (
 )
 
 from .models import Course, Assignment, Student, Grade, Submission
-from .forms import StudentForm, CourseForm, AssignmentForm, GradeSubmissionForm
+from .forms import StudentForm, CourseForm, CourseRolloverForm, AssignmentForm, GradeSubmissionForm
+from .analytics import assignment_stats, course_stats
+from .archive import transcript
+from .grading import final_grades
+from .history import batch as grade_history
+from .rollover import rollover
+from .similarity import report as similarity_report
 
 User = get_user_model()
 
+ANALYTICS_LIST_SIZE = 20
+
 
 # ===================== DASHBOARD =====================
 
-@login_required
-def teacher_dashboard(request):
-    return render(request, 'teacher_portal/dashboard.html')
+# (context prefix, {% cache %} fragment name, TTL, models the fragment shows)
+DASHBOARD_FRAGMENTS = (
+    ('widgets', 'tp_dashboard_widgets', 600, (
+        'teacher_portal.Course', 'teacher_portal.Student',
+        'teacher_portal.Assignment', 'teacher_portal.Submission',
+    )),
+    ('courses', 'tp_course_cards', 600, (
+        'teacher_portal.Course', 'teacher_portal.Student', 'teacher_portal.Assignment',
+    )),
+    ('activity', 'tp_recent_activity', 60, ('teacher_portal.ActivityLog',)),
+    ('deadlines', 'tp_upcoming_deadlines', 300, (
+        'teacher_portal.Course', 'teacher_portal.Assignment',
+    )),
+)
+
 
 @login_required
-def dashboard(request):
-    if not request.user.is_staff:
+async def dashboard(request):
+    user = await request.auser()
+    if not user.is_staff:
         return HttpResponseForbidden("Only teachers can access the dashboard")
 
-    # Get teacher's courses (limited to 5 most recent)
-    teacher_courses = Course.objects.filter(
-        teacher=request.user
-    ).order_by('-created_at')[:5]
-
-    # Get statistics
-    course_count = Course.objects.filter(teacher=request.user).count()
-    student_count = Student.objects.filter(
-        enrolled_courses__teacher=request.user
-    ).distinct().count()
-
-    total_assignments = Assignment.objects.filter(
-        course__teacher=request.user
-    ).count()
-
-    assignments_to_grade = Submission.objects.filter(
-        assignment__course__teacher=request.user,
-        is_graded=False
-    ).count()
-
-    # Get upcoming deadlines (next 7 days)
-    upcoming_deadlines = Assignment.objects.filter(
-        course__teacher=request.user,
-        due_date__gte=timezone.now(),
-        due_date__lte=timezone.now() + timezone.timedelta(days=7)
-    ).order_by('due_date')[:5]
-
-    # Annotate with days remaining
-    for assignment in upcoming_deadlines:
-        assignment.days_remaining = (assignment.due_date - timezone.now()).days
-
-    # Get recent activities (most recent 10)
-    recent_activities = ActivityLog.objects.filter(
-        user=request.user
-    ).order_by('-timestamp')[:10]
-
-    # Get unread notification count
-    notification_count = Notification.objects.filter(
-        user=request.user,
-        read=False
-    ).count()
-
-    context = {
-        'teacher_courses': teacher_courses,
-        'course_count': course_count,
-        'student_count': student_count,
-        'total_assignments': total_assignments,
-        'assignments_to_grade': assignments_to_grade,
-        'upcoming_deadlines': upcoming_deadlines,
-        'recent_activities': recent_activities,
-        'notification_count': notification_count,
+    now = timezone.now()
+    # Every query the page runs, grouped by the cached fragment it feeds.
+    # They are independent of each other, so they run concurrently.
+    queries = {
+        'widgets': {
+            'course_count': Course.objects.filter(teacher=user).count,
+            'student_count': Student.objects.filter(
+                enrolled_courses__teacher=user
+            ).distinct().count,
+            'total_assignments': Assignment.objects.filter(course__teacher=user).count,
+            'assignments_to_grade': Submission.objects.filter(
+                assignment__course__teacher=user, is_graded=False
+            ).count,
+        },
+        'courses': {
+            # Each card shows both counts, so fetch them with the courses
+            'teacher_courses': lambda: list(
+                Course.objects.filter(teacher=user).annotate(
+                    student_count=SubqueryCount(Course.students.through.objects.filter(course=OuterRef('pk'))),
+                    assignment_count=SubqueryCount(Assignment.objects.filter(course=OuterRef('pk'))),
+                ).order_by('-created_at')[:5]
+            ),
+        },
+        'activity': {
+            'recent_activities': lambda: list(
+                ActivityLog.objects.filter(user=user).order_by('-timestamp')[:10]
+            ),
+        },
+        # Next 7 days; days_remaining is a model property
+        'deadlines': {
+            'upcoming_deadlines': lambda: list(
+                Assignment.objects.filter(
+                    course__teacher=user,
+                    due_date__gte=now,
+                    due_date__lte=now + timezone.timedelta(days=7),
+                ).select_related('course').order_by('due_date')[:5]
+            ),
+        },
     }
 
-    return render(request, 'teacher_portal/dashboard.html', context)
+    context = {}
+    pending = {
+        'notification_count': Notification.objects.filter(user=user, read=False).count,
+    }
+    # Skip the queries behind fragments that are still cached
+    fragment_of = {}
+    for prefix, fragment, ttl, labels in DASHBOARD_FRAGMENTS:
+        stamp = version_stamp(*labels)
+        context[prefix + '_v'] = stamp
+        context[prefix + '_ttl'] = ttl
+        if not fragment_is_cached(fragment, user.pk, stamp):
+            for name, query in queries[prefix].items():
+                pending[name] = query
+                fragment_of[name] = prefix
+
+    values, failed = await gather_widgets(pending)
+    context.update(values)
+    for name in failed:
+        # Don't cache a fragment with a missing widget
+        if name in fragment_of:
+            context[fragment_of[name] + '_ttl'] = 0
+
+    return await sync_to_async(render)(request, 'teacher_portal/dashboard.html', context)
 
 
 # ===================== COURSES =====================
+@condition(etag_func=versioned_etag('teacher_portal.Course', 'teacher_portal.Student', 'teacher_portal.Assignment'))
 def course_list(request):
     courses = Course.objects.all()
     return render(request, 'teacher_portal/course_list.html', {'courses': courses})
@@ -140,6 +176,29 @@ def course_create(request):
     })
 
 
+@login_required
+def course_rollover(request):
+    if not request.user.is_staff:
+        return HttpResponseForbidden("Only teachers can roll over courses.")
+
+    form = CourseRolloverForm(request.POST or None, teacher=request.user)
+    if request.method == 'POST' and form.is_valid():
+        try:
+            clones = rollover(
+                form.cleaned_data['courses'],
+                form.cleaned_data['term'],
+                timedelta(days=form.cleaned_data['days']),
+            )
+        except ValidationError as e:
+            for error in e.messages:
+                form.add_error(None, error)
+        else:
+            messages.success(request, f"Copied {len(clones)} course(s) into {form.cleaned_data['term']}.")
+            return redirect('course_list')
+
+    return render(request, 'teacher_portal/course_rollover.html', {'form': form})
+
+
 def course_edit(request, course_id):
     course = get_object_or_404(Course, id=course_id)
     if request.method == 'POST':
@@ -172,11 +231,21 @@ def course_edit(request, course_id):
 
 def course_detail(request, course_id):
     course = get_object_or_404(Course, id=course_id)
-    assignments = course.assignments.all()
-    students = course.students.annotate(
-        submission_count=Count('submissions', filter=Q(submissions__assignment__course=course)),
-        graded_count=Count('submissions', filter=Q(submissions__assignment__course=course, submissions__grade__isnull=False))
+    # Correlated subqueries: one row per object, no GROUP BY over joined submissions
+    assignment_submissions = Submission.objects.filter(assignment=OuterRef('pk'))
+    assignments = course.assignments.annotate(
+        submissions_count=SubqueryCount(assignment_submissions),
+        graded_count=SubqueryCount(assignment_submissions.filter(grade__isnull=False)),
+    )
+    course_submissions = Submission.objects.filter(student=OuterRef('pk'), assignment__course=course)
+    students = course.students.select_related('user').annotate(
+        assignment_count=SubqueryCount(course_submissions),
+        graded_count=SubqueryCount(course_submissions.filter(grade__isnull=False)),
     )
+    students = list(students)
+    grades = final_grades(course, [student.pk for student in students])
+    for student in students:
+        student.final_grade = grades[student.pk]
 
     return render(request, 'teacher_portal/course_detail.html', {
         'course': course,
@@ -185,6 +254,36 @@ def course_detail(request, course_id):
     })
 
 
+@login_required
+def course_analytics(request, course_id):
+    if not request.user.is_staff:
+        raise PermissionDenied
+    course = get_object_or_404(Course, id=course_id, teacher=request.user)
+    stats = course_stats(course)
+
+    assignments = list(course.assignments.order_by('due_date'))
+    per_assignment = stats.get('assignments', {})
+    for assignment in assignments:
+        assignment.grade_stats = per_assignment.get(assignment.pk)
+
+    # Students come back best first; show both ends of the ranking
+    ranked = stats.get('students', [])
+    top_students = ranked[:ANALYTICS_LIST_SIZE]
+    struggling = [row for row in reversed(ranked) if row['z_score'] <= -1][:ANALYTICS_LIST_SIZE]
+    shown_ids = {row['student_id'] for row in top_students + struggling}
+    students = Student.objects.select_related('user').in_bulk(shown_ids)
+    for row in top_students + struggling:
+        row['student'] = students.get(row['student_id'])
+
+    return render(request, 'teacher_portal/course_analytics.html', {
+        'course': course,
+        'grade_stats': stats,
+        'assignments': assignments,
+        'top_students': top_students,
+        'struggling_students': struggling,
+    })
+
+
 def course_delete(request, course_id):
     course = get_object_or_404(Course, id=course_id)
     if request.method == 'POST':
@@ -195,6 +294,7 @@ def course_delete(request, course_id):
 
 # ===================== ASSIGNMENTS =====================
 @login_required
+@condition(etag_func=versioned_etag('teacher_portal.Course', 'teacher_portal.Assignment'))
 def assignment_list(request):
     if not request.user.is_authenticated:
         return redirect(f'/accounts/login/?next={request.path}')
@@ -222,12 +322,12 @@ def assignment_list(request):
 
 def assignment_add(request):
     if request.method == 'POST':
-        form = AssignmentForm(request.POST, request.FILES)
+        form = AssignmentForm(request.POST, request.FILES, teacher=request.user)
         if form.is_valid():
             assignment = form.save()
             return redirect('assignment_list')
     else:
-        form = AssignmentForm()
+        form = AssignmentForm(teacher=request.user)
 
     return render(request, 'teacher_portal/assignment_form.html', {
         'form': form,
@@ -236,6 +336,11 @@ def assignment_add(request):
 
 
 
+@condition(etag_func=versioned_etag(
+    'accounts.CustomUser', 'teacher_portal.Course', 'teacher_portal.Student',
+    'teacher_portal.Assignment', 'teacher_portal.Submission', 'teacher_portal.Grade',
+    'teacher_portal.SubmissionMetadata', 'teacher_portal.SimilarityMatch',
+))
 def assignment_detail(request, assignment_id):
     assignment = get_object_or_404(Assignment, id=assignment_id)
     submissions = Submission.objects.filter(assignment=assignment)
@@ -248,17 +353,33 @@ def assignment_detail(request, assignment_id):
         days_remaining = delta.days
         days_remaining_abs = abs(delta.days)
 
+    # One pass over the submissions; the late count comes from the lateness index
+    counts = submissions.aggregate(
+        submitted=Count('pk'),
+        graded=Count('pk', filter=Q(is_graded=True)),
+        late=Count('pk', filter=Q(is_late=True)),
+    )
+
+    grade_stats = assignment_stats(assignment)
+    z_scores = grade_stats.get('z_scores', {})
+    submissions = list(submissions.select_related('student__user', 'metadata'))
+    for submission in submissions:
+        submission.z_score = z_scores.get(submission.student_id)
+
     context = {
         "assignment": assignment,
         "submissions": submissions,
+        "grade_stats": grade_stats,
+        "similar_pairs": similarity_report(assignment),
         "days_remaining": days_remaining,
         "days_remaining_abs": days_remaining_abs,
         "total_students": assignment.course.students.count(),
-        "submitted_count": submissions.count(),
-        "graded_count": submissions.filter(is_graded=True).count(),
-        "submission_status": f"{submissions.count()} submitted",
-        "grading_status": f"{submissions.filter(is_graded=True).count()}",
-        "status_class": "bg-success" if submissions.count() > 0 else "bg-danger",
+        "submitted_count": counts['submitted'],
+        "graded_count": counts['graded'],
+        "late_count": counts['late'],
+        "submission_status": f"{counts['submitted']} submitted",
+        "grading_status": f"{counts['graded']}",
+        "status_class": "bg-success" if counts['submitted'] > 0 else "bg-danger",
     }
     return render(request, "teacher_portal/assignment_detail.html", context)
 
@@ -268,13 +389,13 @@ def assignment_edit(request, assignment_id):
     assignment = get_object_or_404(Assignment, id=assignment_id, course__teacher=request.user)
 
     if request.method == 'POST':
-        form = AssignmentForm(request.POST, request.FILES, instance=assignment)
+        form = AssignmentForm(request.POST, request.FILES, instance=assignment, teacher=request.user)
         if form.is_valid():
             form.save()
             messages.success(request, 'Assignment updated successfully!')
             return redirect('assignment_detail', assignment_id=assignment.id)
     else:
-        form = AssignmentForm(instance=assignment)
+        form = AssignmentForm(instance=assignment, teacher=request.user)
 
     return render(request, 'teacher_portal/assignment_form.html', {
         'form': form,
@@ -300,14 +421,19 @@ def assignment_delete(request, assignment_id):
         'title': 'Delete Assignment'
     })
 
+@login_required
 def grade_submission(request, submission_id):
-    submission = get_object_or_404(Submission, id=submission_id)
+    submission = get_object_or_404(
+        Submission.objects.select_related('assignment__course', 'student__user', 'metadata'),
+        id=submission_id,
+    )
     if request.method == 'POST':
         form = GradeSubmissionForm(request.POST, instance=submission)
         if form.is_valid():
             submission = form.save(commit=False)
             submission.is_graded = True
-            submission.save()
+            with grade_history(request.user):
+                submission.save()
             return redirect('assignment_detail', assignment_id=submission.assignment.id)
     else:
         form = GradeSubmissionForm(instance=submission)
@@ -321,11 +447,13 @@ def grade_assignment(request, assignment_id):
     submissions = Submission.objects.filter(assignment=assignment)
 
     if request.method == "POST":
-        for submission in submissions:
-            grade_value = request.POST.get(f"grade_{submission.id}")
-            if grade_value is not None and grade_value != "":
-                submission.grade = grade_value
-                submission.save()
+        # One transaction, and one insert for the history of every changed grade
+        with grade_history(request.user):
+            for submission in submissions:
+                grade_value = request.POST.get(f"grade_{submission.id}")
+                if grade_value is not None and grade_value != "":
+                    submission.grade = int(grade_value)
+                    submission.save()
         messages.success(request, f"Grades updated for {assignment.title}.")
         return redirect("assignment_list")
 
@@ -338,18 +466,20 @@ def grade_assignment(request, assignment_id):
 
 # ===================== STUDENTS =====================
 
+@condition(etag_func=versioned_etag(
+    'accounts.CustomUser', 'teacher_portal.Course', 'teacher_portal.Student', 'teacher_portal.Submission',
+))
 def student_list(request):
+    submissions = Submission.objects.filter(student=OuterRef("pk"))
     students = (
         Student.objects
         .select_related("user")
         .annotate(
-            course_count=Count("enrolled_courses", distinct=True),
-            assignment_count=Count("user__student_profile__submissions", distinct=True),
-            graded_count=Count(
-                "user__student_profile__submissions",
-                filter=Q(user__student_profile__submissions__grade__isnull=False),
-                distinct=True
-            )
+            course_count=SubqueryCount(
+                Course.students.through.objects.filter(student=OuterRef("pk"))
+            ),
+            assignment_count=SubqueryCount(submissions),
+            graded_count=SubqueryCount(submissions.filter(grade__isnull=False)),
         )
     )
 
@@ -383,6 +513,7 @@ def student_detail(request, student_id):
         "student": student,
         "enrolled_courses": enrolled_courses,
         "available_courses": available_courses,
+        "transcript": transcript(student),
     })
 
 